@@ -1,12 +1,17 @@
 ﻿import os
+import signal
+import sys
 from config import Config
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager, decode_token
+from flask_jwt_extended import JWTManager
 from flask_socketio import SocketIO, join_room, leave_room
 from datetime import datetime
 
-from models import db, Intercambio, IntercambioMensaje
+from models import db, IntercambioMensaje
+from utils import escritor_mensajes, esquema, pool_db, replicas, sesiones_socket
+from utils.cola_socket import opciones_socketio
+from utils.subidas import RequestSubidas
 
 # Crear instancia global de SocketIO (patrón factory)
 socketio = SocketIO(cors_allowed_origins="*")
@@ -14,6 +19,8 @@ socketio = SocketIO(cors_allowed_origins="*")
 
 def create_app():
     app = Flask(__name__, static_folder="static")
+    # archivos del multipart a SpooledTemporaryFile (memoria acotada por request)
+    app.request_class = RequestSubidas
 
     # Cargar configuración desde Config (usa env vars o defaults de config.py)
     app.config.from_object(Config)
@@ -31,7 +38,8 @@ def create_app():
         app,
         resources={
             r"/api/*": {
-                "origins": cors_origins.split(",") if cors_origins != "*" else "*"
+                "origins": cors_origins.split(",") if cors_origins != "*" else "*",
+                "expose_headers": ["X-Hay-Mas"],
             }
         },
     )
@@ -39,32 +47,18 @@ def create_app():
     # Inicializar extensiones
     JWTManager(app)
     db.init_app(app)
+    replicas.init_app(app)
 
-    # Inicializar SocketIO con la app (sockets siguen abiertos a todos)
-    socketio.init_app(app, cors_allowed_origins="*")
+    # Inicializar SocketIO con la app (sockets siguen abiertos a todos).
+    # Con SOCKETIO_MESSAGE_QUEUE los emits pasan por la cola y llegan a los
+    # sockets de todos los workers (ver utils/cola_socket.py)
+    socketio.init_app(app, cors_allowed_origins="*", **opciones_socketio())
 
-    # Crear tablas y sembrar categorías
+    # Esquema: por defecto aplica migraciones pendientes (si está al día es un
+    # solo SELECT); con DB_ESQUEMA_AL_INICIAR=verificar solo revisa la versión
     with app.app_context():
-        from models import Categoria
-        db.create_all()
-
-        try:
-            if Categoria.query.count() == 0:
-                categorias_base = [
-                    ("Electrónicos", "Computadoras, consolas, TV"),
-                    ("Celulares", "Teléfonos y accesorios"),
-                    ("Hogar", "Muebles y electrodomésticos"),
-                    ("Deportes", "Artículos deportivos"),
-                    ("Ropa", "Ropa y calzado"),
-                    ("Otros", "Varios"),
-                ]
-                for nombre, descripcion in categorias_base:
-                    db.session.add(Categoria(nombre=nombre, descripcion=descripcion))
-                db.session.commit()
-                print("[INFO] Categorías base sembradas.")
-        except Exception as e:
-            print(f"[WARN] Error al sembrar categorías: {e}")
-            db.session.rollback()
+        pool_db.verificar_driver(db.engine)
+        esquema.al_iniciar(app.config["DB_ESQUEMA_AL_INICIAR"])
 
     # Registrar blueprints
     from routes_auth import bp_auth
@@ -75,6 +69,7 @@ def create_app():
     from routes_intercambios import bp_intercambios  # 👈 ya lo tenías
     from routes_moderacion import bp_moderacion
     from routes_admin import admin_bp      # 👈 NUEVO
+    from routes_media import bp_media
 
     app.register_blueprint(bp_auth)
     app.register_blueprint(bp_upload)
@@ -84,50 +79,63 @@ def create_app():
     app.register_blueprint(bp_intercambios)
     app.register_blueprint(bp_moderacion)
     app.register_blueprint(admin_bp)  # 👈 NUEVO
+    app.register_blueprint(bp_media)
+
+    # USE_X_SENDFILE: send_file solo pone X-Sendfile y el proxy manda el archivo
+    app.config["USE_X_SENDFILE"] = os.getenv("MEDIA_X_SENDFILE", "0") == "1"
 
     @app.get("/api/health")
     def health():
         return jsonify(ok=True), 200
 
+    @app.get("/api/health/db")
+    def health_db():
+        # público: solo si responde; el detalle (pool, réplicas, errores del
+        # driver) está en /api/admin/health/db
+        datos = pool_db.metricas(db.engine)
+        publico = {"ok": datos["ok"], "ping_ms": datos["ping_ms"]}
+        if "replicas" in app.extensions:
+            estado = app.extensions["replicas"].estado()
+            publico["replicas_sanas"] = sum(r["sana"] for r in estado)
+            publico["replicas"] = len(estado)
+        return jsonify(publico), 200 if datos["ok"] else 503
+
     return app
 
 
 # ===============================
-#   HELPERS SOCKET / JWT
+#   EVENTOS SOCKET.IO
 # ===============================
+# La identidad y los permisos de cada conexión se cachean en
+# utils/sesiones_socket: el token se decodifica una vez por conexión.
 
-def get_user_id_from_token(token: str):
-    try:
-        decoded = decode_token(token)
-        # por defecto flask_jwt_extended pone el id en "sub"
-        return int(decoded["sub"])
-    except Exception as e:
-        print("WARN decode_token:", e)
-        return None
+@socketio.on("connect")
+def on_connect(auth=None):
+    # el front manda el token en el query string (io(url, { query: { token } }))
+    token = (auth or {}).get("token") or request.args.get("token")
+    if token:
+        sesiones_socket.autenticar(request.sid, token)
 
 
-# ===============================
-#   EVENTOS SOCKET.IO
-# ===============================
+@socketio.on("disconnect")
+def on_disconnect():
+    sesiones_socket.cerrar(request.sid)
+
 
 @socketio.on("join_intercambio")
 def on_join_intercambio(data):
     """
     data: { token: string, id_intercambio: number }
     """
-    token = data.get("token")
     id_intercambio = data.get("id_intercambio")
-    id_usuario = get_user_id_from_token(token)
+    id_usuario = sesiones_socket.autenticar(request.sid, data.get("token"))
 
     if not id_usuario or not id_intercambio:
         return
 
-    intercambio = Intercambio.query.get(id_intercambio)
-    if not intercambio:
-        return
-
     # Solo los participantes del intercambio pueden unirse al room
-    if id_usuario not in (intercambio.id_usuario_ofrece, intercambio.id_usuario_recibe):
+    intercambio = sesiones_socket.autorizar_intercambio(request.sid, id_intercambio)
+    if not intercambio:
         return
 
     room = f"intercambio_{id_intercambio}"
@@ -160,8 +168,7 @@ def on_nuevo_mensaje(data):
       lng?: number
     }
     """
-    token = data.get("token")
-    id_usuario = get_user_id_from_token(token)
+    id_usuario = sesiones_socket.autenticar(request.sid, data.get("token"))
     id_intercambio = data.get("id_intercambio")
     tipo = data.get("tipo", "texto")
     contenido = data.get("contenido")
@@ -171,37 +178,53 @@ def on_nuevo_mensaje(data):
     if not id_usuario or not id_intercambio:
         return
 
-    intercambio = Intercambio.query.get(id_intercambio)
-    if not intercambio:
-        return
+    room = f"intercambio_{id_intercambio}"
 
-    # Validar que el usuario participa en ese intercambio
-    if id_usuario not in (intercambio.id_usuario_ofrece, intercambio.id_usuario_recibe):
+    # Validar que el usuario participa en ese intercambio (en memoria)
+    if not sesiones_socket.puede_publicar(request.sid, id_intercambio):
         return
 
-    msg = IntercambioMensaje(
-        id_intercambio=id_intercambio,
-        id_usuario=id_usuario,
-        tipo=tipo,
-        contenido=contenido if tipo == "texto" else None,
-        lat=lat if tipo == "ubicacion" else None,
-        lng=lng if tipo == "ubicacion" else None,
-        creado=datetime.utcnow(),
+    # tipos convertidos y validados aquí, no al guardar el lote
+    fila = escritor_mensajes.preparar_fila(
+        id_intercambio, id_usuario, tipo, contenido, lat, lng, datetime.utcnow()
     )
-    db.session.add(msg)
-    db.session.commit()
+    if fila is None:
+        print(f"WARN nuevo_mensaje inválido de usuario {id_usuario} en {room}")
+        return
 
-    room = f"intercambio_{id_intercambio}"
-    payload = {
-        "id_mensaje": msg.id_mensaje,
-        "id_intercambio": msg.id_intercambio,
-        "id_usuario": msg.id_usuario,
-        "tipo": msg.tipo,
-        "contenido": msg.contenido,
-        "lat": float(msg.lat) if msg.lat is not None else None,
-        "lng": float(msg.lng) if msg.lng is not None else None,
-        "creado": msg.creado.isoformat(),
-    }
+    # write-behind: se emite ya y el INSERT va en el siguiente lote; con la
+    # cola llena se guarda aquí mismo como en modo sync
+    if escritor_mensajes.en_lote() and escritor_mensajes.encolar(fila):
+        payload = {
+            "id_mensaje": None,
+            "id_provisional": fila["id_provisional"],
+            "id_intercambio": fila["id_intercambio"],
+            "id_usuario": id_usuario,
+            "tipo": tipo,
+            "contenido": fila["contenido"],
+            "lat": fila["lat"],
+            "lng": fila["lng"],
+            "creado": fila["creado"].isoformat(),
+        }
+    else:
+        msg = IntercambioMensaje(**fila)
+        db.session.add(msg)
+        db.session.commit()
+
+        payload = {
+            "id_mensaje": msg.id_mensaje,
+            "id_provisional": msg.id_provisional,
+            "id_intercambio": msg.id_intercambio,
+            "id_usuario": msg.id_usuario,
+            "tipo": msg.tipo,
+            "contenido": msg.contenido,
+            "lat": float(msg.lat) if msg.lat is not None else None,
+            "lng": float(msg.lng) if msg.lng is not None else None,
+            "creado": msg.creado.isoformat(),
+        }
+
+    # sus siguientes GET /mensajes leen de la primaria (ver utils/replicas.py)
+    replicas.marcar_escritura(id_usuario)
 
     # Enviar el mensaje a todos los conectados a ese intercambio
     socketio.emit("mensaje_recibido", payload, room=room)
@@ -209,13 +232,44 @@ def on_nuevo_mensaje(data):
 
 
 # ===============================
-#   MAIN
+#   TAREAS DE FONDO / MAIN
 # ===============================
 
-if __name__ == "__main__":
+def iniciar_tareas_de_fondo(app):
+    """
+    Tareas que corren en cada proceso que atiende sockets. Con gunicorn se
+    llaman desde gunicorn.conf.py (una vez por worker, ya con eventlet
+    parchado); con `python app.py`, desde main().
+    """
+    # cancela/penaliza intercambios con la confirmación vencida
+    from utils.vencimientos import iniciar_barrido_vencimientos
+    iniciar_barrido_vencimientos(app, socketio)
+
+    # chat en lote (CHAT_PERSISTENCIA=lote)
+    escritor_mensajes.iniciar_escritor_mensajes(app, socketio)
+
+    # índice de búsqueda en memoria: productos de otros workers y reconstrucción
+    from utils.busqueda import iniciar_refresco_indice
+    iniciar_refresco_indice(app, socketio)
+
+
+def main():
+    """Servidor de desarrollo. En producción: gunicorn -c gunicorn.conf.py wsgi:app"""
     app = create_app()
+    iniciar_tareas_de_fondo(app)
+
+    # SIGTERM sale por sys.exit para que atexit alcance a guardar los mensajes encolados
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
     port = int(os.environ.get("PORT", 5000))  # Railway pone PORT, local usa 5000
+    debug = os.getenv("FLASK_DEBUG", "1") == "1"
     # IMPORTANTE: usar socketio.run en lugar de app.run
-    socketio.run(app, debug=True, host="0.0.0.0", port=port)
+    socketio.run(app, debug=debug, host="0.0.0.0", port=port)
 
 
+if __name__ == "__main__":
+    # Los routes_* hacen "from app import socketio": si este archivo corre como
+    # __main__ se cargaría una segunda copia del módulo con otro socketio (sin
+    # init_app). Se arranca desde el módulo "app" para que haya uno solo.
+    import app as modulo_app
+    modulo_app.main()
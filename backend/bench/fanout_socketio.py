@@ -0,0 +1,108 @@
+# bench/fanout_socketio.py
+"""
+Fan-out de un room de Socket.IO repartido entre N servidores.
+
+Levanta N socketio.Server en este proceso, cada uno con C sockets simulados
+dentro del mismo room, y emite M mensajes desde el servidor 0. Mide cuánto
+tarda en llegar cada mensaje a los N*C sockets. No abre conexiones reales:
+se cuenta en _send_eio_packet, que es donde el servidor escribiría al socket.
+
+    python bench/fanout_socketio.py                         # memory://, N=1,2,4,8
+    python bench/fanout_socketio.py --url redis://localhost:6379/0 --workers 4
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import socketio  # noqa: E402
+
+from utils.cola_socket import ColaEnMemoria  # noqa: E402
+
+ROOM = "intercambio_1"
+
+
+class Contador:
+    def __init__(self, esperado: int):
+        self.n = 0
+        self.esperado = esperado
+        self.lock = threading.Lock()
+        self.listo = threading.Event()
+
+    def sumar(self, *_):
+        with self.lock:
+            self.n += 1
+            if self.n >= self.esperado:
+                self.listo.set()
+
+
+def _crear_servidor(url: str | None, canal: str, contador: Contador):
+    if url is None:
+        manager = None
+    elif url.startswith("memory://"):
+        manager = ColaEnMemoria(url, channel=canal)
+    else:
+        manager = socketio.RedisManager(url, channel=canal)
+
+    srv = socketio.Server(async_mode="threading", client_manager=manager)
+    srv._send_eio_packet = contador.sumar
+    srv.manager_initialized = True
+    srv.manager.initialize()
+    return srv
+
+
+def correr(url: str | None, workers: int, sockets: int, mensajes: int) -> dict:
+    canal = f"bench-{uuid.uuid4().hex[:8]}"
+    contador = Contador(workers * sockets * mensajes)
+    servidores = [_crear_servidor(url, canal, contador) for _ in range(workers)]
+
+    for srv in servidores:
+        for _ in range(sockets):
+            sid = srv.manager.connect(uuid.uuid4().hex, "/")
+            srv.manager.basic_enter_room(sid, "/", ROOM)
+    time.sleep(0.2)  # que los listeners estén suscritos antes de emitir
+
+    payload = {"id_intercambio": 1, "id_usuario": 1, "tipo": "texto", "contenido": "x" * 80}
+    inicio = time.perf_counter()
+    for _ in range(mensajes):
+        servidores[0].emit("mensaje_recibido", payload, room=ROOM)
+    completo = contador.listo.wait(timeout=60)
+    total = time.perf_counter() - inicio
+
+    for srv in servidores:
+        if isinstance(srv.manager, ColaEnMemoria):
+            srv.manager.cerrar()
+
+    return {
+        "workers": workers,
+        "entregas": contador.n,
+        "esperadas": contador.esperado,
+        "completo": completo,
+        "segundos": total,
+        "mensajes_s": mensajes / total,
+        "entregas_s": contador.n / total,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="memory://", help="cola: memory:// o redis://...")
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 2, 4, 8])
+    parser.add_argument("--sockets", type=int, default=50, help="sockets en el room por servidor")
+    parser.add_argument("--mensajes", type=int, default=2000)
+    args = parser.parse_args()
+
+    base = correr(None, 1, args.sockets, args.mensajes)
+    print(f"{'cola':<12}{'workers':>8}{'msg/s':>12}{'entregas/s':>14}{'completo':>10}")
+    print(f"{'(ninguna)':<12}{1:>8}{base['mensajes_s']:>12.0f}{base['entregas_s']:>14.0f}{str(base['completo']):>10}")
+    for n in args.workers:
+        r = correr(args.url, n, args.sockets, args.mensajes)
+        print(f"{args.url[:11]:<12}{n:>8}{r['mensajes_s']:>12.0f}{r['entregas_s']:>14.0f}{str(r['completo']):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# bench/media_estaticos.py
+"""
+/static/uploads por routes_media vs el /static de Flask de antes.
+
+Copia una imagen como <sha256>.jpg en static/uploads (ruta nueva) y como
+_bench_<sha256>.jpg en static/ (sigue yendo por el static de Flask), y
+simula visitas con el test client: la primera descarga todo, las siguientes
+mandan If-None-Match si la respuesta no se puede reusar sin preguntar.
+
+    python bench/media_estaticos.py [--imagen foto.jpg] [--visitas 5] [--por-pagina 20]
+"""
+import argparse
+import hashlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("DB_ESQUEMA_AL_INICIAR", "omitir")
+
+from app import create_app  # noqa: E402
+
+
+def _simular(client, url: str, visitas: int, por_pagina: int) -> dict:
+    """Un navegador simplificado: guarda ETag y respeta max-age/immutable."""
+    requests = bytes_ = 0
+    etag = None
+    reusable = False
+    t = time.perf_counter()
+    for _ in range(visitas):
+        for _ in range(por_pagina):
+            if reusable:
+                continue  # se sirve del caché del navegador, sin red
+            headers = {"If-None-Match": etag} if etag else {}
+            r = client.get(url, headers=headers)
+            requests += 1
+            bytes_ += len(r.data)
+            etag = r.headers.get("ETag") or etag
+            cc = r.headers.get("Cache-Control") or ""
+            reusable = "immutable" in cc or ("max-age=" in cc and "max-age=0" not in cc)
+    ms = (time.perf_counter() - t) * 1000
+    return {"requests": requests, "bytes": bytes_, "ms": ms, "cache_control": cc}
+
+
+def _latencia(client, url: str, headers: dict, n: int = 500) -> float:
+    t = time.perf_counter()
+    for _ in range(n):
+        client.get(url, headers=headers)
+    return (time.perf_counter() - t) * 1e6 / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--imagen", help="archivo a servir (default: 300 KB aleatorios)")
+    parser.add_argument("--visitas", type=int, default=5)
+    parser.add_argument("--por-pagina", type=int, default=20, help="veces que la página pide la imagen")
+    args = parser.parse_args()
+
+    datos = open(args.imagen, "rb").read() if args.imagen else os.urandom(300 * 1024)
+    sha = hashlib.sha256(datos).hexdigest()
+
+    app = create_app()
+    static = app.static_folder
+    nueva = os.path.join(static, "uploads", f"{sha}.jpg")
+    vieja = os.path.join(static, f"_bench_{sha}.jpg")
+    for ruta in (nueva, vieja):
+        with open(ruta, "wb") as f:
+            f.write(datos)
+
+    try:
+        client = app.test_client()
+        url_vieja, url_nueva = f"/static/_bench_{sha}.jpg", f"/static/uploads/{sha}.jpg"
+
+        print(f"{args.visitas} visitas x {args.por_pagina} pedidos de una imagen de {len(datos) // 1024} KB\n")
+        print(f"{'ruta':<22}{'requests':>10}{'KB':>10}{'ms':>9}  Cache-Control")
+        for nombre, url in (("static de Flask", url_vieja), ("routes_media", url_nueva)):
+            r = _simular(client, url, args.visitas, args.por_pagina)
+            print(f"{nombre:<22}{r['requests']:>10}{r['bytes'] // 1024:>10}{r['ms']:>9.1f}  {r['cache_control'] or '-'}")
+
+        etag_vieja = client.get(url_vieja).headers["ETag"]
+        etag_nueva = client.get(url_nueva).headers["ETag"]
+        print("\nLatencia por request (µs, test client, sin red):")
+        print(f"  200 static de Flask  {_latencia(client, url_vieja, {}):8.0f}")
+        print(f"  200 routes_media     {_latencia(client, url_nueva, {}):8.0f}")
+        print(f"  304 static de Flask  {_latencia(client, url_vieja, {'If-None-Match': etag_vieja}):8.0f}")
+        print(f"  304 routes_media     {_latencia(client, url_nueva, {'If-None-Match': etag_nueva}):8.0f}")
+        print(f"  206 routes_media     {_latencia(client, url_nueva, {'Range': 'bytes=0-65535'}):8.0f}")
+    finally:
+        for ruta in (nueva, vieja):
+            os.remove(ruta)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# bench/moderacion_filtro.py
+"""
+Filtro de texto de moderación (utils/filtro_texto.py).
+
+  1. Costo por publicación del autómata Aho-Corasick contra buscar cada
+     frase con su propia regex (lo que crece con la lista de términos).
+  2. Cuántas publicaciones de una muestra se resuelven sin el modelo y la
+     latencia mediana simulada con un modelo de --modelo-ms.
+
+    python bench/moderacion_filtro.py [--muestra publicaciones.txt] [--modelo-ms 1500]
+
+--muestra: una publicación por línea, "título<TAB>descripción".
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import filtro_texto  # noqa: E402
+from utils.busqueda import normalizar  # noqa: E402
+
+MUESTRA = [
+    ("Six de cerveza Corona", "fría, la cambio por audífonos"),
+    ("Vape desechable sabor mango", "5000 puffs"),
+    ("Pistola de agua", "para niños, casi nueva"),
+    ("Bicicleta rodada 26", "frenos nuevos"),
+    ("Botella de tequila reposado", "cerrada"),
+    ("Tenis Nike talla 27", "usados dos veces"),
+    ("Cuchillo de cocina", "acero inoxidable"),
+    ("Chamarra de piel color tabaco", "talla M"),
+    ("Libro de cálculo", "Stewart 8a edición"),
+    ("Pistola airsoft", "réplica con balines"),
+    ("Audífonos inalámbricos", "con estuche"),
+    ("Mezcal artesanal", "de Oaxaca"),
+    ("Consola PS4", "con dos controles"),
+    ("Cigarros Marlboro", "cajetilla completa"),
+    ("Pasaporte", "vencido"),
+    ("Mochila escolar", "color azul"),
+    ("Balón de fútbol", "número 5"),
+    ("Lámpara de escritorio", "luz LED"),
+    ("Cerveza sin alcohol", "caja de 12"),
+    ("Juego de mesa Catan", "completo"),
+]
+
+
+def _regex_por_frase():
+    frases = [normalizar(f) for fs in filtro_texto.BLOQUEAR.values() for f in fs]
+    frases += [normalizar(f) for f in filtro_texto.PERMITIDAS + filtro_texto.DUDOSO]
+    return [re.compile(rf"\b{re.escape(f)}(?:e?s)?\b") for f in frases]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--muestra", help="archivo con título<TAB>descripción por línea")
+    parser.add_argument("--modelo-ms", type=float, default=1500.0, help="latencia supuesta del modelo")
+    parser.add_argument("--repeticiones", type=int, default=2000)
+    args = parser.parse_args()
+
+    if args.muestra:
+        with open(args.muestra, encoding="utf-8") as f:
+            muestra = [tuple((linea.rstrip("\n").split("\t") + [""])[:2]) for linea in f if linea.strip()]
+    else:
+        muestra = MUESTRA
+
+    regexes = _regex_por_frase()
+    n = args.repeticiones * len(muestra)
+
+    t = time.perf_counter()
+    for _ in range(args.repeticiones):
+        for titulo, descripcion in muestra:
+            filtro_texto.clasificar(titulo, descripcion)
+    us_automata = (time.perf_counter() - t) * 1e6 / n
+
+    t = time.perf_counter()
+    for _ in range(args.repeticiones):
+        for titulo, descripcion in muestra:
+            texto = normalizar(f"{titulo} {descripcion}")
+            [r.search(texto) for r in regexes]
+    us_regex = (time.perf_counter() - t) * 1e6 / n
+
+    print(f"{len(regexes)} frases, {len(muestra)} publicaciones\n")
+    print(f"  Aho-Corasick      {us_automata:8.1f} µs/publicación")
+    print(f"  una regex c/u     {us_regex:8.1f} µs/publicación\n")
+
+    niveles = {"bloquear": 0, "dudoso": 0, "limpio": 0}
+    latencias = []
+    for titulo, descripcion in muestra:
+        r = filtro_texto.clasificar(titulo, descripcion)
+        niveles[r["nivel"]] += 1
+        latencias.append(us_automata / 1000 if r["nivel"] == "bloquear" else args.modelo_ms)
+        print(f"  {r['nivel']:<9} {titulo[:40]:<40} {r['termino'] or ''}")
+
+    resueltas = niveles["bloquear"]
+    print(f"\nSin modelo: {resueltas}/{len(muestra)} ({resueltas / len(muestra):.0%}); "
+          f"dudosas {niveles['dudoso']}, limpias {niveles['limpio']}")
+    print(f"Latencia mediana simulada: {args.modelo_ms:.0f} ms -> {statistics.median(latencias):.1f} ms "
+          f"(media {args.modelo_ms:.0f} -> {statistics.mean(latencias):.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
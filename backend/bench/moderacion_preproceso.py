@@ -0,0 +1,112 @@
+# bench/moderacion_preproceso.py
+"""
+Bytes y latencia de lo que se manda al modelo de moderación.
+
+Compara el archivo original en base64 (como se mandaba antes) contra
+copia_reducida() con distintos lados/calidades: tamaño del data URL, tiempo
+de preproceso, tiempo de envío a --mbps y tokens de imagen estimados.
+Con --llamar además mide la llamada real al proveedor configurado
+(MODERACION_PROVEEDOR, OPENAI_API_KEY).
+
+    python bench/moderacion_preproceso.py [--imagen foto.jpg] [--mbps 10] [--repeticiones 5] [--llamar]
+"""
+import argparse
+import base64
+import io
+import math
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image  # noqa: E402
+
+from utils.subidas import copia_reducida  # noqa: E402
+
+
+def _foto_sintetica() -> bytes:
+    """12 MP con ruido y degradados (se comprime como una foto) y EXIF con GPS."""
+    ancho, alto = 4032, 3024
+    ruido = Image.effect_noise((ancho, alto), 40).convert("RGB")
+    degradado = Image.linear_gradient("L").resize((ancho, alto)).convert("RGB")
+    img = Image.blend(ruido, degradado, 0.6)
+    exif = Image.Exif()
+    exif[0x010F] = "Camara de prueba"   # Make
+    exif[0x0112] = 1                    # Orientation
+    exif[0x8825] = {1: "N", 2: (19.0, 26.0, 0.0)}  # GPSInfo
+    salida = io.BytesIO()
+    img.save(salida, "JPEG", quality=92, exif=exif.tobytes())
+    return salida.getvalue()
+
+
+def _tokens_estimados(ancho: int, alto: int) -> int:
+    """Fórmula publicada para gpt-4.1-mini: parches de 32 px, máximo 1536, x1.62."""
+    parches = math.ceil(ancho / 32) * math.ceil(alto / 32)
+    if parches > 1536:
+        escala = math.sqrt(1536 * 32 * 32 / (ancho * alto))
+        parches = math.ceil(ancho * escala / 32) * math.ceil(alto * escala / 32)
+        parches = min(parches, 1536)
+    return math.ceil(parches * 1.62)
+
+
+def _medir(nombre, preparar, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        t = time.perf_counter()
+        imagen, mimetype = preparar()
+        data_url = f"data:{mimetype};base64,{base64.b64encode(imagen).decode('ascii')}"
+        tiempos.append((time.perf_counter() - t) * 1000)
+    with Image.open(io.BytesIO(imagen)) as img:
+        tamano, exif = img.size, bool(img.getexif())
+    return {
+        "nombre": nombre, "imagen": imagen, "mimetype": mimetype,
+        "data_url": len(data_url), "ms": statistics.median(tiempos),
+        "tamano": tamano, "exif": exif, "tokens": _tokens_estimados(*tamano),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--imagen", help="foto a usar (default: 12 MP sintética con EXIF)")
+    parser.add_argument("--mbps", type=float, default=10.0, help="ancho de banda de subida hacia el proveedor")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--llamar", action="store_true", help="medir también la llamada real al proveedor")
+    args = parser.parse_args()
+
+    original = open(args.imagen, "rb").read() if args.imagen else _foto_sintetica()
+    stream = io.BytesIO(original)
+
+    casos = [
+        ("original (antes)", lambda: (original, "image/jpeg")),
+        ("1024 px, q85", lambda: copia_reducida(stream, 1024, 85)),
+        ("768 px, q80", lambda: copia_reducida(stream, 768, 80)),
+        ("512 px, q80", lambda: copia_reducida(stream, 512, 80)),
+    ]
+    resultados = [_medir(nombre, f, args.repeticiones) for nombre, f in casos]
+
+    print(f"Imagen de {len(original) / 1024:.0f} KB; envío a {args.mbps:g} Mbps\n")
+    print(f"{'caso':<18}{'px':>11}{'data URL KB':>13}{'prep ms':>9}{'envío ms':>10}{'tokens':>8}  EXIF")
+    for r in resultados:
+        envio = r["data_url"] * 8 / (args.mbps * 1e6) * 1000
+        px = "x".join(map(str, r["tamano"]))
+        print(f"{r['nombre']:<18}{px:>11}{r['data_url'] / 1024:>13.0f}{r['ms']:>9.1f}{envio:>10.0f}"
+              f"{r['tokens']:>8}  {'sí' if r['exif'] else 'no'}")
+
+    if args.llamar:
+        from utils.moderacion import obtener_proveedor
+
+        proveedor = obtener_proveedor()
+        print(f"\nLlamada real ({proveedor.nombre}, mediana de {args.repeticiones}):")
+        for r in resultados:
+            tiempos = []
+            for _ in range(args.repeticiones):
+                t = time.perf_counter()
+                proveedor.clasificar(r["imagen"], r["mimetype"], "bench", "")
+                tiempos.append((time.perf_counter() - t) * 1000)
+            print(f"  {r['nombre']:<18}{statistics.median(tiempos):>8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
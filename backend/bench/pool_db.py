@@ -0,0 +1,100 @@
+# bench/pool_db.py
+"""
+Concurrencia contra el pool de conexiones (utils/pool_db.py).
+
+Lanza --hilos green threads (eventlet, como en producción) o hilos normales
+(--sin-eventlet), y cada uno hace --consultas consultas que retienen la
+conexión --consulta-ms (SELECT SLEEP en MySQL, sleep en SQLite). Compara el
+pool por defecto de SQLAlchemy (5 + 10, timeout 30 s) con las
+configuraciones de --configs: throughput, espera por conexión y timeouts.
+
+    python bench/pool_db.py [--url mysql+pymysql://...] [--hilos 200] [--consulta-ms 20]
+                            [--configs 10+20,20+40] [--timeout 10]
+
+Sin --url usa un archivo SQLite temporal (mide el pool, no el servidor).
+"""
+import sys
+
+if "--sin-eventlet" not in sys.argv:
+    import eventlet
+    eventlet.monkey_patch()
+
+import argparse  # noqa: E402
+import os  # noqa: E402
+import tempfile  # noqa: E402
+import threading  # noqa: E402
+import time  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, exc, text  # noqa: E402
+
+from utils.pool_db import PoolMedido  # noqa: E402
+
+
+def _correr(engine, hilos: int, consultas: int, consulta_ms: int) -> dict:
+    es_mysql = engine.dialect.name == "mysql"
+    errores = []
+
+    def trabajo():
+        for _ in range(consultas):
+            try:
+                with engine.connect() as conn:
+                    if es_mysql:
+                        conn.execute(text("SELECT SLEEP(:s)"), {"s": consulta_ms / 1000})
+                    else:
+                        conn.execute(text("SELECT 1"))
+                        time.sleep(consulta_ms / 1000)
+            except exc.TimeoutError:
+                errores.append("timeout")
+
+    inicio = time.perf_counter()
+    grupo = [threading.Thread(target=trabajo) for _ in range(hilos)]
+    for h in grupo:
+        h.start()
+    for h in grupo:
+        h.join()
+    segundos = time.perf_counter() - inicio
+
+    datos = engine.pool.metricas()
+    datos.update({"segundos": segundos, "qps": datos["checkouts"] / segundos, "errores": len(errores)})
+    return datos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="URL de SQLAlchemy (default: SQLite temporal)")
+    parser.add_argument("--hilos", type=int, default=200)
+    parser.add_argument("--consultas", type=int, default=5, help="consultas por hilo")
+    parser.add_argument("--consulta-ms", type=int, default=20)
+    parser.add_argument("--configs", default="10+20,20+40", help="pool_size+max_overflow separados por coma")
+    parser.add_argument("--timeout", type=int, default=10, help="DB_POOL_TIMEOUT de las configs")
+    parser.add_argument("--sin-eventlet", action="store_true", help="hilos del sistema en lugar de green threads")
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{tempfile.mkstemp(suffix='.db')[1]}"
+    casos = [("default SQLAlchemy", 5, 10, 30)]
+    for config in args.configs.split(","):
+        size, overflow = (int(x) for x in config.split("+"))
+        casos.append((f"{size}+{overflow}, {args.timeout} s", size, overflow, args.timeout))
+
+    modo = "hilos" if args.sin_eventlet else "green threads"
+    print(f"{args.hilos} {modo} x {args.consultas} consultas de {args.consulta_ms} ms; "
+          f"{url.split('://')[0]}\n")
+    print(f"{'pool':<22}{'s':>7}{'q/s':>8}{'espera p50':>12}{'p95':>9}{'max':>9}{'timeouts':>10}")
+    for nombre, size, overflow, timeout in casos:
+        engine = create_engine(
+            url, poolclass=PoolMedido, pool_size=size, max_overflow=overflow,
+            pool_timeout=timeout, pool_pre_ping=True, pool_recycle=280,
+        )
+        r = _correr(engine, args.hilos, args.consultas, args.consulta_ms)
+        engine.dispose()
+        print(f"{nombre:<22}{r['segundos']:>7.2f}{r['qps']:>8.0f}{r['espera_p50_ms']:>10.1f}ms"
+              f"{r['espera_p95_ms']:>7.1f}ms{r['espera_max_ms']:>7.0f}ms{r['timeouts']:>10}")
+
+    if not args.url:
+        os.remove(url.split("///", 1)[1])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# bench/tiempo_arranque.py
+"""
+Tiempo de arranque de un worker: `import app` + create_app() en un proceso
+nuevo, sin tocar el esquema (DB_ESQUEMA_AL_INICIAR=omitir) y con SQLite.
+
+Imprime la mediana de varias corridas, los imports más caros (-X importtime)
+y revisa que los subsistemas opcionales (openai, smtplib) no se hayan
+cargado. Sale con código 1 si se pasa de --max-ms o si se cargó alguno, para
+poder usarlo como guardia en CI:
+
+    python bench/tiempo_arranque.py --max-ms 1500
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+NO_DEBEN_CARGARSE = ["openai", "httpx", "pydantic", "smtplib"]
+
+SCRIPT = f"""
+import sys, time
+t = time.perf_counter()
+import app
+app.create_app()
+ms = (time.perf_counter() - t) * 1000
+cargados = [m for m in {NO_DEBEN_CARGARSE!r} if m in sys.modules]
+print("RESULTADO", round(ms, 1), ",".join(cargados))
+"""
+
+
+def _entorno():
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite://")
+    env["DB_ESQUEMA_AL_INICIAR"] = "omitir"
+    env.pop("OPENAI_API_KEY", None)  # debe arrancar sin la llave
+    return env
+
+
+def _correr(extra_args=()):
+    return subprocess.run(
+        [sys.executable, *extra_args, "-c", SCRIPT],
+        cwd=BACKEND, env=_entorno(), capture_output=True, text=True,
+    )
+
+
+def _resultado(salida: str):
+    for linea in salida.splitlines():
+        if linea.startswith("RESULTADO"):
+            partes = linea.split(" ")
+            return float(partes[1]), [m for m in (partes[2] if len(partes) > 2 else "").split(",") if m]
+    raise RuntimeError("no se pudo medir el arranque:\n" + salida)
+
+
+def _imports_mas_caros(stderr: str, n: int):
+    filas = []
+    for linea in stderr.splitlines():
+        if not linea.startswith("import time:") or "cumulative" in linea:
+            continue
+        _, acumulado, modulo = linea[len("import time:"):].split("|")
+        if modulo.startswith("  "):  # import anidado dentro de otro
+            continue
+        filas.append((int(acumulado), modulo.strip()))
+    return sorted(filas, reverse=True)[:n]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corridas", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=None, help="falla si la mediana pasa de esto")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    tiempos, cargados = [], set()
+    for _ in range(args.corridas):
+        p = _correr()
+        ms, mods = _resultado(p.stdout + p.stderr)
+        tiempos.append(ms)
+        cargados.update(mods)
+
+    mediana = statistics.median(tiempos)
+    print(f"create_app(): mediana {mediana:.0f} ms (min {min(tiempos):.0f}, max {max(tiempos):.0f}, n={len(tiempos)})")
+
+    p = _correr(["-X", "importtime"])
+    print("\nImports de primer nivel más caros (acumulado):")
+    for us, modulo in _imports_mas_caros(p.stderr, args.top):
+        print(f"  {us / 1000:8.1f} ms  {modulo}")
+
+    falla = False
+    if cargados:
+        print(f"\nERROR: se cargaron al arrancar: {', '.join(sorted(cargados))}")
+        falla = True
+    if args.max_ms is not None and mediana > args.max_ms:
+        print(f"\nERROR: arranque de {mediana:.0f} ms > {args.max_ms:.0f} ms")
+        falla = True
+    sys.exit(1 if falla else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 ﻿import os
 
+from utils.pool_db import opciones_engine
+
 class Config:
     # Valores por defecto para tu entorno local
     DB_HOST = os.getenv("DB_HOST", "127.0.0.1")
@@ -22,8 +24,28 @@ class Config:
             f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:3306/{DB_NAME}?charset=utf8mb4"
         )
 
+    # 3) Réplicas de lectura opcionales, separadas por coma (ver utils/replicas.py)
+    SQLALCHEMY_REPLICA_URIS = [
+        u.strip().replace("mysql://", "mysql+pymysql://", 1) if u.strip().startswith("mysql://") else u.strip()
+        for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()
+    ]
+
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Pool de conexiones por worker (ver utils/pool_db.py); SQLite usa el suyo
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "280"))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+    SQLALCHEMY_ENGINE_OPTIONS = opciones_engine(
+        SQLALCHEMY_DATABASE_URI, DB_POOL_SIZE, DB_MAX_OVERFLOW,
+        DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING,
+    )
     JWT_SECRET_KEY = os.getenv("JWT_SECRET", "dev-secret")
     CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:4200")
 
+    # migrar | verificar | omitir (ver utils/esquema.py)
+    DB_ESQUEMA_AL_INICIAR = os.getenv("DB_ESQUEMA_AL_INICIAR", "migrar")
+
 
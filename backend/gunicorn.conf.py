@@ -0,0 +1,65 @@
+# gunicorn.conf.py
+"""
+Configuración de gunicorn (start.sh lo usa así: gunicorn -c gunicorn.conf.py wsgi:app).
+
+Variables:
+  - WEB_CONCURRENCY: workers. Default: núcleos de la máquina si hay
+    SOCKETIO_MESSAGE_QUEUE, 1 si no (sin cola los rooms de Socket.IO no se
+    comparten entre procesos, ver utils/cola_socket.py).
+  - GUNICORN_WORKER_CLASS (eventlet), GUNICORN_WORKER_CONNECTIONS (1000):
+    sockets/requests simultáneos por worker.
+  - GUNICORN_PRELOAD (1): crea la app una vez en el master y los workers la
+    heredan por fork. Con preload, `kill -HUP` reinicia los workers de forma
+    ordenada pero NO recarga código; para un deploy hay que reiniciar el master.
+  - GUNICORN_TIMEOUT (60), GUNICORN_GRACEFUL_TIMEOUT (30).
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+_cola = os.getenv("SOCKETIO_MESSAGE_QUEUE", "").strip()
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() if _cola else 1))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "eventlet")
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOGLEVEL", "info")
+
+
+def when_ready(server):
+    if workers > 1 and not _cola:
+        server.log.warning(
+            "WEB_CONCURRENCY=%s sin SOCKETIO_MESSAGE_QUEUE: los mensajes del chat "
+            "solo llegan a los sockets del mismo worker", workers,
+        )
+
+
+def post_fork(server, worker):
+    # el pool de conexiones creado en el master (create_app revisa el esquema)
+    # no se comparte entre procesos: cada worker abre las suyas
+    from wsgi import app
+    from models import db
+    with app.app_context():
+        db.engine.dispose(close=False)
+        if "replicas" in app.extensions:
+            app.extensions["replicas"].dispose()
+
+
+def post_worker_init(worker):
+    # ya con el worker inicializado (eventlet parchado): barrido de vencidos y
+    # escritor del chat, uno por worker
+    from app import iniciar_tareas_de_fondo
+    from wsgi import app
+    iniciar_tareas_de_fondo(app)
+
+
+def worker_exit(server, worker):
+    from utils import escritor_mensajes
+    escritor_mensajes.vaciar_al_cerrar()
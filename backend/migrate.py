@@ -0,0 +1,36 @@
+# migrate.py
+"""
+Aplica las migraciones pendientes del esquema (utils/esquema.py).
+
+    python migrate.py            # migra
+    python migrate.py --estado   # solo muestra la versión y lo pendiente
+"""
+import os
+import sys
+
+# la app se crea sin tocar el esquema; aquí se hace explícito
+os.environ["DB_ESQUEMA_AL_INICIAR"] = "omitir"
+
+from app import create_app  # noqa: E402
+from utils import esquema  # noqa: E402
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        faltan = esquema.pendientes()
+        if "--estado" in sys.argv:
+            print(f"Versión esperada: {esquema.version_esperada():03d}")
+            for version, descripcion in faltan:
+                print(f"  pendiente {version:03d}: {descripcion}")
+            if not faltan:
+                print("Esquema al día")
+            return
+
+        aplicadas = esquema.migrar()
+        print(f"Esquema en versión {esquema.version_esperada():03d}"
+              + (f" ({len(aplicadas)} migraciones aplicadas)" if aplicadas else " (sin cambios)"))
+
+
+if __name__ == "__main__":
+    main()
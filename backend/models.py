@@ -3,7 +3,10 @@ from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from decimal import Decimal
 
-db = SQLAlchemy()
+from utils.replicas import SesionEnrutada
+
+# SesionEnrutada manda las lecturas de vistas @solo_lectura a las réplicas
+db = SQLAlchemy(session_options={"class_": SesionEnrutada})
 
 
 class Usuario(db.Model):
@@ -32,6 +35,10 @@ class Categoria(db.Model):
 
 class Producto(db.Model):
     __tablename__ = 'productos'
+    __table_args__ = (
+        # listado paginado por cursor: WHERE estado = ? ORDER BY fecha_publicacion DESC, id_producto DESC
+        db.Index('idx_productos_estado_fecha', 'estado', 'fecha_publicacion', 'id_producto'),
+    )
 
     id_producto = db.Column(db.Integer, primary_key=True)
     id_usuario = db.Column(db.Integer, db.ForeignKey('usuarios.id_usuario'), nullable=False)
@@ -56,11 +63,14 @@ class Producto(db.Model):
         return self.estado
 
     def to_dict(self, current_user_id=None):
+        # import local: utils.categorias importa models
+        from utils.categorias import nombre_categoria
+
         return {
             'id_producto': self.id_producto,
             'id_usuario': self.id_usuario,
             'id_categoria': self.id_categoria,
-            'categoria_nombre': self.categoria.nombre if self.categoria else None,
+            'categoria_nombre': nombre_categoria(self.id_categoria),
             'titulo': self.titulo,
             'descripcion': self.descripcion,
             'valor_estimado': float(self.valor_estimado),
@@ -74,6 +84,10 @@ class Producto(db.Model):
 
 class Solicitud(db.Model):
     __tablename__ = 'solicitudes'
+    __table_args__ = (
+        # /api/solicitudes/enviadas paginado: WHERE id_solicitante = ? ORDER BY creado DESC, id_solicitud DESC
+        db.Index('idx_solicitudes_solicitante_creado', 'id_solicitante', 'creado', 'id_solicitud'),
+    )
 
     id_solicitud = db.Column(db.Integer, primary_key=True)
     id_solicitante = db.Column(db.Integer, db.ForeignKey('usuarios.id_usuario'), nullable=False)
@@ -95,6 +109,33 @@ class Solicitud(db.Model):
     producto_objetivo = db.relationship('Producto', foreign_keys=[id_producto_objetivo])
     producto_ofrece = db.relationship('Producto', foreign_keys=[id_producto_ofrece])
 
+    @staticmethod
+    def to_cards(solicitudes, current_user_id):
+        """
+        to_card() para una página entera con un número fijo de consultas.
+        Trae de golpe (IN) los productos y usuarios que referencian las
+        tarjetas; quedan en el identity map de la sesión, así que las
+        relaciones many-to-one de to_card ya no van a la BD. La categoría
+        sale del mapa de utils.categorias.
+        """
+        ids_productos = {s.id_producto_objetivo for s in solicitudes}
+        ids_productos |= {s.id_producto_ofrece for s in solicitudes if s.id_producto_ofrece}
+        productos = (
+            Producto.query.filter(Producto.id_producto.in_(ids_productos)).all()
+            if ids_productos else []
+        )
+
+        ids_usuarios = {s.id_solicitante for s in solicitudes}
+        ids_usuarios |= {p.id_usuario for p in productos}
+        usuarios = (
+            Usuario.query.filter(Usuario.id_usuario.in_(ids_usuarios)).all()
+            if ids_usuarios else []
+        )
+
+        # `productos` y `usuarios` siguen vivos mientras se arman las tarjetas:
+        # el identity map solo guarda referencias débiles
+        return [s.to_card(current_user_id) for s in solicitudes]
+
     def to_card(self, current_user_id):
         # usuario “del otro lado” (dueño del producto objetivo)
         receptor_user = self.producto_objetivo.usuario if self.producto_objetivo else None
@@ -139,6 +180,10 @@ class Notificacion(db.Model):
 
 class Intercambio(db.Model):
     __tablename__ = "intercambios"
+    __table_args__ = (
+        # barrido de vencidos: WHERE estado = 'pendiente' AND fecha_limite_confirmacion < ahora
+        db.Index("idx_intercambios_estado_limite", "estado", "fecha_limite_confirmacion"),
+    )
 
     id_intercambio = db.Column(db.Integer, primary_key=True, autoincrement=True)
     id_solicitud = db.Column(db.Integer, db.ForeignKey("solicitudes.id_solicitud"), nullable=False)
@@ -183,6 +228,10 @@ class Intercambio(db.Model):
 
 class IntercambioMensaje(db.Model):
     __tablename__ = "intercambio_mensajes"
+    __table_args__ = (
+        # reconexión del chat: WHERE id_intercambio = ? AND creado >= ? ORDER BY creado, id_mensaje
+        db.Index("idx_mensajes_intercambio_creado", "id_intercambio", "creado", "id_mensaje"),
+    )
 
     id_mensaje = db.Column(db.Integer, primary_key=True, autoincrement=True)
     id_intercambio = db.Column(db.Integer, db.ForeignKey("intercambios.id_intercambio"), nullable=False)
@@ -197,6 +246,8 @@ class IntercambioMensaje(db.Model):
     lat = db.Column(db.Numeric(10, 7), nullable=True)
     lng = db.Column(db.Numeric(10, 7), nullable=True)
     creado = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # uuid que el socket emite antes de que exista id_mensaje (modo lote)
+    id_provisional = db.Column(db.String(32), nullable=True)
 
     intercambio = db.relationship("Intercambio", backref="mensajes")
 
@@ -217,3 +268,62 @@ class HistorialIntercambio(db.Model):
     intercambio = db.relationship("Intercambio", backref="historial")
 
 
+
+
+class Archivo(db.Model):
+    """Archivo subido, guardado como static/uploads/<sha256>.<ext> (ver utils/storage.py)."""
+    __tablename__ = "archivos"
+
+    sha256 = db.Column(db.String(64), primary_key=True)
+    nombre = db.Column(db.String(80), nullable=False)
+    tamano = db.Column(db.BigInteger, nullable=False)
+    # productos cuya imagen_url apunta a este archivo
+    referencias = db.Column(db.Integer, nullable=False, default=0)
+    creado = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class ModeracionResultado(db.Model):
+    """Veredicto de moderación ya calculado, para no volver a preguntarle al modelo."""
+    __tablename__ = "moderacion_resultados"
+    __table_args__ = (
+        # cada proveedor tiene sus propios veredictos: los de "falso" no valen para "openai"
+        db.UniqueConstraint("sha256", "texto_sha256", "proveedor", name="uq_moderacion_imagen_texto_proveedor"),
+    )
+
+    id_resultado = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    sha256 = db.Column(db.String(64), nullable=False)
+    # hash del título + descripción normalizados: el veredicto depende de ambos
+    texto_sha256 = db.Column(db.String(64), nullable=False)
+    # dHash de 64 bits en hex, para imágenes casi iguales
+    phash = db.Column(db.String(16), nullable=False)
+    is_illegal = db.Column(db.Boolean, nullable=False)
+    reason = db.Column(db.String(500), nullable=False, default="")
+    proveedor = db.Column(db.String(20), nullable=False)
+    creado = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class TrabajoModeracion(db.Model):
+    __tablename__ = "trabajos_moderacion"
+
+    id_trabajo = db.Column(db.String(32), primary_key=True)
+    estado = db.Column(
+        db.Enum("pendiente", "procesando", "listo", "error", name="estado_trabajo_moderacion"),
+        nullable=False,
+        default="pendiente",
+    )
+    sha256 = db.Column(db.String(64), nullable=False)
+    is_illegal = db.Column(db.Boolean, nullable=True)
+    reason = db.Column(db.String(500), nullable=True)
+    # "exacto" / "perceptual" si salió del caché; None si lo respondió el proveedor
+    cache = db.Column(db.String(20), nullable=True)
+    error = db.Column(db.String(255), nullable=True)
+    creado = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    terminado = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        data = {"id_trabajo": self.id_trabajo, "estado": self.estado}
+        if self.estado == "listo":
+            data.update({"is_illegal": self.is_illegal, "reason": self.reason or "", "cache": self.cache})
+        elif self.estado == "error":
+            data["error"] = self.error
+        return data
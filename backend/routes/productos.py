@@ -2,6 +2,13 @@
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
 from models import db, Producto, Categoria
+from utils.categorias import nombre_categoria
+from utils.facetas import aplicar_filtros, calcular_facetas
+from utils.imagenes import urls_variantes
+from utils.busqueda import aplicar_busqueda, indexar_producto
+from utils import storage, sugerencias
+from utils.replicas import solo_lectura
+from utils.paginacion import CursorInvalido, leer_bool, leer_limite, paginar_keyset, paginar_offset
 
 bp_productos = Blueprint("productos", __name__, url_prefix="/api/productos")
 bp_prod = bp_productos   # alias usado en app.py
@@ -9,9 +16,8 @@ bp = bp_productos
 
 
 def _producto_to_dict(p: Producto, current_user_id: int | None = None):
-    # Obtener nombre de categoría por id_categoria
-    cat = Categoria.query.get(p.id_categoria)
-    categoria_nombre = cat.nombre if cat else None
+    # Nombre de categoría desde el mapa en memoria (sin consulta por producto)
+    categoria_nombre = nombre_categoria(p.id_categoria)
 
     return {
         "id_producto": p.id_producto,
@@ -22,6 +28,8 @@ def _producto_to_dict(p: Producto, current_user_id: int | None = None):
         "descripcion": p.descripcion,
         "valor_estimado": float(p.valor_estimado or 0),
         "imagen_url": p.imagen_url,
+        # thumb/card/full en webp y jpg; None mientras no estén generadas
+        "imagenes": urls_variantes(p.imagen_url),
         "ubicacion": p.ubicacion,
         "estado": p.estado,
         "es_tuyo": bool(current_user_id and p.id_usuario == current_user_id),
@@ -30,6 +38,7 @@ def _producto_to_dict(p: Producto, current_user_id: int | None = None):
 
 @bp_productos.route("", methods=["GET"])
 @jwt_required(optional=True)
+@solo_lectura
 def listar_productos():
     """
     Lista productos con filtros.
@@ -39,6 +48,14 @@ def listar_productos():
       - solo_mios=1
       - solo_otros=1
       - incluir_bajas=1
+      - limit (int, default 20, máx 100)
+      - cursor (str): el next_cursor de la página anterior
+      - todos=1: comportamiento viejo, lista completa sin paginar
+      - facetas=1: agrega conteos por categoría, estado, rango de valor y
+        ubicación (solo en la respuesta paginada)
+
+    Respuesta paginada: { items: [...], next_cursor: str | null, limit: int }
+    Con todos=1 se regresa la lista plana como antes.
     """
     current_user_id_raw = get_jwt_identity()
     try:
@@ -52,34 +69,77 @@ def listar_productos():
     solo_otros = request.args.get("solo_otros")
     incluir_bajas = request.args.get("incluir_bajas")
 
-    query = Producto.query
+    # filtros por usuario
+    base = Producto.query
+    if current_user_id:
+        if solo_mios:
+            base = base.filter(Producto.id_usuario == current_user_id)
+        elif solo_otros:
+            base = base.filter(Producto.id_usuario != current_user_id)
 
-    # búsqueda texto
+    # categoría y estado (por defecto solo disponibles); van aparte porque
+    # las facetas cuentan cada una sin su propio filtro
+    filtros = {}
+    if id_categoria:
+        filtros["id_categoria"] = id_categoria
+    if not incluir_bajas:
+        filtros["estado"] = "disponible"
+    query = aplicar_filtros(base, filtros)
+
+    # búsqueda texto (índice FULLTEXT / índice invertido, ordenado por
+    # relevancia). Va al final: el tope de resultados se aplica ya filtrado
+    orden_relevancia = None
     if q:
-        like = f"%{q}%"
-        query = query.filter(
-            (Producto.titulo.ilike(like)) |
-            (Producto.descripcion.ilike(like))
-        )
+        query, orden_relevancia = aplicar_busqueda(query, q)
 
-    # categoría
-    if id_categoria:
-        query = query.filter(Producto.id_categoria == id_categoria)
+    if leer_bool(request.args.get("todos")):
+        orden = orden_relevancia or [Producto.fecha_publicacion.desc()]
+        productos = query.order_by(*orden).all()
+        data = [_producto_to_dict(p, current_user_id) for p in productos]
+        return jsonify(data), 200
 
-    # por defecto solo disponibles
-    if not incluir_bajas:
-        query = query.filter(Producto.estado == "disponible")
+    limite = leer_limite(request.args.get("limit"))
+    cursor = request.args.get("cursor")
+    try:
+        if orden_relevancia:
+            productos, next_cursor = paginar_offset(
+                query.order_by(*orden_relevancia), cursor, limite
+            )
+        else:
+            productos, next_cursor = paginar_keyset(
+                query,
+                Producto.fecha_publicacion,
+                Producto.id_producto,
+                cursor,
+                limite,
+            )
+    except CursorInvalido:
+        return jsonify({"error": "cursor inválido"}), 400
+
+    respuesta = {
+        "items": [_producto_to_dict(p, current_user_id) for p in productos],
+        "next_cursor": next_cursor,
+        "limit": limite,
+    }
+    if leer_bool(request.args.get("facetas")):
+        if q:
+            base, _ = aplicar_busqueda(base, q)
+        respuesta["facetas"] = calcular_facetas(base, filtros)
+    return jsonify(respuesta), 200
 
-    # filtros por usuario
-    if current_user_id:
-        if solo_mios:
-            query = query.filter(Producto.id_usuario == current_user_id)
-        elif solo_otros:
-            query = query.filter(Producto.id_usuario != current_user_id)
 
-    productos = query.order_by(Producto.fecha_publicacion.desc()).all()
-    data = [_producto_to_dict(p, current_user_id) for p in productos]
-    return jsonify(data), 200
+@bp_productos.route("/sugerencias", methods=["GET"])
+def sugerir_productos():
+    """
+    Autocompletado para la caja de búsqueda.
+    Query params:
+      - q (texto parcial, tolera acentos y errores de dedo)
+      - limit (int, default 8, máx 20)
+    Sale del índice en memoria de utils/sugerencias, no consulta la BD.
+    """
+    q = request.args.get("q", type=str) or ""
+    limite = leer_limite(request.args.get("limit"), por_defecto=8, maximo=20)
+    return jsonify(sugerencias.obtener_indice().sugerir(q, limite)), 200
 
 
 @bp_productos.route("", methods=["POST"])
@@ -140,7 +200,10 @@ def crear_producto():
     )
 
     db.session.add(nuevo)
+    storage.cambiar_referencia(None, imagen_url)
     db.session.commit()
+    indexar_producto(nuevo)
+    sugerencias.registrar_titulo(nuevo.titulo)
 
     return jsonify(_producto_to_dict(nuevo, current_user_id)), 201
 
@@ -184,9 +247,13 @@ def actualizar_producto(id_producto: int):
         p.ubicacion = data["ubicacion"]
 
     if "imagen_url" in data:
+        storage.cambiar_referencia(p.imagen_url, data["imagen_url"])
         p.imagen_url = data["imagen_url"]
 
     db.session.commit()
+    indexar_producto(p)
+    if "titulo" in data:
+        sugerencias.registrar_titulo(p.titulo)
     return jsonify(_producto_to_dict(p, current_user_id)), 200
 
 
@@ -223,6 +290,7 @@ def cambiar_estado_producto(id_producto: int):
 
     p.estado = nuevo_estado
     db.session.commit()
+    indexar_producto(p)
 
     print("DEBUG nuevo estado:", nuevo_estado)
 
@@ -1,7 +1,9 @@
 # routes_admin.py
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db, Usuario, Categoria, Intercambio, HistorialIntercambio, Producto
+from utils import pool_db
+from utils.categorias import invalidar_categorias
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/api/admin")
 
@@ -157,6 +159,7 @@ def admin_create_categoria():
     nueva = Categoria(nombre=nombre, descripcion=descripcion)
     db.session.add(nueva)
     db.session.commit()
+    invalidar_categorias()
 
     return jsonify({
         "id_categoria": nueva.id_categoria,
@@ -164,3 +167,18 @@ def admin_create_categoria():
         "descripcion": nueva.descripcion
     }), 201
 
+
+# ================= SALUD DE LA BD ===================
+
+@admin_bp.route("/health/db", methods=["GET"])
+@jwt_required()
+def admin_health_db():
+    """Ping + checkouts/esperas/timeouts del pool de este worker y estado de cada réplica."""
+    admin = _require_admin()
+    if not admin:
+        return jsonify({"error": "No autorizado"}), 403
+
+    datos = pool_db.metricas(db.engine)
+    if "replicas" in current_app.extensions:
+        datos["replicas"] = current_app.extensions["replicas"].estado()
+    return jsonify(datos), 200 if datos["ok"] else 503
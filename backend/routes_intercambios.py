@@ -1,16 +1,22 @@
 # routes_intercambios.py
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy import or_
 from datetime import datetime, timedelta
 
 from models import db, Intercambio, IntercambioMensaje, Producto, Usuario
+from utils import sesiones_socket
+from utils.imagenes import urls_variantes
+from utils.paginacion import leer_bool, leer_limite
+from utils.replicas import solo_lectura
 
 # 👇 importa tu instancia de socketio (ajusta si tu app se llama distinto)
 from app import socketio
 
 bp_intercambios = Blueprint("intercambios", __name__, url_prefix="/api/intercambios")
 
+MENSAJES_POR_PAGINA = 50
+
 
 def usuario_to_dict(u: Usuario):
     if not u:
@@ -37,33 +43,95 @@ def producto_to_card(p: Producto):
         "id_producto": p.id_producto,
         "titulo": p.titulo,
         "imagen": getattr(p, "imagen_url", None),
+        "imagenes": urls_variantes(getattr(p, "imagen_url", None)),
         "precio": float(p.valor_estimado) if getattr(p, "valor_estimado", None) is not None else None,
     }
 
 
-def _serializar_intercambio(i: Intercambio, id_usuario_actual: int):
-    usuario_ofrece = Usuario.query.get(i.id_usuario_ofrece)
-    usuario_recibe = Usuario.query.get(i.id_usuario_recibe)
-    prod_ofrece = Producto.query.get(i.id_producto_ofrecido) if i.id_producto_ofrecido else None
-    prod_solicita = Producto.query.get(i.id_producto_solicitado)
-
-    soy_ofertante = (i.id_usuario_ofrece == id_usuario_actual)
+def _precargar(intercambios, ids_usuarios_extra=()):
+    """
+    Trae con dos consultas IN todos los usuarios y productos que aparecen en
+    la lista de intercambios. Regresa (usuarios_por_id, productos_por_id).
+    """
+    ids_usuarios = set(ids_usuarios_extra)
+    ids_productos = set()
+    for i in intercambios:
+        ids_usuarios.update((i.id_usuario_ofrece, i.id_usuario_recibe))
+        ids_productos.add(i.id_producto_solicitado)
+        if i.id_producto_ofrecido:
+            ids_productos.add(i.id_producto_ofrecido)
+
+    usuarios = {}
+    if ids_usuarios:
+        usuarios = {
+            u.id_usuario: u
+            for u in Usuario.query.filter(Usuario.id_usuario.in_(ids_usuarios)).all()
+        }
+    productos = {}
+    if ids_productos:
+        productos = {
+            p.id_producto: p
+            for p in Producto.query.filter(Producto.id_producto.in_(ids_productos)).all()
+        }
+    return usuarios, productos
+
+
+def serializar_intercambios(intercambios, id_usuario_actual: int, detalle: bool = False):
+    """
+    Serializador común de intercambios, sin consultas por fila.
+    - detalle=False: forma de los listados (/en_proceso, /historial)
+    - detalle=True: forma del detalle y de los eventos de socket
+    """
+    usuarios, productos = _precargar(intercambios, (id_usuario_actual,))
+    usuario_actual = usuarios.get(id_usuario_actual)
 
-    return {
-        "id_intercambio": i.id_intercambio,
-        "estado": i.estado,
-        "estado_solicitante": i.estado_solicitante,
-        "estado_receptor": i.estado_receptor,
-        "diferencia_monetaria": str(i.diferencia_monetaria),
-        "yo_soy_ofertante": soy_ofertante,
-        "usuario_ofrece": usuario_to_dict(usuario_ofrece),
-        "usuario_recibe": usuario_to_dict(usuario_recibe),
-        "producto_ofrece": producto_to_card(prod_ofrece),
-        "producto_objetivo": producto_to_card(prod_solicita),
-        "fecha_limite_confirmacion": (
+    resultado = []
+    for i in intercambios:
+        soy_ofertante = (i.id_usuario_ofrece == id_usuario_actual)
+        usuario_ofrece = usuarios.get(i.id_usuario_ofrece)
+        usuario_recibe = usuarios.get(i.id_usuario_recibe)
+        prod_ofrece = productos.get(i.id_producto_ofrecido) if i.id_producto_ofrecido else None
+        prod_solicita = productos.get(i.id_producto_solicitado)
+        fecha_limite = (
             i.fecha_limite_confirmacion.isoformat() if i.fecha_limite_confirmacion else None
-        ),
-    }
+        )
+
+        if detalle:
+            resultado.append({
+                "id_intercambio": i.id_intercambio,
+                "estado": i.estado,
+                "estado_solicitante": i.estado_solicitante,
+                "estado_receptor": i.estado_receptor,
+                "diferencia_monetaria": str(i.diferencia_monetaria),
+                "yo_soy_ofertante": soy_ofertante,
+                "usuario_ofrece": usuario_to_dict(usuario_ofrece),
+                "usuario_recibe": usuario_to_dict(usuario_recibe),
+                "producto_ofrece": producto_to_card(prod_ofrece),
+                "producto_objetivo": producto_to_card(prod_solicita),
+                "fecha_limite_confirmacion": fecha_limite,
+            })
+        else:
+            otro = usuario_recibe if soy_ofertante else usuario_ofrece
+            resultado.append({
+                "id_intercambio": i.id_intercambio,
+                "estado": i.estado,
+                "estado_solicitante": i.estado_solicitante,
+                "estado_receptor": i.estado_receptor,
+                "diferencia_monetaria": str(i.diferencia_monetaria),
+                "soy_ofertante": soy_ofertante,
+                "yo": usuario_to_dict(usuario_actual),
+                "otro": usuario_to_dict(otro),
+                "producto_ofrece": producto_to_card(prod_ofrece),
+                "producto_objetivo": producto_to_card(prod_solicita),
+                "fecha_solicitud": i.fecha_solicitud.isoformat() if i.fecha_solicitud else None,
+                "fecha_limite_confirmacion": fecha_limite,
+            })
+
+    return resultado
+
+
+def _serializar_intercambio(i: Intercambio, id_usuario_actual: int):
+    return serializar_intercambios([i], id_usuario_actual, detalle=True)[0]
 
 
 # --------------------------------------------------------
@@ -71,6 +139,7 @@ def _serializar_intercambio(i: Intercambio, id_usuario_actual: int):
 # --------------------------------------------------------
 @bp_intercambios.route("/en_proceso", methods=["GET"])
 @jwt_required()
+@solo_lectura
 def listar_en_proceso():
     raw = get_jwt_identity()
     try:
@@ -91,43 +160,14 @@ def listar_en_proceso():
         .all()
     )
 
-    usuario_actual = Usuario.query.get(id_usuario_actual)
-
-    resultado = []
-    for i in intercambios:
-        soy_ofertante = (i.id_usuario_ofrece == id_usuario_actual)
-
-        usuario_ofrece = Usuario.query.get(i.id_usuario_ofrece)
-        usuario_recibe = Usuario.query.get(i.id_usuario_recibe)
-        otro = usuario_recibe if soy_ofertante else usuario_ofrece
-
-        prod_ofrece = Producto.query.get(i.id_producto_ofrecido) if i.id_producto_ofrecido else None
-        prod_solicita = Producto.query.get(i.id_producto_solicitado)
-
-        resultado.append({
-            "id_intercambio": i.id_intercambio,
-            "estado": i.estado,
-            "estado_solicitante": i.estado_solicitante,
-            "estado_receptor": i.estado_receptor,
-            "diferencia_monetaria": str(i.diferencia_monetaria),
-            "soy_ofertante": soy_ofertante,
-            "yo": usuario_to_dict(usuario_actual),
-            "otro": usuario_to_dict(otro),
-            "producto_ofrece": producto_to_card(prod_ofrece),
-            "producto_objetivo": producto_to_card(prod_solicita),
-            "fecha_solicitud": i.fecha_solicitud.isoformat() if i.fecha_solicitud else None,
-            "fecha_limite_confirmacion": (
-                i.fecha_limite_confirmacion.isoformat() if i.fecha_limite_confirmacion else None
-            ),
-        })
-
-    return jsonify(resultado), 200
+    return jsonify(serializar_intercambios(intercambios, id_usuario_actual)), 200
 
 # --------------------------------------------------------
 # HISTORIAL DE INTERCAMBIOS (ya aceptados)
 # --------------------------------------------------------
 @bp_intercambios.route("/historial", methods=["GET"])
 @jwt_required()
+@solo_lectura
 def historial_intercambios():
     raw = get_jwt_identity()
     try:
@@ -148,37 +188,7 @@ def historial_intercambios():
         .all()
     )
 
-    usuario_actual = Usuario.query.get(id_usuario_actual)
-
-    resultado = []
-    for i in intercambios:
-        soy_ofertante = (i.id_usuario_ofrece == id_usuario_actual)
-
-        usuario_ofrece = Usuario.query.get(i.id_usuario_ofrece)
-        usuario_recibe = Usuario.query.get(i.id_usuario_recibe)
-        otro = usuario_recibe if soy_ofertante else usuario_ofrece
-
-        prod_ofrece = Producto.query.get(i.id_producto_ofrecido) if i.id_producto_ofrecido else None
-        prod_solicita = Producto.query.get(i.id_producto_solicitado)
-
-        resultado.append({
-            "id_intercambio": i.id_intercambio,
-            "estado": i.estado,
-            "estado_solicitante": i.estado_solicitante,
-            "estado_receptor": i.estado_receptor,
-            "diferencia_monetaria": str(i.diferencia_monetaria),
-            "soy_ofertante": soy_ofertante,
-            "yo": usuario_to_dict(usuario_actual),
-            "otro": usuario_to_dict(otro),
-            "producto_ofrece": producto_to_card(prod_ofrece),
-            "producto_objetivo": producto_to_card(prod_solicita),
-            "fecha_solicitud": i.fecha_solicitud.isoformat() if i.fecha_solicitud else None,
-            "fecha_limite_confirmacion": (
-                i.fecha_limite_confirmacion.isoformat() if i.fecha_limite_confirmacion else None
-            ),
-        })
-
-    return jsonify(resultado), 200
+    return jsonify(serializar_intercambios(intercambios, id_usuario_actual)), 200
 
 
 
@@ -187,6 +197,7 @@ def historial_intercambios():
 # --------------------------------------------------------
 @bp_intercambios.route("/<int:id_intercambio>", methods=["GET"])
 @jwt_required()
+@solo_lectura
 def obtener_intercambio(id_intercambio):
     raw = get_jwt_identity()
     try:
@@ -199,36 +210,8 @@ def obtener_intercambio(id_intercambio):
     if id_usuario_actual not in (i.id_usuario_ofrece, i.id_usuario_recibe):
         return jsonify({"msg": "No participas en este intercambio"}), 403
 
-    # 👇 penalización si ya se pasó el tiempo y solo uno confirmó
-    ahora = datetime.utcnow()
-    if (
-        i.fecha_limite_confirmacion
-        and i.fecha_limite_confirmacion < ahora
-        and i.estado == "pendiente"
-    ):
-        sol_acepto = (i.estado_solicitante == "aceptado")
-        rec_acepto = (i.estado_receptor == "aceptado")
-
-        # XOR: exactamente uno aceptó
-        if sol_acepto ^ rec_acepto:
-            if sol_acepto:
-                id_no_confirmo = i.id_usuario_recibe
-            else:
-                id_no_confirmo = i.id_usuario_ofrece
-
-            usuario = Usuario.query.get(id_no_confirmo)
-            if usuario and usuario.verificado:
-                usuario.verificado = False  # verificado = 0
-                i.estado = "cancelado"
-                i.fecha_limite_confirmacion = None
-                db.session.commit()
-
-                room = f"intercambio_{i.id_intercambio}"
-                socketio.emit("intercambio_penalizado", {
-                    "id_intercambio": i.id_intercambio,
-                    "id_usuario_penalizado": id_no_confirmo
-                }, room=room)
-
+    # la penalización por confirmación vencida la hace utils/vencimientos en segundo plano;
+    # este GET ya no escribe
     data = _serializar_intercambio(i, id_usuario_actual)
     return jsonify(data), 200
 
@@ -238,7 +221,24 @@ def obtener_intercambio(id_intercambio):
 # --------------------------------------------------------
 @bp_intercambios.route("/<int:id_intercambio>/mensajes", methods=["GET"])
 @jwt_required()
+@solo_lectura
 def listar_mensajes(id_intercambio):
+    """
+    Historial del chat, siempre en orden cronológico.
+    Query params:
+      - limit (default 50, máx 200)
+      - before=<id_mensaje>: página anterior a ese mensaje
+      - after_id=<id_mensaje> (o after): solo los mensajes nuevos desde ese id,
+        para clientes que reconectan
+      - after_fecha=<creado>: los mensajes con creado desde ese segundo (se
+        incluye el segundo completo). Es la reconexión que sirve también con
+        CHAT_PERSISTENCIA=lote, donde el socket emite id_mensaje null: el
+        cliente manda el creado de su último mensaje y descarta los
+        id_provisional que ya tiene.
+      - todos=1: historial completo, como antes
+    Sin before/after regresa los últimos `limit` mensajes.
+    El header X-Hay-Mas indica si quedaron mensajes fuera de la página.
+    """
     raw = get_jwt_identity()
     try:
         id_usuario_actual = int(raw)
@@ -250,17 +250,61 @@ def listar_mensajes(id_intercambio):
     if id_usuario_actual not in (intercambio.id_usuario_ofrece, intercambio.id_usuario_recibe):
         return jsonify({"msg": "No participas en este intercambio"}), 403
 
-    mensajes = (
-        IntercambioMensaje.query
-        .filter_by(id_intercambio=id_intercambio)
-        .order_by(IntercambioMensaje.creado.asc())
-        .all()
-    )
+    query = IntercambioMensaje.query.filter_by(id_intercambio=id_intercambio)
+    after_id = request.args.get("after_id", type=int)
+    if after_id is None:
+        after_id = request.args.get("after", type=int)
+    before = request.args.get("before", type=int)
+    after_fecha = request.args.get("after_fecha")
+    if after_fecha is not None:
+        try:
+            # MySQL guarda DATETIME sin fracción: se compara desde el segundo
+            after_fecha = datetime.fromisoformat(after_fecha).replace(microsecond=0, tzinfo=None)
+        except ValueError:
+            return jsonify({"error": "after_fecha inválida"}), 400
+
+    if leer_bool(request.args.get("todos")):
+        mensajes = query.order_by(IntercambioMensaje.creado.asc()).all()
+        hay_mas = False
+    elif after_id is not None:
+        # delta para clientes que reconectan: solo lo posterior a su último id
+        limite = leer_limite(request.args.get("limit"), por_defecto=MENSAJES_POR_PAGINA, maximo=200)
+        filas = (
+            query.filter(IntercambioMensaje.id_mensaje > after_id)
+            .order_by(IntercambioMensaje.id_mensaje.asc())
+            .limit(limite + 1)
+            .all()
+        )
+        hay_mas = len(filas) > limite
+        mensajes = filas[:limite]
+    elif after_fecha is not None:
+        limite = leer_limite(request.args.get("limit"), por_defecto=MENSAJES_POR_PAGINA, maximo=200)
+        filas = (
+            query.filter(IntercambioMensaje.creado >= after_fecha)
+            .order_by(IntercambioMensaje.creado.asc(), IntercambioMensaje.id_mensaje.asc())
+            .limit(limite + 1)
+            .all()
+        )
+        hay_mas = len(filas) > limite
+        mensajes = filas[:limite]
+    else:
+        # los más recientes (o los anteriores a `before`), regresados en orden cronológico
+        limite = leer_limite(request.args.get("limit"), por_defecto=MENSAJES_POR_PAGINA, maximo=200)
+        if before is not None:
+            query = query.filter(IntercambioMensaje.id_mensaje < before)
+        filas = (
+            query.order_by(IntercambioMensaje.id_mensaje.desc())
+            .limit(limite + 1)
+            .all()
+        )
+        hay_mas = len(filas) > limite
+        mensajes = list(reversed(filas[:limite]))
 
     data = []
     for m in mensajes:
         data.append({
             "id_mensaje": m.id_mensaje,
+            "id_provisional": m.id_provisional,
             "id_intercambio": m.id_intercambio,
             "id_usuario": m.id_usuario,
             "tipo": m.tipo,
@@ -270,7 +314,7 @@ def listar_mensajes(id_intercambio):
             "creado": m.creado.isoformat(),
         })
 
-    return jsonify(data), 200
+    return jsonify(data), 200, {"X-Hay-Mas": "1" if hay_mas else "0"}
 
 
 # --------------------------------------------------------
@@ -309,6 +353,7 @@ def cancelar_intercambio(id_intercambio):
         "id_intercambio": intercambio.id_intercambio,
         "estado": intercambio.estado
     }, room=room)
+    sesiones_socket.revocar_intercambio(intercambio.id_intercambio, socketio)
 
     return jsonify({"msg": "Intercambio cancelado", "estado": intercambio.estado}), 200
 
@@ -0,0 +1,62 @@
+# backend/routes_media.py
+"""
+Servido de /static/uploads con cabeceras de caché.
+
+Esta regla es más específica que la /static/<path> de Flask, así que las
+imágenes subidas pasan por aquí y el resto de static/ sigue igual.
+
+  - Nombres por contenido (<sha256>.<ext>, <sha256>_<variante>.<fmt>): el
+    ETag es el propio hash y se sirven con
+    Cache-Control: public, max-age=1 año, immutable. Los bytes de ese nombre
+    no pueden cambiar nunca.
+  - Nombres viejos (<timestamp>_<nombre>): ETag de werkzeug y
+    max-age=MEDIA_MAX_AGE_LEGADO.
+
+send_from_directory(conditional=True) responde 304 a If-None-Match /
+If-Modified-Since y 206 a Range. El archivo se entrega como file_wrapper:
+gunicorn lo manda con sendfile(). Detrás de nginx o Apache se puede dejar el
+envío al proxy:
+  - MEDIA_X_ACCEL_PREFIX=/_uploads/  -> X-Accel-Redirect (nginx, location internal)
+  - MEDIA_X_SENDFILE=1               -> X-Sendfile (Apache/lighttpd)
+"""
+import os
+import re
+
+from flask import Blueprint, abort, current_app, send_from_directory
+from werkzeug.security import safe_join
+
+bp_media = Blueprint("media", __name__)
+
+UN_ANIO = 365 * 24 * 3600
+MEDIA_MAX_AGE_LEGADO = int(os.getenv("MEDIA_MAX_AGE_LEGADO", "3600"))
+MEDIA_X_ACCEL_PREFIX = os.getenv("MEDIA_X_ACCEL_PREFIX", "")
+
+_POR_CONTENIDO = re.compile(r"^([0-9a-f]{64}(?:_[a-z]+)?)\.[a-z0-9]+$")
+
+
+def _carpeta_uploads() -> str:
+    return os.path.join(current_app.static_folder, "uploads")
+
+
+@bp_media.route("/static/uploads/<path:nombre>", methods=["GET", "HEAD"])
+def servir_upload(nombre: str):
+    carpeta = _carpeta_uploads()
+    ruta = safe_join(carpeta, nombre)
+    if ruta is None or not os.path.isfile(ruta):
+        abort(404)
+
+    m = _POR_CONTENIDO.match(nombre)
+    if MEDIA_X_ACCEL_PREFIX:
+        resp = current_app.response_class()
+        resp.headers["X-Accel-Redirect"] = MEDIA_X_ACCEL_PREFIX.rstrip("/") + "/" + nombre
+        resp.headers.pop("Content-Type", None)  # que nginx ponga el del archivo
+    elif m:
+        resp = send_from_directory(carpeta, nombre, conditional=True, etag=m.group(1), max_age=UN_ANIO)
+    else:
+        resp = send_from_directory(carpeta, nombre, conditional=True, max_age=MEDIA_MAX_AGE_LEGADO)
+
+    if m:
+        resp.headers["Cache-Control"] = f"public, max-age={UN_ANIO}, immutable"
+    else:
+        resp.headers["Cache-Control"] = f"public, max-age={MEDIA_MAX_AGE_LEGADO}"
+    return resp
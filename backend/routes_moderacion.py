@@ -1,110 +1,86 @@
 # backend/routes_moderacion.py
 
-import base64
-import json
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
-from openai import OpenAI
 
-bp_moderacion = Blueprint("moderacion", __name__, url_prefix="/api/moderacion")
+from models import db, TrabajoModeracion
+from utils import cola_moderacion
+from utils.moderacion import ModeracionNoDisponible
+from utils.subidas import hash_stream
 
-# Usa la API key desde la variable de entorno OPENAI_API_KEY
-client = OpenAI()
+bp_moderacion = Blueprint("moderacion", __name__, url_prefix="/api/moderacion")
 
 
-@bp_moderacion.route("/imagen", methods=["POST"])
-@jwt_required(optional=True)
-def moderar_imagen():
+def _leer_subida():
     """
-    Analiza una imagen (y opcionalmente título/descripcion) para decidir
-    si el producto es legal o ilegal para publicar en la app.
-
-    Espera un FormData con:
-      - archivo: File (imagen)
-      - titulo: string (opcional)
-      - descripcion: string (opcional)
+    (datos, None) o (None, respuesta de error). datos = sha, stream del
+    archivo, título y descripción.
     """
-
     if "archivo" not in request.files:
-        return jsonify({"ok": False, "error": "No se envió archivo"}), 400
+        return None, (jsonify({"ok": False, "error": "No se envió archivo"}), 400)
 
+    # el archivo ya viene en un SpooledTemporaryFile (utils/subidas.py): se lee
+    # por bloques y al modelo se manda una copia reducida, no el original
     file = request.files["archivo"]
-    raw = file.read()
-    if not raw:
-        return jsonify({"ok": False, "error": "Archivo vacío"}), 400
+    sha, tamano = hash_stream(file.stream)
+    if not tamano:
+        return None, (jsonify({"ok": False, "error": "Archivo vacío"}), 400)
 
     # Texto adicional
     titulo = request.form.get("titulo") or ""
     descripcion = request.form.get("descripcion") or ""
+    return (sha, file.stream, titulo, descripcion), None
 
-    # Pasamos la imagen como base64 data URL
-    b64 = base64.b64encode(raw).decode("utf-8")
-    data_url = f"data:{file.mimetype};base64,{b64}"
-
-    system_prompt = """
-Eres un moderador de contenido para una aplicación de trueque de productos.
 
-Tu tarea es decidir si un producto es LEGAL o ILEGAL para publicar,
-basándote en la IMAGEN y en el TEXTO que te damos (título y descripción).
+def _imagen_invalida():
+    return jsonify({"ok": False, "error": "El archivo no es una imagen válida"}), 400
 
-CONSIDERA ILEGAL (DEBES BLOQUEAR) cualquier producto que parezca ser:
-- Drogas o sustancias ilegales (marihuana, cocaína, cristal, etc.).
-- Vapes, cigarros electrónicos, pods, cartuchos, juul, etc.
-- Cigarros de tabaco tradicionales, puros, tabaco para fumar, etc.
-- Bebidas alcohólicas (cerveza, vino, tequila, vodka, whisky, ron, mezcal, etc.).
-- Armas de fuego (pistolas, rifles, escopetas), municiones.
-- Armas blancas peligrosas (cuchillos tácticos, navajas automáticas, machetes de combate).
-- Explosivos, fuegos artificiales peligrosos o pirotecnia fuerte.
-- Medicamentos controlados o con receta, frascos de pastillas sospechosas.
-- Documentos personales: INE, pasaporte, licencia, tarjeta bancaria, etc.
-- Productos sexuales explícitos o para adultos.
 
-SI HAY CUALQUIER DUDA razonable de que pueda ser de estas categorías,
-clasifica como ILEGAL.
+@bp_moderacion.route("/imagen", methods=["POST"])
+@jwt_required(optional=True)
+def moderar_imagen():
+    """
+    Analiza una imagen (y opcionalmente título/descripcion) para decidir
+    si el producto es legal o ilegal para publicar en la app.
 
-Responde SIEMPRE y SOLO en JSON con este formato EXACTO:
-{
-  "is_illegal": true o false,
-  "reason": "explicación corta en español"
-}
-"""
+    Espera un FormData con:
+      - archivo: File (imagen)
+      - titulo: string (opcional)
+      - descripcion: string (opcional)
 
-    user_content = f"Título: {titulo}\nDescripción: {descripcion}\nAnaliza si el producto parece ilegal según las reglas."
+    Síncrona: encola el trabajo y espera el veredicto (instantáneo si lo
+    resuelve el filtro de texto o la caché). Para no bloquear, usar POST /trabajos.
+    """
+    datos, error = _leer_subida()
+    if error:
+        return error
+    sha, stream, titulo, descripcion = datos
 
     try:
-        resp = client.chat.completions.create(
-            model="gpt-4.1-mini",
-            response_format={"type": "json_object"},
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": user_content},
-                        {
-                            "type": "input_image",
-                            "image_url": {"url": data_url}
-                        },
-                    ],
-                },
-            ],
-            max_tokens=128,
-        )
-
-        content = resp.choices[0].message.content
-        data = json.loads(content)
-
-        is_illegal = bool(data.get("is_illegal"))
-        reason = data.get("reason") or ""
+        trabajo = cola_moderacion.encolar(stream, sha, titulo, descripcion)
+        trabajo = cola_moderacion.esperar(trabajo)
 
         return jsonify(
             {
                 "ok": True,
-                "is_illegal": is_illegal,
-                "reason": reason,
+                "is_illegal": trabajo.is_illegal,
+                "reason": trabajo.reason or "",
+                "sha256": sha,
             }
         ), 200
 
+    except ValueError:
+        return _imagen_invalida()
+
+    except (ModeracionNoDisponible, cola_moderacion.ColaLlena) as e:
+        print("WARN moderación no disponible:", e)
+        return jsonify(
+            {
+                "ok": False,
+                "error": "La moderación con IA no está disponible",
+            }
+        ), 503
+
     except Exception as e:
         print("ERROR moderando imagen:", e)
         return jsonify(
@@ -114,3 +90,49 @@ Responde SIEMPRE y SOLO en JSON con este formato EXACTO:
             }
         ), 500
 
+
+@bp_moderacion.route("/trabajos", methods=["POST"])
+@jwt_required(optional=True)
+def crear_trabajo_moderacion():
+    """
+    Mismo FormData que /imagen, pero regresa de inmediato:
+      - 202 {id_trabajo, estado: "pendiente"}; consultar GET /trabajos/<id>
+      - 200 {id_trabajo, estado: "listo", is_illegal, reason, cache} si se resolvió sin
+        el modelo (cache = texto | exacto | perceptual)
+    """
+    datos, error = _leer_subida()
+    if error:
+        return error
+    sha, stream, titulo, descripcion = datos
+
+    try:
+        trabajo = cola_moderacion.encolar(stream, sha, titulo, descripcion)
+    except ValueError:
+        return _imagen_invalida()
+    except cola_moderacion.ColaLlena as e:
+        print("WARN cola de moderación llena:", e)
+        return jsonify({"ok": False, "error": "Demasiadas imágenes en revisión, intenta de nuevo"}), 503
+    except ModeracionNoDisponible as e:
+        print("WARN moderación no disponible:", e)
+        return jsonify({"ok": False, "error": "La moderación con IA no está disponible"}), 503
+
+    return jsonify(trabajo.to_dict()), 200 if trabajo.estado == "listo" else 202
+
+
+@bp_moderacion.route("/trabajos/<id_trabajo>", methods=["GET"])
+@jwt_required(optional=True)
+def obtener_trabajo_moderacion(id_trabajo: str):
+    trabajo = db.session.get(TrabajoModeracion, id_trabajo)
+    if trabajo is None:
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+    return jsonify(trabajo.to_dict()), 200
+
+
+@bp_moderacion.route("/estadisticas", methods=["GET"])
+@jwt_required(optional=True)
+def estadisticas_moderacion():
+    """
+    Cuántos trabajos resolvió cada nivel (texto, en_curso, exacto, perceptual,
+    modelo) y la tasa de cada uno. Los contadores son de este worker.
+    """
+    return jsonify(cola_moderacion.estadisticas()), 200
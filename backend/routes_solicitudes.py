@@ -1,12 +1,13 @@
 ﻿# routes_solicitudes.py
 
 from decimal import Decimal
-from sqlalchemy import text
+from sqlalchemy import func, text
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
 
 from models import db, Solicitud, Producto, Usuario, Notificacion, Intercambio
+from utils.paginacion import CursorInvalido, leer_bool, leer_limite, paginar_keyset
 
 # Blueprint con prefijo /api/solicitudes
 bp_solicitudes = Blueprint("solicitudes", __name__, url_prefix="/api/solicitudes")
@@ -127,6 +128,58 @@ def crear_solicitud():
     return jsonify(nueva.to_card(id_actual)), 201
 
 
+ESTADOS_SOLICITUD = ("pendiente", "aceptado", "rechazado", "cancelado")
+
+
+def _listar_paginado(query, id_actual: int, estado_por_defecto: str | None):
+    """
+    Respuesta común de /recibidas y /enviadas.
+    Query params:
+      - estado: pendiente | aceptado | rechazado | cancelado | todos
+      - limit (default 20, máx 100) y cursor (next_cursor de la página anterior)
+      - todos=1: lista plana sin paginar, como antes
+    Respuesta paginada: { items, next_cursor, limit, conteos: {estado: n} }
+    """
+    estado = request.args.get("estado") or estado_por_defecto
+    if estado and estado != "todos" and estado not in ESTADOS_SOLICITUD:
+        return jsonify({"error": "estado inválido"}), 400
+
+    filtrada = query
+    if estado and estado != "todos":
+        filtrada = query.filter(Solicitud.estado == estado)
+
+    if leer_bool(request.args.get("todos")):
+        solicitudes = filtrada.order_by(Solicitud.creado.desc()).all()
+        return jsonify(Solicitud.to_cards(solicitudes, id_actual)), 200
+
+    limite = leer_limite(request.args.get("limit"))
+    try:
+        solicitudes, next_cursor = paginar_keyset(
+            filtrada,
+            Solicitud.creado,
+            Solicitud.id_solicitud,
+            request.args.get("cursor"),
+            limite,
+        )
+    except CursorInvalido:
+        return jsonify({"error": "cursor inválido"}), 400
+
+    # conteos por estado sobre todo el buzón (sin el filtro de estado), un solo GROUP BY
+    conteos = dict(
+        query.order_by(None)
+        .with_entities(Solicitud.estado, func.count(Solicitud.id_solicitud))
+        .group_by(Solicitud.estado)
+        .all()
+    )
+
+    return jsonify({
+        "items": Solicitud.to_cards(solicitudes, id_actual),
+        "next_cursor": next_cursor,
+        "limit": limite,
+        "conteos": conteos,
+    }), 200
+
+
 # ------------------------------------------------
 # LISTAR SOLICITUDES RECIBIDAS
 # ------------------------------------------------
@@ -139,18 +192,13 @@ def listar_recibidas():
     except (TypeError, ValueError):
         return jsonify({"error": "Token inválido"}), 401
 
-    # solicitudes donde el producto objetivo es mío Y están pendientes
-    solicitudes = (
+    # solicitudes donde el producto objetivo es mío (por defecto solo pendientes)
+    query = (
         Solicitud.query
         .join(Producto, Solicitud.id_producto_objetivo == Producto.id_producto)
         .filter(Producto.id_usuario == id_actual)
-        .filter(Solicitud.estado == "pendiente")  # 👈 SOLO pendientes
-        .order_by(Solicitud.creado.desc())
-        .all()
     )
-
-    data = [s.to_card(id_actual) for s in solicitudes]
-    return jsonify(data), 200
+    return _listar_paginado(query, id_actual, estado_por_defecto="pendiente")
 
 
 
@@ -166,15 +214,8 @@ def listar_enviadas():
     except (TypeError, ValueError):
         return jsonify({"error": "Token inválido"}), 401
 
-    solicitudes = (
-        Solicitud.query
-        .filter(Solicitud.id_solicitante == id_actual)
-        .order_by(Solicitud.creado.desc())
-        .all()
-    )
-
-    data = [s.to_card(id_actual) for s in solicitudes]
-    return jsonify(data), 200
+    query = Solicitud.query.filter(Solicitud.id_solicitante == id_actual)
+    return _listar_paginado(query, id_actual, estado_por_defecto=None)
 
 
 
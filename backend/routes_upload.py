@@ -2,6 +2,10 @@
 from flask import Blueprint, request, jsonify, url_for
 from werkzeug.utils import secure_filename
 
+from models import db
+from utils import imagenes
+from utils.storage import guardar_por_contenido, registrar_archivo
+
 bp_upload = Blueprint("upload", __name__, url_prefix="/api/upload")
 
 ALLOWED_EXT = {"png", "jpg", "jpeg", "gif", "webp"}
@@ -24,23 +28,26 @@ def upload_file():
     if not allowed_filename(filename):
         return jsonify(msg="Extensión no permitida"), 400
 
-    # Guardar en backend/static/uploads
+    # Guardar en backend/static/uploads, con el SHA-256 del contenido como nombre:
+    # subir la misma foto otra vez reusa el archivo que ya estaba
     base_dir = os.path.dirname(os.path.abspath(__file__))
     static_dir = os.path.join(base_dir, "static")
     uploads_dir = os.path.join(static_dir, "uploads")
-    os.makedirs(uploads_dir, exist_ok=True)
 
-    import time
-    name = f"{int(time.time())}_{filename}"
-    path = os.path.join(uploads_dir, name)
+    # la extensión final la decide el contenido (ver utils/storage.py)
+    ext = filename.rsplit(".", 1)[-1].lower()
     try:
-        f.save(path)
+        name, sha, tamano, nuevo = guardar_por_contenido(f.stream, uploads_dir, ext)
+        registrar_archivo(sha, name, tamano)
+        db.session.commit()
     except Exception as e:
+        db.session.rollback()
         return jsonify(msg="Error guardando archivo", err=str(e)), 500
 
+    # thumb/card/full en WebP y JPEG, fuera del request (utils/imagenes.py)
+    imagenes.programar_variantes(os.path.join(uploads_dir, name), sha, uploads_dir)
+
     # ✅ SOLO ruta relativa; igual que lo que ya pusiste en la BD
     public_url = f"/static/uploads/{name}"
 
-    return jsonify({"url": public_url}), 201
-
-
+    return jsonify({"url": public_url, "sha256": sha, "duplicado": not nuevo}), 201
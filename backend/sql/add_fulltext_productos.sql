@@ -0,0 +1,2 @@
+ALTER TABLE productos
+ADD FULLTEXT INDEX ft_productos_titulo_descripcion (titulo, descripcion);
@@ -0,0 +1,2 @@
+CREATE INDEX idx_intercambios_estado_limite
+ON intercambios (estado, fecha_limite_confirmacion);
@@ -0,0 +1,2 @@
+CREATE INDEX idx_productos_estado_fecha
+ON productos (estado, fecha_publicacion, id_producto);
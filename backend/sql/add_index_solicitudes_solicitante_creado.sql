@@ -0,0 +1,2 @@
+CREATE INDEX idx_solicitudes_solicitante_creado
+ON solicitudes (id_solicitante, creado, id_solicitud);
@@ -0,0 +1,44 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Config lee el entorno al importarse: todo esto va antes de importar la app
+_BD = os.path.join(tempfile.mkdtemp(prefix="trueque_tests_"), "test.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_BD}"
+os.environ.setdefault("DB_ESQUEMA_AL_INICIAR", "migrar")
+os.environ.setdefault("MODERACION_PROVEEDOR", "falso")
+os.environ.setdefault("JWT_SECRET", "secreto-de-pruebas-con-32-bytes-o-mas")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import create_app
+
+    app = create_app()
+    app.config["TESTING"] = True
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def bd(app):
+    """Contexto de app con la BD de pruebas; borra lo que la prueba insertó."""
+    from models import db
+
+    with app.app_context():
+        yield db
+        db.session.rollback()
+        for tabla in reversed(db.metadata.sorted_tables):
+            if tabla.name not in ("categorias", "esquema_version"):
+                db.session.execute(tabla.delete())
+        db.session.commit()
+        db.session.remove()
@@ -0,0 +1,119 @@
+# tests/test_busqueda.py
+from datetime import datetime
+
+from utils import busqueda
+from utils.busqueda import IndiceInvertido, normalizar, tokenizar
+
+
+# --- índice invertido / BM25 -------------------------------------------------
+
+def test_normalizar_quita_acentos_y_conserva_enie():
+    assert normalizar("Balón de Fútbol, ¡Niño!") == "balon de futbol niño"
+
+
+def test_tokenizar_quita_stopwords_y_plurales():
+    assert tokenizar("Las bicicletas de montaña") == tokenizar("bicicleta montaña")
+
+
+def test_bm25_titulo_pesa_mas_que_descripcion():
+    indice = IndiceInvertido()
+    indice.agregar(1, "Mochila escolar", "Sirve para llevar una laptop")
+    indice.agregar(2, "Laptop Dell", "Con cargador")
+    indice.agregar(3, "Balón", "Casi nuevo")
+
+    ranking = indice.buscar("laptop")
+    assert [id_doc for id_doc, _ in ranking] == [2, 1]
+
+
+def test_bm25_termino_raro_pesa_mas_que_comun():
+    indice = IndiceInvertido()
+    for i in range(1, 6):
+        indice.agregar(i, f"Tenis talla {i}", "usado")
+    indice.agregar(6, "Tenis Nike", "usado")
+
+    assert indice.buscar("tenis nike")[0][0] == 6
+
+
+def test_bm25_documentos_largos_se_penalizan():
+    indice = IndiceInvertido()
+    indice.agregar(1, "Bicicleta", "roja")
+    indice.agregar(2, "Bicicleta", "roja con canastilla, timbre, luces, cambios y asiento nuevo")
+
+    assert [id_doc for id_doc, _ in indice.buscar("bicicleta")] == [1, 2]
+
+
+def test_reindexar_reemplaza_terminos_y_quitar_borra():
+    indice = IndiceInvertido()
+    indice.agregar(1, "Laptop Dell", None)
+    indice.agregar(1, "Bicicleta", None)
+    assert indice.buscar("laptop") == []
+    assert indice.buscar("bicicleta")[0][0] == 1
+
+    indice.quitar(1)
+    assert len(indice) == 0
+    assert indice.buscar("bicicleta") == []
+
+
+def test_buscar_respeta_limite_y_max_id():
+    indice = IndiceInvertido()
+    for i in (3, 10, 7):
+        indice.agregar(i, "Balón", None)
+    assert len(indice.buscar("balon", 2)) == 2
+    assert indice.max_id == 10
+
+
+def test_consulta_solo_stopwords_no_regresa_nada():
+    indice = IndiceInvertido()
+    indice.agregar(1, "Tenis de la marca", None)
+    assert indice.buscar("de la") == []
+
+
+# --- tope de resultados después de filtrar -----------------------------------
+
+def test_tope_se_aplica_despues_de_los_filtros(bd, monkeypatch):
+    from models import Producto, Usuario
+
+    u = Usuario(nombre_completo="Ana", correo="ana@pruebas", contrasena="x")
+    bd.session.add(u)
+    bd.session.commit()
+    # los 6 con mejor puntaje (título corto) están dados de baja
+    for i in range(10):
+        bd.session.add(Producto(
+            id_usuario=u.id_usuario, id_categoria=1,
+            titulo="Balón" if i < 6 else "Balón de fútbol profesional",
+            descripcion="", valor_estimado=100, ubicacion="CDMX",
+            estado="baja" if i < 6 else "disponible",
+            fecha_publicacion=datetime(2025, 1, 1),
+        ))
+    bd.session.commit()
+
+    monkeypatch.setattr(busqueda, "_fulltext", False)
+    monkeypatch.setattr(busqueda, "BUSQUEDA_MAX_RESULTADOS", 3)
+    busqueda.reconstruir_indice()
+
+    query = Producto.query.filter(Producto.estado == "disponible")
+    query, orden = busqueda.aplicar_busqueda(query, "balon")
+    encontrados = query.order_by(*orden).all()
+
+    assert len(encontrados) == 3
+    assert all(p.estado == "disponible" for p in encontrados)
+
+
+def test_agregar_nuevos_indexa_lo_creado_por_otro_proceso(bd, monkeypatch):
+    from models import Producto, Usuario
+
+    monkeypatch.setattr(busqueda, "_fulltext", False)
+    busqueda.reconstruir_indice()
+
+    u = Usuario(nombre_completo="Beto", correo="beto@pruebas", contrasena="x")
+    bd.session.add(u)
+    bd.session.commit()
+    bd.session.add(Producto(
+        id_usuario=u.id_usuario, id_categoria=1, titulo="Patineta eléctrica",
+        descripcion="", valor_estimado=100, ubicacion="CDMX", estado="disponible",
+    ))
+    bd.session.commit()
+
+    assert busqueda.obtener_indice().buscar("patineta") == []
+    assert busqueda.agregar_nuevos() == 1
+    assert len(busqueda.obtener_indice().buscar("patineta")) == 1
@@ -0,0 +1,143 @@
+# tests/test_cola_moderacion.py
+import hashlib
+import io
+import threading
+from collections import Counter
+
+import pytest
+
+from utils import cola_moderacion
+from utils.cola_moderacion import ColaLlena, _guardar_en_cache, buscar_en_cache, encolar, esperar
+from utils.moderacion import ModeracionNoDisponible, ProveedorFalso
+
+SHA = "e" * 64
+TEXTO = "f" * 64
+PHASH = "00ff00ff00ff00ff"
+
+
+def test_cache_separado_por_proveedor(bd, monkeypatch):
+    monkeypatch.setattr(cola_moderacion, "_indice", cola_moderacion._IndicePerceptual())
+    _guardar_en_cache(SHA, TEXTO, PHASH, {"is_illegal": False, "reason": "simulada"}, "falso")
+
+    assert buscar_en_cache(SHA, TEXTO, PHASH, "falso")[1] == "exacto"
+    # casi la misma imagen: nivel perceptual, también por proveedor
+    assert buscar_en_cache("0" * 64, TEXTO, "00ff00ff00ff00fe", "falso")[1] == "perceptual"
+    assert buscar_en_cache(SHA, TEXTO, PHASH, "openai") == (None, None)
+    assert buscar_en_cache("0" * 64, TEXTO, "00ff00ff00ff00fe", "openai") == (None, None)
+
+    # el veredicto del otro proveedor se guarda junto al anterior
+    _guardar_en_cache(SHA, TEXTO, PHASH, {"is_illegal": True, "reason": "modelo"}, "openai")
+    previo, nivel = buscar_en_cache(SHA, TEXTO, PHASH, "openai")
+    assert (nivel, previo.is_illegal) == ("exacto", True)
+
+
+# --- encolar / esperar ----------------------------------------------------------
+
+class ProveedorEnPausa(ProveedorFalso):
+    """ProveedorFalso que no responde hasta que la prueba lo suelta."""
+
+    def __init__(self, error: Exception | None = None):
+        super().__init__(latencia_ms=0)
+        self.soltar = threading.Event()
+        self.error = error
+
+    def clasificar(self, imagen, mimetype, titulo, descripcion):
+        assert self.soltar.wait(5)
+        if self.error is not None:
+            self.llamadas += 1
+            raise self.error
+        return super().clasificar(imagen, mimetype, titulo, descripcion)
+
+
+@pytest.fixture
+def cola(bd, monkeypatch):
+    monkeypatch.setattr(cola_moderacion, "_futuros", {})
+    monkeypatch.setattr(cola_moderacion, "_en_curso", {})
+    monkeypatch.setattr(cola_moderacion, "_indice", cola_moderacion._IndicePerceptual())
+    monkeypatch.setattr(cola_moderacion, "_contadores", Counter())
+
+    def usar(proveedor):
+        monkeypatch.setattr(cola_moderacion, "obtener_proveedor", lambda: proveedor)
+        return proveedor
+
+    return usar
+
+
+def _imagen(color=(200, 30, 30)):
+    from PIL import Image
+
+    salida = io.BytesIO()
+    Image.new("RGB", (64, 64), color).save(salida, "PNG")
+    datos = salida.getvalue()
+    return io.BytesIO(datos), hashlib.sha256(datos).hexdigest()
+
+
+def test_encolar_regresa_pendiente_y_esperar_trae_el_veredicto(cola):
+    proveedor = cola(ProveedorEnPausa())
+    stream, sha = _imagen()
+
+    trabajo = encolar(stream, sha, "Balón ilegal", "")
+    assert trabajo.estado == "pendiente"
+
+    proveedor.soltar.set()
+    listo = esperar(trabajo)
+    assert (listo.estado, listo.is_illegal) == ("listo", True)
+    assert buscar_en_cache(sha, cola_moderacion.texto_sha("Balón ilegal", ""), "0" * 16, "falso")[1] == "exacto"
+
+
+def test_mismo_contenido_en_curso_no_llama_dos_veces(cola):
+    proveedor = cola(ProveedorEnPausa())
+    stream, sha = _imagen()
+
+    primero = encolar(stream, sha, "Balón", "")
+    segundo = encolar(io.BytesIO(stream.getvalue()), sha, "Balón", "")
+    assert segundo.id_trabajo == primero.id_trabajo
+    assert cola_moderacion.estadisticas()["por_nivel"]["en_curso"] == 1
+
+    proveedor.soltar.set()
+    esperar(primero)
+    assert proveedor.llamadas == 1
+    assert cola_moderacion._en_curso == {}
+
+    # ya terminó: el tercero sale de la caché, sin trabajo nuevo para el proveedor
+    tercero = encolar(io.BytesIO(stream.getvalue()), sha, "Balón", "")
+    assert (tercero.estado, tercero.cache) == ("listo", "exacto")
+    assert proveedor.llamadas == 1
+
+
+def test_cola_llena(cola, monkeypatch):
+    proveedor = cola(ProveedorEnPausa())
+    monkeypatch.setattr(cola_moderacion, "MODERACION_COLA_MAX", 1)
+    stream, sha = _imagen()
+    otro, sha_otro = _imagen((20, 20, 220))
+
+    primero = encolar(stream, sha, "Balón", "")
+    with pytest.raises(ColaLlena):
+        encolar(otro, sha_otro, "Patineta", "")
+
+    proveedor.soltar.set()
+    esperar(primero)
+
+
+def test_error_del_proveedor_deja_el_trabajo_en_error(cola, bd):
+    from models import TrabajoModeracion
+
+    proveedor = cola(ProveedorEnPausa(ModeracionNoDisponible("falta OPENAI_API_KEY")))
+    stream, sha = _imagen()
+
+    trabajo = encolar(stream, sha, "Balón", "")
+    id_trabajo = trabajo.id_trabajo
+    proveedor.soltar.set()
+    with pytest.raises(ModeracionNoDisponible):
+        esperar(trabajo)
+
+    bd.session.expire_all()
+    fila = bd.session.get(TrabajoModeracion, id_trabajo)
+    assert fila.estado == "error"
+    assert fila.error.startswith("ModeracionNoDisponible")
+    # ya sin futuro en este proceso, esperar() relanza desde la fila
+    with pytest.raises(ModeracionNoDisponible):
+        esperar(fila)
+    # el error no se guarda como veredicto
+    assert buscar_en_cache(sha, cola_moderacion.texto_sha("Balón", ""), "0" * 16, "falso") == (None, None)
+    assert cola_moderacion._en_curso == {}
@@ -0,0 +1,149 @@
+# tests/test_escritor_mensajes.py
+from datetime import datetime
+
+import pytest
+from sqlalchemy import exc
+
+from utils import escritor_mensajes
+from utils.escritor_mensajes import encolar, preparar_fila, vaciar
+
+AHORA = datetime(2025, 1, 1, 12, 0)
+
+
+@pytest.fixture
+def cola(monkeypatch):
+    monkeypatch.setattr(escritor_mensajes, "_pendientes", [])
+    return escritor_mensajes
+
+
+def _fila(**cambios):
+    fila = preparar_fila(1, 7, "texto", "hola", None, None, AHORA)
+    fila.update(cambios)
+    return fila
+
+
+def _guardados(bd):
+    from models import IntercambioMensaje
+    return [m.contenido for m in IntercambioMensaje.query.order_by(IntercambioMensaje.id_mensaje)]
+
+
+@pytest.mark.parametrize("tipo,contenido,lat,lng", [
+    ("texto", "", None, None),
+    ("texto", "   ", None, None),
+    ("texto", 123, None, None),
+    ("texto", "x" * (escritor_mensajes.CHAT_CONTENIDO_MAX + 1), None, None),
+    ("ubicacion", None, "abc", -99.1),
+    ("ubicacion", None, 19.4, None),
+    ("ubicacion", None, 91, -99.1),
+    ("ubicacion", None, 19.4, 181),
+    ("ubicacion", None, float("nan"), -99.1),
+    ("imagen", "hola", None, None),
+])
+def test_preparar_fila_rechaza(tipo, contenido, lat, lng):
+    assert preparar_fila(1, 7, tipo, contenido, lat, lng, AHORA) is None
+
+
+def test_preparar_fila_convierte_tipos():
+    fila = preparar_fila("3", 7, "ubicacion", "ignorado", "19.43260771", -99.1332, AHORA)
+    assert len(fila.pop("id_provisional")) == 32
+    assert fila == {
+        "id_intercambio": 3, "id_usuario": 7, "tipo": "ubicacion", "contenido": None,
+        "lat": 19.4326077, "lng": -99.1332, "creado": AHORA,
+    }
+    assert preparar_fila("x", 7, "texto", "hola", None, None, AHORA) is None
+
+
+def test_encolar_se_niega_con_la_cola_llena(cola, monkeypatch):
+    monkeypatch.setattr(cola, "CHAT_PENDIENTES_MAX", 2)
+    assert encolar(_fila())
+    assert encolar(_fila())
+    assert not encolar(_fila())
+    assert len(cola._pendientes) == 2
+
+
+def test_fila_mala_se_descarta_sin_perder_el_lote(bd, cola):
+    encolar(_fila(contenido="uno"))
+    encolar(_fila(contenido="mala", id_usuario=None))  # NOT NULL
+    encolar(_fila(contenido="tres"))
+
+    assert vaciar() == 2
+    assert cola._pendientes == []
+    assert _guardados(bd) == ["uno", "tres"]
+    assert vaciar() == 0
+
+
+def test_bd_caida_regresa_el_lote_a_la_cola(bd, cola, monkeypatch):
+    encolar(_fila(contenido="uno"))
+    encolar(_fila(contenido="dos"))
+
+    execute = bd.session.execute
+    caida = True
+
+    def execute_con_falla(*args, **kwargs):
+        if caida:
+            raise exc.OperationalError("INSERT", {}, Exception("Lost connection"))
+        return execute(*args, **kwargs)
+
+    monkeypatch.setattr(bd.session, "execute", execute_con_falla)
+    assert vaciar() == 0
+    assert [f["contenido"] for f in cola._pendientes] == ["uno", "dos"]
+
+    caida = False
+    assert vaciar() == 2
+    assert _guardados(bd) == ["uno", "dos"]
+
+
+def test_reconexion_por_fecha_incluye_mensajes_en_lote(bd, client, cola):
+    from flask_jwt_extended import create_access_token
+    from models import Intercambio
+
+    bd.session.add(Intercambio(
+        id_intercambio=1, id_solicitud=1, id_usuario_ofrece=7, id_usuario_recibe=8,
+        id_producto_solicitado=1, estado="pendiente",
+    ))
+    bd.session.commit()
+    visto = _fila(contenido="visto", creado=datetime(2025, 1, 1, 12, 0, 0, 400000))
+    mismo_segundo = _fila(contenido="mismo segundo", creado=datetime(2025, 1, 1, 12, 0, 0, 900000))
+    despues = _fila(contenido="después", creado=datetime(2025, 1, 1, 12, 0, 5))
+    for fila in (visto, mismo_segundo, despues):
+        encolar(fila)
+    vaciar()
+
+    token = create_access_token(identity="7")
+    r = client.get(
+        f"/api/intercambios/1/mensajes?after_fecha={visto['creado'].isoformat()}",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert r.status_code == 200
+    nuevos = [m for m in r.get_json() if m["id_provisional"] != visto["id_provisional"]]
+    assert [m["contenido"] for m in nuevos] == ["mismo segundo", "después"]
+
+    r = client.get("/api/intercambios/1/mensajes?after_fecha=ayer", headers={"Authorization": f"Bearer {token}"})
+    assert r.status_code == 400
+
+
+class _Detener(BaseException):
+    pass
+
+
+def test_bucle_vaciado_sobrevive_a_un_error(app, monkeypatch):
+    llamadas = []
+
+    def vaciar_falla_una_vez():
+        llamadas.append(1)
+        if len(llamadas) == 1:
+            raise RuntimeError("sin sesión")
+        return 0
+
+    class SocketIOFalso:
+        vueltas = 0
+
+        def sleep(self, segundos):
+            self.vueltas += 1
+            if self.vueltas > 3:
+                raise _Detener
+
+    monkeypatch.setattr(escritor_mensajes, "vaciar", vaciar_falla_una_vez)
+    with pytest.raises(_Detener):
+        escritor_mensajes._bucle_vaciado(app, SocketIOFalso(), 0)
+    assert len(llamadas) == 3
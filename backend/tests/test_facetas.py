@@ -0,0 +1,42 @@
+# tests/test_facetas.py
+from datetime import datetime
+
+
+def _sembrar(bd):
+    from models import Producto, Usuario
+
+    u = Usuario(nombre_completo="Ana", correo="ana@facetas", contrasena="x")
+    bd.session.add(u)
+    bd.session.commit()
+    for i, (id_categoria, estado, valor) in enumerate([
+        (1, "disponible", 100), (1, "disponible", 700), (1, "baja", 100),
+        (2, "disponible", 3000), (2, "baja", 100), (3, "disponible", 100),
+    ]):
+        bd.session.add(Producto(
+            id_usuario=u.id_usuario, id_categoria=id_categoria, titulo=f"Producto {i}",
+            descripcion="", valor_estimado=valor, ubicacion="CDMX", estado=estado,
+            fecha_publicacion=datetime(2025, 1, 1, i),
+        ))
+    bd.session.commit()
+
+
+def _conteos(lista, clave):
+    return {f[clave]: f["conteo"] for f in lista}
+
+
+def test_facetas_cuentan_sin_su_propio_filtro(bd, client):
+    _sembrar(bd)
+
+    r = client.get("/api/productos?id_categoria=1&facetas=1")
+    assert r.status_code == 200
+    datos = r.get_json()
+    assert len(datos["items"]) == 2
+
+    facetas = datos["facetas"]
+    # categoría: todas las categorías, solo con el filtro de estado
+    assert _conteos(facetas["id_categoria"], "id_categoria") == {1: 2, 2: 1, 3: 1}
+    # estado: dentro de la categoría 1, sin el filtro de estado
+    assert _conteos(facetas["estado"], "valor") == {"disponible": 2, "baja": 1}
+    # sin filtro propio: igual que el listado
+    assert _conteos(facetas["ubicacion"], "valor") == {"CDMX": 2}
+    assert [r["conteo"] for r in facetas["valor_estimado"]][:2] == [1, 1]
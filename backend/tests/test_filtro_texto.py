@@ -0,0 +1,79 @@
+# tests/test_filtro_texto.py
+import pytest
+
+from utils.filtro_texto import Automata, clasificar
+
+
+def _nivel(titulo, descripcion=""):
+    return clasificar(titulo, descripcion)["nivel"]
+
+
+# frases que el filtro bloqueaba sin ser productos prohibidos
+@pytest.mark.parametrize("titulo,descripcion", [
+    ("Batidora de mano", "Ideal para revolver la masa"),
+    ("Figura de Ron Weasley", "Harry Potter, coleccionable"),
+    ("Rifle de juguete", "Lanza dardos de espuma"),
+    ("Cohetes de juguete", "Set de 3 con lanzador de agua"),
+    ("Libro Balas de plata", "Pasta dura"),
+    ("Tarjeta de crédito de juguete", "Para jugar a la tiendita"),
+    ("Pistolas de agua", "Dos piezas"),
+    ("Pistola de silicón", "Para manualidades"),
+    ("Cartera", "Con espacio para tarjeta de débito"),
+    ("Inés, muñeca de trapo", ""),
+    ("Réplica de airsoft", "Pistola de balines"),
+    ("Cerveza sin alcohol", "Six"),
+    ("Vasos para whisky", "Juego de 4"),
+    ("Tarro para cerveza", "Vidrio grueso"),
+    ("Hielera para cervezas", "Capacidad 24 latas"),
+    ("Destapador de cerveza", "Acero inoxidable"),
+    ("Copas para vino tinto", "Cristal"),
+    ("Pistola de clavos", "Neumática"),
+    ("Pistola de pegamento", "Con 10 barras"),
+    ("Pistola para tatuar", "Rotativa"),
+    ("Estuche para pasaporte", "Piel sintética"),
+    ("Cigarros de chocolate", "Caja con 12"),
+    ("Funda de pistola para airsoft", "Cintura"),
+    ("Caballitos para tequila", "Set de 6"),
+    ("Estuche de escopeta", "Acolchado"),
+])
+def test_falsos_positivos_no_se_bloquean(titulo, descripcion):
+    assert _nivel(titulo, descripcion) != "bloquear"
+
+
+@pytest.mark.parametrize("titulo,descripcion,categoria", [
+    ("Vape desechable", "Sabor mango", "vapes y tabaco"),
+    ("Caguamas Corona", "Caja de 12", "alcohol"),
+    ("Botella de tequila", "Reposado", "alcohol"),
+    ("Escopeta calibre 12", "", "armas"),
+    ("Escopeta de juguete y escopeta real", "", "armas"),
+    ("Munición de airsoft y munición 9mm", "", "armas"),
+    ("Credencial del INE", "", "documentos"),
+    ("Marihuana", "", "drogas"),
+])
+def test_bloquea(titulo, descripcion, categoria):
+    resultado = clasificar(titulo, descripcion)
+    assert (resultado["nivel"], resultado["categoria"]) == ("bloquear", categoria)
+
+
+@pytest.mark.parametrize("titulo", ["Bicicleta de montaña", "Roncadora de juguete", "Pistolero del oeste (DVD)"])
+def test_solo_palabras_completas(titulo):
+    assert _nivel(titulo) == "limpio"
+
+
+def test_dudoso_registra_el_termino():
+    assert clasificar("Navaja suiza", "") == {"nivel": "dudoso", "termino": "navaja", "categoria": None}
+
+
+@pytest.mark.parametrize("titulo", ["Pistola 9mm", "Cervezas Corona", "Whisky 12 años"])
+def test_terminos_ambiguos_van_al_modelo(titulo):
+    assert _nivel(titulo) == "dudoso"
+
+
+def test_automata_coincidencias_traslapadas():
+    automata = Automata()
+    for palabra in ("he", "she", "his", "hers"):
+        automata.agregar(palabra, palabra)
+    automata.construir()
+
+    encontradas = sorted((inicio, dato) for inicio, _, dato in automata.buscar("ushers"))
+    assert encontradas == [(1, "she"), (2, "he"), (2, "hers")]
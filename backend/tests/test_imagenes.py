@@ -0,0 +1,79 @@
+# tests/test_imagenes.py
+import os
+
+import pytest
+from PIL import Image
+
+from utils import imagenes
+from utils.imagenes import generar_variantes, urls_variantes
+
+
+@pytest.fixture
+def carpeta(tmp_path, monkeypatch):
+    monkeypatch.setattr(imagenes, "_CARPETA_UPLOADS", str(tmp_path))
+    monkeypatch.setattr(imagenes, "_listas", set())
+    monkeypatch.setattr(imagenes, "_fallidas", set())
+    monkeypatch.setattr(imagenes, "_sin_variantes", {})
+    monkeypatch.setattr(imagenes, "_escaneada", False)
+    return tmp_path
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    llamadas = []
+    exists = os.path.exists
+
+    def contar(ruta):
+        llamadas.append(ruta)
+        return exists(ruta)
+
+    monkeypatch.setattr(imagenes.os.path, "exists", contar)
+    return llamadas
+
+
+def _url(sha):
+    return f"/static/uploads/{sha}.png"
+
+
+def test_variantes_generadas_no_tocan_el_disco(carpeta, stats):
+    sha = "a" * 64
+    ruta = carpeta / f"{sha}.png"
+    Image.new("RGB", (600, 300), (10, 120, 200)).save(ruta)
+    assert generar_variantes(str(ruta), sha, str(carpeta))
+
+    stats.clear()
+    urls = urls_variantes(_url(sha))
+    assert urls["card"]["webp"] == f"/static/uploads/{sha}_card.webp"
+    with Image.open(carpeta / f"{sha}_thumb.jpg") as thumb:
+        assert thumb.size == (160, 80)
+    assert stats == []
+
+
+def test_variantes_de_otro_proceso_se_ven_al_escanear(carpeta, stats):
+    sha = "b" * 64
+    (carpeta / f"{sha}_full.jpg").write_bytes(b"")
+    assert urls_variantes(_url(sha)) is not None
+    assert stats == []
+
+
+def test_fallidas_no_se_vuelven_a_buscar(carpeta, stats):
+    sha = "c" * 64
+    ruta = carpeta / f"{sha}.png"
+    ruta.write_bytes(b"no es imagen")
+    assert not generar_variantes(str(ruta), sha, str(carpeta))
+
+    stats.clear()
+    for _ in range(3):
+        assert urls_variantes(_url(sha)) is None
+    assert stats == []
+
+
+def test_sin_variantes_se_revisa_a_lo_mas_cada_intervalo(carpeta, stats, monkeypatch):
+    sha = "d" * 64
+    for _ in range(3):
+        assert urls_variantes(_url(sha)) is None
+    assert len(stats) == 1
+
+    (carpeta / f"{sha}_full.jpg").write_bytes(b"")
+    monkeypatch.setattr(imagenes, "IMAGENES_REVISAR_S", 0)
+    assert urls_variantes(_url(sha)) is not None
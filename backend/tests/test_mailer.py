@@ -0,0 +1,54 @@
+# tests/test_mailer.py
+import smtplib
+
+from utils import mailer
+
+
+def test_proveedor_segun_email_mock_y_uno_por_proceso():
+    mock = mailer.obtener_proveedor({"EMAIL_MOCK": True})
+    assert isinstance(mock, mailer.CorreoMock)
+    assert mailer.obtener_proveedor({}) is mock
+    assert isinstance(mailer.obtener_proveedor({"EMAIL_MOCK": False}), mailer.CorreoSMTP)
+
+
+def test_send_mail_mock_no_toca_smtp(app, monkeypatch, capsys):
+    monkeypatch.setitem(app.config, "EMAIL_MOCK", True)
+    monkeypatch.setattr(smtplib, "SMTP", None)
+
+    with app.app_context():
+        assert mailer.send_mail("ana@pruebas", "Hola", "<p>hola</p>") is True
+    assert "TO: ana@pruebas" in capsys.readouterr().out
+
+
+def test_send_mail_smtp(app, monkeypatch):
+    enviados = []
+
+    class SMTPFalso:
+        def __init__(self, host, puerto):
+            self.host = (host, puerto)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def starttls(self):
+            pass
+
+        def login(self, usuario, contrasena):
+            pass
+
+        def send_message(self, msg):
+            enviados.append((self.host, msg["To"], msg["Subject"]))
+
+    monkeypatch.setattr(smtplib, "SMTP", SMTPFalso)
+    for clave, valor in {
+        "EMAIL_MOCK": False, "MAIL_SENDER": "no-reply@pruebas", "SMTP_HOST": "smtp.pruebas",
+        "SMTP_PORT": 587, "SMTP_USER": "u", "SMTP_PASSWORD": "p",
+    }.items():
+        monkeypatch.setitem(app.config, clave, valor)
+
+    with app.app_context():
+        assert mailer.send_mail("ana@pruebas", "Hola", "<p>hola</p>") is True
+    assert enviados == [(("smtp.pruebas", 587), "ana@pruebas", "Hola")]
@@ -0,0 +1,54 @@
+# tests/test_paginacion.py
+import base64
+import json
+from datetime import datetime
+
+import pytest
+
+from utils.paginacion import (
+    CursorInvalido, decode_cursor, encode_cursor, leer_bool, leer_limite, paginar_offset,
+)
+
+
+def _cursor_offset(valor) -> str:
+    raw = json.dumps({"o": valor}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+@pytest.mark.parametrize("fecha", [datetime(2025, 3, 1, 12, 30, 5), None])
+def test_cursor_ida_y_vuelta(fecha):
+    assert decode_cursor(encode_cursor(fecha, 42)) == (fecha, 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "no-es-base64!!", _cursor_offset(3), "W10"])
+def test_decode_cursor_invalido(cursor):
+    with pytest.raises(CursorInvalido):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("valor", [-1, -100, "5", 2.5, True, None])
+def test_paginar_offset_rechaza_offsets_invalidos(valor):
+    with pytest.raises(CursorInvalido):
+        paginar_offset(None, _cursor_offset(valor), 10)
+
+
+@pytest.mark.parametrize("raw,esperado", [
+    (None, 20), ("", 20), ("abc", 20), ("0", 1), ("-5", 1), ("50", 50), ("1000", 100),
+])
+def test_leer_limite(raw, esperado):
+    assert leer_limite(raw) == esperado
+
+
+@pytest.mark.parametrize("raw,esperado", [
+    ("1", True), ("true", True), ("si", True), ("on", True),
+    ("0", False), ("false", False), ("no", False), ("", False), (None, False),
+])
+def test_leer_bool(raw, esperado):
+    assert leer_bool(raw) is esperado
+
+
+def test_todos_0_pagina(client):
+    r = client.get("/api/productos?todos=0")
+    assert r.status_code == 200
+    assert set(r.json) == {"items", "next_cursor", "limit"}
+    assert isinstance(client.get("/api/productos?todos=1").json, list)
@@ -0,0 +1,138 @@
+# tests/test_replicas.py
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import create_engine
+
+from utils import replicas as replicas_mod
+from utils.replicas import EscriturasMemoria, EscriturasRedis, Replicas
+
+
+class RedisFalso:
+    """Lo mínimo de redis.Redis que usa EscriturasRedis (sin expiración)."""
+
+    def __init__(self):
+        self.llaves = {}
+
+    def set(self, llave, valor, px=None):
+        self.llaves[llave] = valor
+
+    def exists(self, llave):
+        return int(llave in self.llaves)
+
+
+class RedisCaido:
+    def set(self, *args, **kwargs):
+        raise ConnectionError("redis caído")
+
+    exists = set
+
+
+@pytest.fixture
+def con_replica(app, tmp_path):
+    """La app con una réplica SQLite vacía (mismas tablas, sin filas) y la primaria con un producto."""
+    from models import db, Producto, Usuario
+
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    with app.app_context():
+        db.metadata.create_all(bind=replica)
+        u1 = Usuario(nombre_completo="Ana", correo="ana@replicas", contrasena="x")
+        u2 = Usuario(nombre_completo="Beto", correo="beto@replicas", contrasena="x")
+        db.session.add_all([u1, u2])
+        db.session.commit()
+        db.session.add(Producto(id_usuario=u1.id_usuario, id_categoria=1, titulo="Solo en primaria",
+                                descripcion="", valor_estimado=1, ubicacion="CDMX"))
+        db.session.commit()
+        tokens = [
+            {"Authorization": f"Bearer {create_access_token(identity=str(u.id_usuario))}"}
+            for u in (u1, u2)
+        ]
+        db.session.remove()
+
+    app.extensions["replicas"] = Replicas([replica], EscriturasMemoria())
+    yield app.extensions["replicas"], tokens
+
+    del app.extensions["replicas"]
+    replica.dispose()
+    with app.app_context():
+        for tabla in reversed(db.metadata.sorted_tables):
+            if tabla.name != "categorias":
+                db.session.execute(tabla.delete())
+        db.session.commit()
+        db.session.remove()
+
+
+def _productos(client, headers=None):
+    return [p["titulo"] for p in client.get("/api/productos?todos=1", headers=headers or {}).get_json()]
+
+
+def test_lecturas_van_a_la_replica(client, con_replica):
+    replicas, (ana, beto) = con_replica
+    assert _productos(client) == []
+    assert _productos(client, beto) == []
+    assert replicas.replicas[0].lecturas > 0
+
+
+def test_quien_escribe_lee_de_la_primaria(client, con_replica):
+    _, (ana, beto) = con_replica
+    r = client.post("/api/productos", headers=ana, json={
+        "titulo": "Nuevo", "descripcion": "d", "id_categoria": 1, "valor_estimado": 5, "ubicacion": "CDMX",
+    })
+    assert r.status_code == 201
+
+    assert sorted(_productos(client, ana)) == ["Nuevo", "Solo en primaria"]
+    assert _productos(client, beto) == []
+
+
+def test_marca_de_escritura_compartida_entre_workers(con_replica):
+    redis = RedisFalso()
+    worker1 = Replicas([], EscriturasRedis(redis))
+    worker2 = Replicas([], EscriturasRedis(redis))
+
+    worker1.marcar_escritura("u:7")
+    assert worker2.escribio_hace_poco("u:7")
+    assert not worker2.escribio_hace_poco("u:8")
+    assert not worker2.escribio_hace_poco(None)
+
+
+def test_redis_caido_lee_de_la_primaria():
+    escrituras = EscriturasRedis(RedisCaido())
+    escrituras.marcar("u:7")  # solo avisa
+    assert escrituras.reciente("u:7")
+
+
+def test_replica_caida_lee_de_la_primaria(app, client, con_replica, tmp_path):
+    replicas, _ = con_replica
+    caida = create_engine(f"sqlite:///{tmp_path / 'no-existe' / 'replica.db'}")
+    app.extensions["replicas"] = Replicas([caida], EscriturasMemoria())
+
+    assert _productos(client) == ["Solo en primaria"]
+    assert not app.extensions["replicas"].replicas[0].sana
+
+
+def test_health_publico_sin_urls_ni_errores(client, con_replica):
+    datos = client.get("/api/health/db").get_json()
+    assert set(datos) == {"ok", "ping_ms", "replicas", "replicas_sanas"}
+    assert "sqlite" not in str(datos)
+
+
+def test_health_detallado_solo_admin(app, client, con_replica):
+    from models import db, Usuario
+
+    _, (ana, _) = con_replica
+    assert client.get("/api/admin/health/db").status_code == 401
+    assert client.get("/api/admin/health/db", headers=ana).status_code == 403
+
+    with app.app_context():
+        Usuario.query.filter_by(correo="ana@replicas").one().rol = "administrador"
+        db.session.commit()
+        db.session.remove()
+    datos = client.get("/api/admin/health/db", headers=ana).get_json()
+    assert datos["replicas"][0]["url"].startswith("sqlite")
+
+
+def test_memoria_expira(monkeypatch):
+    escrituras = EscriturasMemoria()
+    escrituras.marcar("u:1")
+    assert escrituras.reciente("u:1")
+    monkeypatch.setattr(replicas_mod, "DB_LECTURA_PROPIA_S", 0)
+    assert not escrituras.reciente("u:1")
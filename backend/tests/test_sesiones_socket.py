@@ -0,0 +1,79 @@
+# tests/test_sesiones_socket.py
+import time
+
+import pytest
+from sqlalchemy import event
+
+from utils import sesiones_socket
+from utils.sesiones_socket import SesionSocket, puede_publicar, revocar_intercambio
+
+
+@pytest.fixture
+def consultas(bd):
+    contador = {"n": 0}
+
+    def contar(*args, **kwargs):
+        contador["n"] += 1
+
+    event.listen(bd.engine, "before_cursor_execute", contar)
+    yield contador
+    event.remove(bd.engine, "before_cursor_execute", contar)
+
+
+@pytest.fixture
+def sesion(monkeypatch):
+    monkeypatch.setattr(sesiones_socket, "_sesiones", {})
+    sesion = SesionSocket("token", 7, time.time() + 3600)
+    sesiones_socket._sesiones["sid"] = sesion
+    return sesion
+
+
+def _intercambio(bd, estado="pendiente"):
+    from models import Intercambio
+
+    bd.session.add(Intercambio(
+        id_intercambio=1, id_solicitud=1, id_usuario_ofrece=7, id_usuario_recibe=8,
+        id_producto_solicitado=1, estado=estado,
+    ))
+    bd.session.commit()
+
+
+def test_permiso_se_consulta_una_vez(bd, sesion, consultas):
+    _intercambio(bd)
+    assert puede_publicar("sid", 1)
+    antes = consultas["n"]
+    for _ in range(5):
+        assert puede_publicar("sid", 1)
+    assert consultas["n"] == antes
+
+
+@pytest.mark.parametrize("id_intercambio", [1, 999])
+def test_rechazo_no_vuelve_a_consultar(bd, sesion, consultas, id_intercambio):
+    _intercambio(bd, estado="cancelado")
+    assert not puede_publicar("sid", id_intercambio)
+    antes = consultas["n"]
+    for _ in range(5):
+        assert not puede_publicar("sid", id_intercambio)
+    assert consultas["n"] == antes
+
+
+def test_permiso_vencido_se_verifica_otra_vez(bd, sesion, monkeypatch):
+    from models import Intercambio
+
+    _intercambio(bd)
+    assert puede_publicar("sid", 1)
+    # otro worker lo cancela: este proceso se entera al vencer el permiso
+    Intercambio.query.get(1).estado = "cancelado"
+    bd.session.commit()
+    assert puede_publicar("sid", 1)
+
+    monkeypatch.setattr(sesiones_socket, "SOCKET_PERMISO_TTL_S", 0)
+    assert not puede_publicar("sid", 1)
+    assert 1 in sesion.denegados
+
+
+def test_revocar_intercambio(bd, sesion):
+    _intercambio(bd)
+    assert puede_publicar("sid", 1)
+    revocar_intercambio(1)
+    assert not puede_publicar("sid", 1)
@@ -0,0 +1,39 @@
+# tests/test_storage.py
+import io
+
+from PIL import Image
+
+from utils.storage import guardar_por_contenido, registrar_archivo
+
+
+def _png() -> bytes:
+    salida = io.BytesIO()
+    Image.new("RGB", (8, 8), (200, 30, 30)).save(salida, "PNG")
+    return salida.getvalue()
+
+
+def test_extension_sale_del_contenido(tmp_path):
+    datos = _png()
+    nombre1, sha1, _, nuevo1 = guardar_por_contenido(io.BytesIO(datos), str(tmp_path), "jpeg")
+    nombre2, sha2, _, nuevo2 = guardar_por_contenido(io.BytesIO(datos), str(tmp_path), "png")
+
+    assert nombre1 == nombre2 == f"{sha1}.png"
+    assert (nuevo1, nuevo2) == (True, False)
+    assert sorted(p.name for p in tmp_path.iterdir()) == [nombre1]
+
+
+def test_contenido_no_reconocido_usa_la_extension_del_cliente(tmp_path):
+    nombre, sha, _, _ = guardar_por_contenido(io.BytesIO(b"no es imagen"), str(tmp_path), "jpeg")
+    assert nombre == f"{sha}.jpg"
+
+
+def test_registrar_archivo_dos_veces_no_choca(bd):
+    from models import Archivo
+
+    registrar_archivo("a" * 64, "a.png", 10)
+    bd.session.commit()
+    # la segunda "primera subida" (otro worker) no debe dar IntegrityError
+    registrar_archivo("a" * 64, "a.png", 10)
+    bd.session.commit()
+
+    assert Archivo.query.filter_by(sha256="a" * 64).count() == 1
@@ -0,0 +1,60 @@
+# tests/test_sugerencias.py
+import pytest
+
+from utils.sugerencias import IndiceSugerencias, distancia_edicion
+
+
+# --- distancia Damerau-Levenshtein ------------------------------------------
+
+@pytest.mark.parametrize("a,b,esperada", [
+    ("celular", "celular", 0),
+    ("celuar", "celular", 1),      # falta una letra
+    ("cellular", "celular", 1),    # sobra una letra
+    ("celulra", "celular", 1),     # transposición adyacente
+    ("zelular", "celular", 1),     # sustitución
+    ("clelura", "celular", 3),
+])
+def test_distancia_edicion(a, b, esperada):
+    assert distancia_edicion(a, b, 5) == esperada
+
+
+def test_distancia_edicion_corta_al_pasar_el_maximo():
+    assert distancia_edicion("bicicleta", "laptop", 2) == 3
+    assert distancia_edicion("a", "abcdef", 2) == 3
+
+
+# --- sugerencias ------------------------------------------------------------
+
+def _indice_sugerencias():
+    titulos = [
+        "Celular Samsung", "Celular Motorola", "Celular iPhone", "Cámara Canon",
+        "Bicicleta de montaña", "Balón de fútbol",
+    ]
+    return IndiceSugerencias(titulos, [(1, "Electrónica"), (2, "Deportes")])
+
+
+def test_sugerir_por_prefijo_ordena_por_frecuencia():
+    textos = [s["texto"] for s in _indice_sugerencias().sugerir("cel")]
+    assert textos[0] == "celular"
+
+
+def test_sugerir_tolera_errores_de_dedo():
+    textos = [s["texto"] for s in _indice_sugerencias().sugerir("bicilceta")]
+    assert "bicicleta" in textos
+
+
+def test_sugerir_conserva_acentos_y_palabras_previas():
+    textos = [s["texto"] for s in _indice_sugerencias().sugerir("funda cama")]
+    assert "funda cámara" in textos
+
+
+def test_sugerir_incluye_categorias():
+    sugerencias = _indice_sugerencias().sugerir("depor")
+    assert {"texto": "Deportes", "tipo": "categoria", "id_categoria": 2} in sugerencias
+
+
+def test_agregar_titulo_nuevo_aparece_en_sugerencias():
+    indice = _indice_sugerencias()
+    assert indice.sugerir("patin") == []
+    indice.agregar_titulo("Patineta eléctrica")
+    assert [s["texto"] for s in indice.sugerir("patin")] == ["patineta"]
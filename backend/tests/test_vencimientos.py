@@ -0,0 +1,94 @@
+# tests/test_vencimientos.py
+from datetime import datetime, timedelta
+
+from utils.vencimientos import penalizar_vencidos
+
+AHORA = datetime(2025, 1, 1, 12, 0)
+VENCIDO = AHORA - timedelta(minutes=1)
+
+
+def _usuarios(bd, *nombres):
+    from models import Usuario
+
+    usuarios = [Usuario(nombre_completo=n, correo=f"{n}@pruebas", contrasena="x", verificado=True)
+                for n in nombres]
+    bd.session.add_all(usuarios)
+    bd.session.commit()
+    return [u.id_usuario for u in usuarios]
+
+
+def _intercambio(bd, ofrece, recibe, estado="pendiente", solicitante="pendiente",
+                 receptor="pendiente", limite=VENCIDO):
+    from models import Intercambio
+
+    i = Intercambio(
+        id_solicitud=1, id_producto_solicitado=1, id_usuario_ofrece=ofrece, id_usuario_recibe=recibe,
+        estado=estado, estado_solicitante=solicitante, estado_receptor=receptor,
+        fecha_limite_confirmacion=limite,
+    )
+    bd.session.add(i)
+    bd.session.commit()
+    return i.id_intercambio
+
+
+def _verificados(bd, *ids):
+    from models import Usuario
+    bd.session.expire_all()
+    return [bd.session.get(Usuario, i).verificado for i in ids]
+
+
+def _estado(bd, id_intercambio):
+    from models import Intercambio
+    return bd.session.get(Intercambio, id_intercambio).estado
+
+
+def test_solo_pierde_el_verificado_quien_no_confirmo(bd):
+    ana, beto, caro, dani = _usuarios(bd, "ana", "beto", "caro", "dani")
+    # ana ofreció y aceptó; beto no confirmó
+    i1 = _intercambio(bd, ana, beto, solicitante="aceptado")
+    # dani recibió y aceptó; caro no confirmó
+    i2 = _intercambio(bd, caro, dani, receptor="aceptado")
+
+    assert penalizar_vencidos(ahora=AHORA) == 2
+
+    assert _verificados(bd, ana, beto, caro, dani) == [True, False, False, True]
+    assert _estado(bd, i1) == _estado(bd, i2) == "cancelado"
+
+
+def test_vencido_sin_confirmaciones_se_cancela_sin_penalizar(bd):
+    ana, beto = _usuarios(bd, "ana", "beto")
+    i = _intercambio(bd, ana, beto)
+
+    assert penalizar_vencidos(ahora=AHORA) == 1
+
+    from models import Intercambio
+    intercambio = bd.session.get(Intercambio, i)
+    assert (intercambio.estado, intercambio.fecha_limite_confirmacion) == ("cancelado", None)
+    assert _verificados(bd, ana, beto) == [True, True]
+
+
+def test_no_toca_los_que_no_han_vencido_ni_los_ya_resueltos(bd):
+    ana, beto = _usuarios(bd, "ana", "beto")
+    a_tiempo = _intercambio(bd, ana, beto, solicitante="aceptado", limite=AHORA + timedelta(minutes=5))
+    sin_plazo = _intercambio(bd, ana, beto, limite=None)
+    # finalizado: ambos aceptaron; el plazo viejo no debe importar
+    finalizado = _intercambio(bd, ana, beto, estado="aceptado", solicitante="aceptado",
+                              receptor="aceptado", limite=VENCIDO)
+    cancelado = _intercambio(bd, ana, beto, estado="cancelado", solicitante="aceptado")
+
+    assert penalizar_vencidos(ahora=AHORA) == 0
+
+    assert [_estado(bd, i) for i in (a_tiempo, sin_plazo, finalizado, cancelado)] == [
+        "pendiente", "pendiente", "aceptado", "cancelado",
+    ]
+    assert _verificados(bd, ana, beto) == [True, True]
+
+
+def test_respeta_el_lote(bd):
+    ana, beto = _usuarios(bd, "ana", "beto")
+    for _ in range(3):
+        _intercambio(bd, ana, beto)
+
+    assert penalizar_vencidos(ahora=AHORA, lote=2) == 2
+    assert penalizar_vencidos(ahora=AHORA, lote=2) == 1
+    assert penalizar_vencidos(ahora=AHORA, lote=2) == 0
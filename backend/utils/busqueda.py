@@ -0,0 +1,331 @@
+# utils/busqueda.py
+"""
+Búsqueda de texto para productos (titulo + descripcion).
+
+- En MySQL, si existe el índice FULLTEXT de sql/add_fulltext_productos.sql,
+  se usa MATCH ... AGAINST (la collation utf8mb4 ya ignora acentos).
+- Si no (SQLite en pruebas, MySQL sin el índice) se usa un índice invertido
+  en memoria, con acentos plegados, stemming ligero en español y ranking BM25.
+
+El índice en memoria es por proceso y no se construye en el camino del
+request (salvo el primero, si aún no existe):
+  - las rutas que crean o editan productos llaman a indexar_producto()
+    después del commit;
+  - una tarea de fondo (iniciar_refresco_indice) agrega cada
+    BUSQUEDA_REFRESCO_S los productos nuevos que crearon otros workers y
+    reconstruye todo cada BUSQUEDA_INDICE_TTL (ediciones hechas en otro worker).
+"""
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+
+from sqlalchemy import case, text
+from sqlalchemy.dialects.mysql import match
+
+from models import db, Producto
+
+BUSQUEDA_INDICE_TTL = int(os.getenv("BUSQUEDA_INDICE_TTL", "600"))
+BUSQUEDA_REFRESCO_S = int(os.getenv("BUSQUEDA_REFRESCO_S", "15"))
+BUSQUEDA_MAX_RESULTADOS = int(os.getenv("BUSQUEDA_MAX_RESULTADOS", "1000"))
+
+PESO_TITULO = 3
+PESO_DESCRIPCION = 1
+
+STOPWORDS = {
+    "a", "al", "con", "de", "del", "el", "en", "es", "la", "las", "lo", "los",
+    "mi", "para", "por", "que", "se", "sin", "su", "sus", "un", "una", "unas",
+    "unos", "y", "o", "muy", "mas",
+}
+
+_SUFIJOS = (
+    "amientos", "imientos", "amiento", "imiento", "aciones", "uciones",
+    "adoras", "adores", "ancias", "encias", "idades", "mente", "acion",
+    "ucion", "adora", "ador", "ancia", "encia", "idad", "ismo", "ista",
+    "able", "ible", "osos", "osas", "oso", "osa", "ivos", "ivas", "ivo", "iva",
+)
+
+_NO_ALFANUM = re.compile(r"[^a-z0-9ñ]+")
+
+
+def normalizar(texto: str | None) -> str:
+    """Minúsculas, sin acentos (la ñ se conserva) y solo letras/dígitos."""
+    if not texto:
+        return ""
+    texto = texto.lower().replace("ñ", "\0")
+    texto = "".join(
+        c for c in unicodedata.normalize("NFD", texto)
+        if unicodedata.category(c) != "Mn"
+    )
+    return _NO_ALFANUM.sub(" ", texto.replace("\0", "ñ")).strip()
+
+
+def stem(palabra: str) -> str:
+    """Stemmer ligero para español: quita plural, un sufijo derivativo y la vocal final."""
+    if len(palabra) <= 3 or palabra.isdigit():
+        return palabra
+
+    if palabra.endswith("es") and len(palabra) > 4 and palabra[-3] not in "aeiou":
+        palabra = palabra[:-2]
+    elif palabra.endswith("s") and len(palabra) > 3:
+        palabra = palabra[:-1]
+
+    for sufijo in _SUFIJOS:
+        if palabra.endswith(sufijo) and len(palabra) - len(sufijo) >= 3:
+            palabra = palabra[: -len(sufijo)]
+            break
+
+    if len(palabra) > 4 and palabra[-1] in "aeo":
+        palabra = palabra[:-1]
+    return palabra
+
+
+def tokenizar(texto: str | None) -> list[str]:
+    return [stem(t) for t in normalizar(texto).split() if t not in STOPWORDS]
+
+
+class IndiceInvertido:
+    """Índice término -> {id_producto: frecuencia ponderada}, con ranking BM25."""
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: dict[str, dict[int, int]] = defaultdict(dict)
+        self._terminos_doc: dict[int, set[str]] = {}
+        self._largo_doc: dict[int, int] = {}
+        self._largo_total = 0
+        self.max_id = 0
+
+    def __len__(self):
+        return len(self._largo_doc)
+
+    def agregar(self, id_doc: int, titulo: str | None, descripcion: str | None):
+        frecuencias: dict[str, int] = defaultdict(int)
+        for t in tokenizar(titulo):
+            frecuencias[t] += PESO_TITULO
+        for t in tokenizar(descripcion):
+            frecuencias[t] += PESO_DESCRIPCION
+
+        with self._lock:
+            self._quitar(id_doc)
+            for termino, tf in frecuencias.items():
+                self._postings[termino][id_doc] = tf
+            self._terminos_doc[id_doc] = set(frecuencias)
+            largo = sum(frecuencias.values())
+            self._largo_doc[id_doc] = largo
+            self._largo_total += largo
+            self.max_id = max(self.max_id, id_doc)
+
+    def quitar(self, id_doc: int):
+        with self._lock:
+            self._quitar(id_doc)
+
+    def _quitar(self, id_doc: int):
+        for termino in self._terminos_doc.pop(id_doc, ()):
+            docs = self._postings.get(termino)
+            if docs is not None:
+                docs.pop(id_doc, None)
+                if not docs:
+                    del self._postings[termino]
+        self._largo_total -= self._largo_doc.pop(id_doc, 0)
+
+    def buscar(self, consulta: str, limite: int | None = None) -> list[tuple[int, float]]:
+        terminos = set(tokenizar(consulta))
+        if not terminos:
+            return []
+
+        with self._lock:
+            n_docs = len(self._largo_doc)
+            if n_docs == 0:
+                return []
+            largo_medio = self._largo_total / n_docs
+
+            puntajes: dict[int, float] = defaultdict(float)
+            for termino in terminos:
+                docs = self._postings.get(termino)
+                if not docs:
+                    continue
+                idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                for id_doc, tf in docs.items():
+                    norm = self.K1 * (1 - self.B + self.B * self._largo_doc[id_doc] / largo_medio)
+                    puntajes[id_doc] += idf * tf * (self.K1 + 1) / (tf + norm)
+
+        ranking = sorted(puntajes.items(), key=lambda x: (-x[1], -x[0]))
+        return ranking[:limite] if limite else ranking
+
+
+# ---------------------------------------------------------------------------
+# Índice del proceso
+# ---------------------------------------------------------------------------
+
+_indice: IndiceInvertido | None = None
+_indice_construido_en = 0.0
+_indice_lock = threading.Lock()
+_refresco_activo = False
+_fulltext: bool | None = None
+
+
+def _construir_indice() -> IndiceInvertido:
+    nuevo = IndiceInvertido()
+    filas = db.session.query(
+        Producto.id_producto, Producto.titulo, Producto.descripcion
+    ).all()
+    for id_producto, titulo, descripcion in filas:
+        nuevo.agregar(id_producto, titulo, descripcion)
+    return nuevo
+
+
+def reconstruir_indice():
+    """Construye un índice nuevo y lo cambia por el actual de una vez."""
+    global _indice, _indice_construido_en
+    nuevo = _construir_indice()
+    with _indice_lock:
+        _indice = nuevo
+        _indice_construido_en = time.monotonic()
+    print(f"[INFO] Índice de búsqueda construido ({len(nuevo)} productos)")
+
+
+def agregar_nuevos() -> int:
+    """Indexa los productos con id mayor al último indexado (creados por otros workers)."""
+    indice = _indice
+    if indice is None:
+        return 0
+    filas = db.session.query(
+        Producto.id_producto, Producto.titulo, Producto.descripcion
+    ).filter(Producto.id_producto > indice.max_id).all()
+    for id_producto, titulo, descripcion in filas:
+        indice.agregar(id_producto, titulo, descripcion)
+    return len(filas)
+
+
+def obtener_indice() -> IndiceInvertido:
+    """
+    El índice actual. Solo se construye aquí si todavía no existe, o si vence
+    el TTL en un proceso sin la tarea de fondo (scripts, pruebas).
+    """
+    vencido = time.monotonic() - _indice_construido_en >= BUSQUEDA_INDICE_TTL
+    if _indice is not None and (_refresco_activo or not vencido):
+        return _indice
+
+    with _indice_lock:
+        construir = _indice is None or (
+            not _refresco_activo and time.monotonic() - _indice_construido_en >= BUSQUEDA_INDICE_TTL
+        )
+    if construir:
+        reconstruir_indice()
+    return _indice
+
+
+def _bucle_refresco(app, socketio, intervalo: int):
+    with app.app_context():
+        try:
+            if not usa_fulltext() and _indice is None:
+                reconstruir_indice()
+        except Exception as e:
+            print("WARN construyendo índice de búsqueda:", e)
+        finally:
+            db.session.remove()
+
+    while True:
+        socketio.sleep(intervalo)
+        with app.app_context():
+            try:
+                if _indice is None:
+                    continue  # con FULLTEXT nunca se usa
+                if time.monotonic() - _indice_construido_en >= BUSQUEDA_INDICE_TTL:
+                    reconstruir_indice()
+                else:
+                    agregar_nuevos()
+            except Exception as e:
+                print("WARN refrescando índice de búsqueda:", e)
+                db.session.rollback()
+            finally:
+                db.session.remove()
+
+
+def iniciar_refresco_indice(app, socketio, intervalo: int = BUSQUEDA_REFRESCO_S):
+    """Arranca el refresco del índice como tarea de fondo de SocketIO."""
+    global _refresco_activo
+    if intervalo <= 0:
+        print("[INFO] Refresco del índice de búsqueda desactivado")
+        return
+    _refresco_activo = True
+    socketio.start_background_task(_bucle_refresco, app, socketio, intervalo)
+    print(f"[INFO] Refresco del índice de búsqueda cada {intervalo}s")
+
+
+def indexar_producto(p: Producto):
+    """Actualización incremental tras crear/editar/cambiar estado un producto."""
+    if _indice is not None:
+        _indice.agregar(p.id_producto, p.titulo, p.descripcion)
+
+
+def usa_fulltext() -> bool:
+    """True si la BD es MySQL y productos tiene el índice FULLTEXT. Se consulta una vez por proceso."""
+    global _fulltext
+    if _fulltext is None:
+        _fulltext = False
+        if db.engine.dialect.name == "mysql":
+            try:
+                _fulltext = bool(db.session.execute(text(
+                    "SELECT 1 FROM information_schema.statistics "
+                    "WHERE table_schema = DATABASE() AND table_name = 'productos' "
+                    "AND index_type = 'FULLTEXT' LIMIT 1"
+                )).scalar())
+            except Exception as e:
+                print("WARN detectando índice FULLTEXT:", e)
+                db.session.rollback()
+    return _fulltext
+
+
+def _primeros_que_pasan(query, ranking: list[int], tope: int) -> list[int]:
+    """
+    Los primeros `tope` ids del ranking que cumplen los filtros de la query,
+    revisando por bloques de `tope` en orden de relevancia.
+    """
+    elegidos = []
+    for i in range(0, len(ranking), tope):
+        bloque = ranking[i:i + tope]
+        pasan = {
+            fila[0] for fila in
+            query.with_entities(Producto.id_producto).filter(Producto.id_producto.in_(bloque))
+        }
+        elegidos.extend(id_producto for id_producto in bloque if id_producto in pasan)
+        if len(elegidos) >= tope:
+            return elegidos[:tope]
+    return elegidos
+
+
+def aplicar_busqueda(query, q: str):
+    """
+    Filtra la query de productos por el texto q. Se llama con los demás
+    filtros ya puestos: el tope BUSQUEDA_MAX_RESULTADOS se aplica sobre los
+    que los cumplen, no antes.
+    Regresa (query, orden) donde orden es la lista de ORDER BY por relevancia.
+    """
+    if usa_fulltext():
+        terminos = [t for t in tokenizar(q) if len(t) >= 3]
+        if not terminos:
+            return query.filter(db.false()), [Producto.id_producto.desc()]
+        # stem + comodín: "balones" -> balon* encuentra "balón" y "balones"
+        booleana = " ".join(f"{t}*" for t in terminos)
+        relevancia = match(
+            Producto.titulo, Producto.descripcion, against=booleana
+        ).in_boolean_mode()
+        query = query.filter(relevancia > 0)
+        return query, [relevancia.desc(), Producto.id_producto.desc()]
+
+    ranking = [id_producto for id_producto, _ in obtener_indice().buscar(q)]
+    if len(ranking) > BUSQUEDA_MAX_RESULTADOS:
+        ranking = _primeros_que_pasan(query, ranking, BUSQUEDA_MAX_RESULTADOS)
+    if not ranking:
+        return query.filter(db.false()), [Producto.id_producto.desc()]
+
+    posiciones = {id_producto: pos for pos, id_producto in enumerate(ranking)}
+    query = query.filter(Producto.id_producto.in_(list(posiciones)))
+    return query, [case(posiciones, value=Producto.id_producto), Producto.id_producto.desc()]
@@ -0,0 +1,49 @@
+# utils/categorias.py
+import os
+import threading
+import time
+
+from models import Categoria
+
+# Mapa id_categoria -> nombre compartido por todo el proceso.
+# Las categorías casi no cambian, así que serializar un listado no debe
+# costar una consulta por producto. Se invalida en las escrituras de admin;
+# el TTL cubre a los otros workers, que no ven esa invalidación.
+CATEGORIAS_CACHE_TTL = int(os.getenv("CATEGORIAS_CACHE_TTL", "300"))
+_RECARGA_MINIMA = 5
+
+_lock = threading.Lock()
+_nombres: dict[int, str] | None = None
+_cargado_en = 0.0
+
+
+def nombres_categorias() -> dict[int, str]:
+    global _nombres, _cargado_en
+
+    nombres = _nombres
+    if nombres is not None and time.monotonic() - _cargado_en < CATEGORIAS_CACHE_TTL:
+        return nombres
+
+    with _lock:
+        if _nombres is None or time.monotonic() - _cargado_en >= CATEGORIAS_CACHE_TTL:
+            filas = Categoria.query.with_entities(Categoria.id_categoria, Categoria.nombre).all()
+            _nombres = {id_categoria: nombre for id_categoria, nombre in filas}
+            _cargado_en = time.monotonic()
+        return _nombres
+
+
+def nombre_categoria(id_categoria: int | None) -> str | None:
+    if id_categoria is None:
+        return None
+    nombres = nombres_categorias()
+    if id_categoria not in nombres and time.monotonic() - _cargado_en > _RECARGA_MINIMA:
+        # categoría creada en otro worker: recargamos, pero como mucho cada pocos segundos
+        invalidar_categorias()
+        nombres = nombres_categorias()
+    return nombres.get(id_categoria)
+
+
+def invalidar_categorias():
+    global _nombres
+    with _lock:
+        _nombres = None
@@ -0,0 +1,310 @@
+# utils/cola_moderacion.py
+"""
+Cola de trabajos de moderación con caché de veredictos.
+
+encolar() regresa de inmediato un TrabajoModeracion; un pool de
+MODERACION_PARALELO hilos (verdes con eventlet: la espera es de red) llama
+al proveedor y guarda el resultado en la fila del trabajo, así que cualquier
+worker puede responder GET /api/moderacion/trabajos/<id>.
+
+Niveles, del más barato al más caro (estadisticas() cuenta cuántos
+trabajos resuelve cada uno):
+  - "texto": utils/filtro_texto.py bloquea por título/descripción, sin
+    decodificar la imagen.
+  - "en_curso": ya hay un trabajo para lo mismo en este proceso; se regresa
+    ese en lugar de preguntar dos veces.
+  - "exacto": veredicto guardado para el mismo SHA-256 y el mismo texto.
+    Los veredictos se guardan y se buscan por proveedor: los de
+    ProveedorFalso no se reusan al configurar OpenAI.
+  - "perceptual": dHash a distancia de Hamming <= MODERACION_PHASH_DISTANCIA
+    (la misma foto recomprimida, redimensionada o con otro nombre).
+  - "modelo": se llama al proveedor.
+"""
+import hashlib
+import io
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from models import db, ModeracionResultado, TrabajoModeracion
+from utils import filtro_texto
+from utils.busqueda import normalizar
+from utils.moderacion import ModeracionNoDisponible, obtener_proveedor
+from utils.subidas import copia_reducida
+
+MODERACION_PARALELO = int(os.getenv("MODERACION_PARALELO", "4"))
+MODERACION_COLA_MAX = int(os.getenv("MODERACION_COLA_MAX", "100"))
+MODERACION_TIMEOUT = int(os.getenv("MODERACION_TIMEOUT", "60"))
+MODERACION_PHASH_DISTANCIA = int(os.getenv("MODERACION_PHASH_DISTANCIA", "4"))
+MODERACION_TRABAJOS_HORAS = int(os.getenv("MODERACION_TRABAJOS_HORAS", "24"))
+
+
+class ColaLlena(RuntimeError):
+    pass
+
+
+def dhash(imagen: bytes) -> str:
+    """Hash perceptual (dHash) de 64 bits en hex: gradientes de una miniatura de 9x8 en grises."""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(imagen)) as img:
+        img.draft("L", (64, 64))  # la copia ya es JPEG: se decodifica a 1/8
+        chica = img.convert("L").resize((9, 8), Image.LANCZOS)
+        pixeles = list(chica.getdata())
+    bits = 0
+    for fila in range(8):
+        for col in range(8):
+            izq = pixeles[fila * 9 + col]
+            der = pixeles[fila * 9 + col + 1]
+            bits = (bits << 1) | (1 if izq > der else 0)
+    return f"{bits:016x}"
+
+
+def texto_sha(titulo: str, descripcion: str) -> str:
+    return hashlib.sha256(f"{normalizar(titulo)}\n{normalizar(descripcion)}".encode("utf-8")).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Caché de veredictos
+# ---------------------------------------------------------------------------
+
+class _IndicePerceptual:
+    """(phash, texto_sha256, proveedor) -> id_resultado en memoria; se carga de la BD la primera vez."""
+
+    def __init__(self):
+        self._entradas: list[tuple[int, str, str, int]] | None = None
+        self._lock = threading.Lock()
+
+    def _cargar(self):
+        filas = db.session.query(
+            ModeracionResultado.phash, ModeracionResultado.texto_sha256,
+            ModeracionResultado.proveedor, ModeracionResultado.id_resultado,
+        ).all()
+        self._entradas = [(int(p, 16), t, prov, i) for p, t, prov, i in filas]
+
+    def buscar(self, phash: str, texto: str, proveedor: str) -> int | None:
+        if self._entradas is None:
+            with self._lock:
+                if self._entradas is None:
+                    self._cargar()
+        valor = int(phash, 16)
+        mejor = None
+        for otro, t, prov, id_resultado in self._entradas:
+            if t != texto or prov != proveedor:
+                continue
+            d = (valor ^ otro).bit_count()
+            if d <= MODERACION_PHASH_DISTANCIA and (mejor is None or d < mejor[0]):
+                mejor = (d, id_resultado)
+        return mejor[1] if mejor else None
+
+    def agregar(self, phash: str, texto: str, proveedor: str, id_resultado: int):
+        if self._entradas is not None:
+            with self._lock:
+                self._entradas.append((int(phash, 16), texto, proveedor, id_resultado))
+
+
+_indice = _IndicePerceptual()
+
+
+def buscar_en_cache(sha: str, texto: str, phash: str,
+                    proveedor: str) -> tuple[ModeracionResultado | None, str | None]:
+    exacto = ModeracionResultado.query.filter_by(
+        sha256=sha, texto_sha256=texto, proveedor=proveedor
+    ).first()
+    if exacto:
+        return exacto, "exacto"
+    id_resultado = _indice.buscar(phash, texto, proveedor)
+    if id_resultado is not None:
+        return db.session.get(ModeracionResultado, id_resultado), "perceptual"
+    return None, None
+
+
+def _guardar_en_cache(sha, texto, phash, resultado: dict, proveedor: str):
+    fila = ModeracionResultado(
+        sha256=sha, texto_sha256=texto, phash=phash,
+        is_illegal=resultado["is_illegal"], reason=(resultado["reason"] or "")[:500],
+        proveedor=proveedor,
+    )
+    db.session.add(fila)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # otro worker guardó lo mismo primero
+        db.session.rollback()
+        return
+    _indice.agregar(phash, texto, proveedor, fila.id_resultado)
+
+
+# ---------------------------------------------------------------------------
+# Trabajos
+# ---------------------------------------------------------------------------
+
+_pool: ThreadPoolExecutor | None = None
+_pool_lock = threading.Lock()
+_futuros: dict[str, object] = {}           # id_trabajo -> Future (solo de este proceso)
+_en_curso: dict[tuple[str, str], str] = {}  # (sha, texto) -> id_trabajo
+_ultima_purga = 0.0
+
+NIVELES = ("texto", "en_curso", "exacto", "perceptual", "modelo")
+_contadores: Counter = Counter()
+_contadores_lock = threading.Lock()
+
+
+def _contar(*claves: str):
+    with _contadores_lock:
+        _contadores.update(claves)
+
+
+def estadisticas() -> dict:
+    """Contadores de este proceso desde que arrancó."""
+    with _contadores_lock:
+        por_nivel = {n: _contadores[n] for n in NIVELES}
+        filtro = {n: _contadores[f"filtro_{n}"] for n in ("bloquear", "dudoso", "limpio")}
+    total = sum(por_nivel.values())
+    return {
+        "total": total,
+        "por_nivel": por_nivel,
+        "tasa": {n: round(c / total, 4) if total else 0.0 for n, c in por_nivel.items()},
+        "filtro_texto": filtro,
+        "llamadas_evitadas": total - por_nivel["modelo"],
+    }
+
+
+def _obtener_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=MODERACION_PARALELO, thread_name_prefix="moderacion")
+    return _pool
+
+
+def _procesar(app, id_trabajo, imagen, mimetype, sha, texto, phash, titulo, descripcion):
+    with app.app_context():
+        try:
+            trabajo = db.session.get(TrabajoModeracion, id_trabajo)
+            trabajo.estado = "procesando"
+            db.session.commit()
+
+            proveedor = obtener_proveedor()
+            try:
+                resultado = proveedor.clasificar(imagen, mimetype, titulo, descripcion)
+            except Exception as e:
+                db.session.rollback()
+                trabajo.estado = "error"
+                trabajo.error = f"{type(e).__name__}: {e}"[:255]
+                trabajo.terminado = datetime.utcnow()
+                db.session.commit()
+                raise
+
+            _guardar_en_cache(sha, texto, phash, resultado, proveedor.nombre)
+            trabajo.estado = "listo"
+            trabajo.is_illegal = resultado["is_illegal"]
+            trabajo.reason = (resultado["reason"] or "")[:500]
+            trabajo.terminado = datetime.utcnow()
+            db.session.commit()
+        finally:
+            _en_curso.pop((sha, texto), None)
+            db.session.remove()
+
+
+def _purgar_viejos():
+    global _ultima_purga
+    if time.monotonic() - _ultima_purga < 600:
+        return
+    _ultima_purga = time.monotonic()
+    limite = datetime.utcnow() - timedelta(hours=MODERACION_TRABAJOS_HORAS)
+    TrabajoModeracion.query.filter(TrabajoModeracion.creado < limite).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def _trabajo_listo(sha: str, is_illegal: bool, reason: str, nivel: str) -> TrabajoModeracion:
+    trabajo = TrabajoModeracion(
+        id_trabajo=uuid.uuid4().hex, estado="listo", sha256=sha,
+        is_illegal=is_illegal, reason=reason, cache=nivel,
+        terminado=datetime.utcnow(),
+    )
+    db.session.add(trabajo)
+    db.session.commit()
+    return trabajo
+
+
+def encolar(stream, sha: str, titulo: str, descripcion: str) -> TrabajoModeracion:
+    """
+    Crea el trabajo y regresa sin esperar al proveedor. Si algún nivel previo
+    al modelo lo resuelve, el trabajo nace "listo". La imagen solo se
+    decodifica (copia_reducida) si el texto no basta; lanza ValueError si no
+    es una imagen y ColaLlena si hay demasiados pendientes en este proceso.
+    """
+    _purgar_viejos()
+
+    filtro = filtro_texto.clasificar(titulo, descripcion)
+    if filtro["nivel"] == "bloquear":
+        _contar("filtro_bloquear", "texto")
+        reason = f'El texto menciona "{filtro["termino"]}" ({filtro["categoria"]})'
+        return _trabajo_listo(sha, True, reason, "texto")
+    _contar(f"filtro_{filtro['nivel']}")
+
+    texto = texto_sha(titulo, descripcion)
+    en_curso = _en_curso.get((sha, texto))
+    if en_curso:
+        trabajo = db.session.get(TrabajoModeracion, en_curso)
+        if trabajo is not None:
+            _contar("en_curso")
+            return trabajo
+
+    imagen, mimetype = copia_reducida(stream)
+    phash = dhash(imagen)
+
+    previo, tipo = buscar_en_cache(sha, texto, phash, obtener_proveedor().nombre)
+    if previo is not None:
+        _contar(tipo)
+        return _trabajo_listo(sha, previo.is_illegal, previo.reason, tipo)
+
+    if len(_futuros) >= MODERACION_COLA_MAX:
+        raise ColaLlena(f"{len(_futuros)} trabajos de moderación pendientes")
+
+    _contar("modelo")
+    trabajo = TrabajoModeracion(id_trabajo=uuid.uuid4().hex, estado="pendiente", sha256=sha)
+    db.session.add(trabajo)
+    db.session.commit()
+
+    id_trabajo = trabajo.id_trabajo
+    _en_curso[(sha, texto)] = id_trabajo
+    futuro = _obtener_pool().submit(
+        _procesar, current_app._get_current_object(), id_trabajo,
+        imagen, mimetype, sha, texto, phash, titulo, descripcion,
+    )
+    _futuros[id_trabajo] = futuro
+    futuro.add_done_callback(lambda _: _futuros.pop(id_trabajo, None))
+    return trabajo
+
+
+def esperar(trabajo: TrabajoModeracion, timeout: float = MODERACION_TIMEOUT) -> TrabajoModeracion:
+    """
+    Espera a que termine un trabajo encolado en este proceso (para la ruta
+    síncrona /imagen). Relanza la excepción del proveedor si falló;
+    TimeoutError si no terminó a tiempo.
+    """
+    id_trabajo = trabajo.id_trabajo
+    futuro = _futuros.get(id_trabajo)
+    if futuro is not None:
+        futuro.result(timeout=timeout)
+
+    # ya había terminado (o lo tomó otro proceso): se lee la fila
+    db.session.expire_all()
+    trabajo = db.session.get(TrabajoModeracion, id_trabajo)
+    if trabajo.estado == "error":
+        if (trabajo.error or "").startswith(ModeracionNoDisponible.__name__):
+            raise ModeracionNoDisponible(trabajo.error)
+        raise RuntimeError(trabajo.error)
+    if trabajo.estado != "listo":
+        raise TimeoutError(f"trabajo {id_trabajo} en estado {trabajo.estado}")
+    return trabajo
@@ -0,0 +1,81 @@
+# utils/cola_socket.py
+"""
+Socket.IO con varios workers.
+
+Con un solo proceso, los emit a un room solo llegan a los sockets de ese
+proceso. Con SOCKETIO_MESSAGE_QUEUE cada emit (y cada close_room) se publica
+en una cola y todos los workers lo reparten a sus propios sockets:
+
+  - vacío (default): un solo proceso, como siempre.
+  - redis://..., rediss://..., amqp://..., kafka://..., zmq+tcp://...:
+    lo resuelve Flask-SocketIO con su manager correspondiente.
+  - memory:// : ColaEnMemoria, varios servidores dentro del mismo proceso.
+    Sirve para pruebas y para bench/fanout_socketio.py; no cruza procesos.
+
+Cada socket vive en un solo worker. Con la cola activa solo se acepta el
+transporte websocket (el front ya lo usa así): con long-polling cada request
+podría caer en otro worker y el balanceador tendría que tener sticky sessions.
+SOCKETIO_TRANSPORTES permite cambiarlo si el balanceador sí las tiene.
+"""
+import os
+import pickle
+import queue
+import threading
+from collections import defaultdict
+
+import socketio
+
+SOCKETIO_MESSAGE_QUEUE = os.getenv("SOCKETIO_MESSAGE_QUEUE", "").strip()
+SOCKETIO_CANAL = os.getenv("SOCKETIO_CANAL", "trueque-socketio")
+
+
+class ColaEnMemoria(socketio.PubSubManager):
+    """
+    PubSubManager cuyo "broker" es un diccionario de colas del proceso.
+    Los mensajes se serializan con pickle igual que en RedisManager, para
+    que un payload que no viajaría por Redis tampoco viaje aquí.
+    """
+    name = "memory"
+
+    _buzones: dict[str, list[queue.Queue]] = defaultdict(list)
+    _lock = threading.Lock()
+
+    def __init__(self, url="memory://", channel="flask-socketio", write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self._buzon = None
+        if not write_only:
+            self._buzon = queue.Queue()
+            with self._lock:
+                self._buzones[channel].append(self._buzon)
+
+    def _publish(self, data):
+        mensaje = pickle.dumps(data)
+        for buzon in list(self._buzones[self.channel]):
+            buzon.put(mensaje)
+
+    def _listen(self):
+        while True:
+            yield pickle.loads(self._buzon.get())
+
+    def cerrar(self):
+        """Deja de recibir (para que el bench pueda tirar servidores)."""
+        with self._lock:
+            if self._buzon in self._buzones[self.channel]:
+                self._buzones[self.channel].remove(self._buzon)
+
+
+def opciones_socketio(url: str | None = None) -> dict:
+    """kwargs para socketio.init_app() según SOCKETIO_MESSAGE_QUEUE."""
+    url = SOCKETIO_MESSAGE_QUEUE if url is None else url
+    if not url:
+        return {}
+
+    transportes = os.getenv("SOCKETIO_TRANSPORTES", "websocket")
+    opciones = {"transports": [t.strip() for t in transportes.split(",") if t.strip()]}
+
+    if url.startswith("memory://"):
+        opciones["client_manager"] = ColaEnMemoria(url, channel=SOCKETIO_CANAL)
+    else:
+        opciones["message_queue"] = url
+        opciones["channel"] = SOCKETIO_CANAL
+    return opciones
@@ -0,0 +1,189 @@
+# utils/escritor_mensajes.py
+"""
+Escritura diferida (write-behind) de los mensajes del chat.
+
+CHAT_PERSISTENCIA:
+  - "sync" (default): cada nuevo_mensaje hace su INSERT + COMMIT antes de
+    emitir, igual que siempre.
+  - "lote": el mensaje se emite al room de inmediato con id_mensaje null y
+    se encola; una tarea de fondo junta lo pendiente cada CHAT_LOTE_MS y lo
+    guarda en un solo INSERT multi-fila. El id_mensaje real se ve al
+    recargar el historial. Lo encolado se vacía también al cerrar el proceso
+    (atexit / worker_exit de gunicorn); un kill -9 sí pierde el último lote.
+
+Todo mensaje, en los dos modos, lleva un id_provisional (uuid) que se emite
+y se guarda con la fila. Un cliente que reconecta pide
+GET /mensajes?after_fecha=<creado de su último mensaje> y descarta los
+id_provisional que ya tiene: after_id no sirve en modo lote porque el
+mensaje se emitió sin id_mensaje.
+
+Las filas se validan antes de encolarse (preparar_fila). Si aun así un lote
+falla, se reintenta fila por fila y las que vuelven a fallar se descartan
+con un WARN; si lo que falla es la conexión, lo no guardado regresa a la
+cola. Con CHAT_PENDIENTES_MAX filas en cola encolar() se niega y
+nuevo_mensaje guarda en modo sync: la BD lenta frena a quien escribe en
+lugar de crecer la memoria del worker.
+"""
+import atexit
+import math
+import os
+import threading
+import uuid
+
+from sqlalchemy import exc, insert
+
+from models import db, IntercambioMensaje
+
+CHAT_PERSISTENCIA = os.getenv("CHAT_PERSISTENCIA", "sync").lower()
+CHAT_LOTE_MS = int(os.getenv("CHAT_LOTE_MS", "20"))
+CHAT_LOTE_MAX = int(os.getenv("CHAT_LOTE_MAX", "500"))
+CHAT_PENDIENTES_MAX = int(os.getenv("CHAT_PENDIENTES_MAX", "10000"))
+CHAT_CONTENIDO_MAX = int(os.getenv("CHAT_CONTENIDO_MAX", "4000"))
+
+_pendientes: list[dict] = []
+_lock = threading.Lock()
+_app = None
+
+
+def en_lote() -> bool:
+    """True solo si el modo es "lote" y la tarea de vaciado está corriendo."""
+    return CHAT_PERSISTENCIA == "lote" and _app is not None
+
+
+def _coordenada(valor, limite: float) -> float | None:
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(numero) or abs(numero) > limite:
+        return None
+    return round(numero, 7)  # Numeric(10, 7)
+
+
+def preparar_fila(id_intercambio, id_usuario: int, tipo, contenido, lat, lng, creado) -> dict | None:
+    """
+    Fila de intercambio_mensajes con los tipos ya convertidos, o None si el
+    mensaje no es válido (tipo desconocido, texto vacío o muy largo,
+    coordenadas fuera de rango).
+    """
+    try:
+        id_intercambio = int(id_intercambio)
+    except (TypeError, ValueError):
+        return None
+
+    fila = {
+        "id_intercambio": id_intercambio,
+        "id_usuario": id_usuario,
+        "tipo": tipo,
+        "contenido": None,
+        "lat": None,
+        "lng": None,
+        "creado": creado,
+        "id_provisional": uuid.uuid4().hex,
+    }
+    if tipo == "texto":
+        if not isinstance(contenido, str) or not contenido.strip() or len(contenido) > CHAT_CONTENIDO_MAX:
+            return None
+        fila["contenido"] = contenido
+    elif tipo == "ubicacion":
+        fila["lat"] = _coordenada(lat, 90)
+        fila["lng"] = _coordenada(lng, 180)
+        if fila["lat"] is None or fila["lng"] is None:
+            return None
+    else:
+        return None
+    return fila
+
+
+def encolar(fila: dict) -> bool:
+    """Encola la fila; False si la cola está llena y hay que guardarla en sync."""
+    with _lock:
+        if len(_pendientes) >= CHAT_PENDIENTES_MAX:
+            return False
+        _pendientes.append(fila)
+    return True
+
+
+def _regresar_a_la_cola(filas: list[dict]):
+    global _pendientes
+    with _lock:
+        _pendientes = filas + _pendientes
+
+
+def _guardar_una_por_una(lote: list[dict]) -> int:
+    """Reintento de un lote que falló: descarta solo las filas que fallan solas."""
+    guardadas = 0
+    for i, fila in enumerate(lote):
+        try:
+            db.session.execute(insert(IntercambioMensaje), [fila])
+            db.session.commit()
+            guardadas += 1
+        except exc.OperationalError as e:
+            # la BD no responde: no es culpa de la fila, se reintenta después
+            db.session.rollback()
+            print(f"WARN BD no disponible, {len(lote) - i} mensajes regresan a la cola:", e)
+            _regresar_a_la_cola(lote[i:])
+            break
+        except Exception as e:
+            db.session.rollback()
+            print(f"WARN mensaje descartado (intercambio {fila.get('id_intercambio')}, "
+                  f"usuario {fila.get('id_usuario')}):", e)
+    return guardadas
+
+
+def vaciar() -> int:
+    """Guarda lo pendiente en un INSERT multi-fila. Regresa cuántas filas escribió."""
+    global _pendientes
+    with _lock:
+        if not _pendientes:
+            return 0
+        lote, _pendientes = _pendientes[:CHAT_LOTE_MAX], _pendientes[CHAT_LOTE_MAX:]
+
+    try:
+        db.session.execute(insert(IntercambioMensaje), lote)
+        db.session.commit()
+    except Exception as e:
+        print(f"WARN guardando lote de {len(lote)} mensajes, se reintenta uno por uno:", e)
+        db.session.rollback()
+        return _guardar_una_por_una(lote)
+    return len(lote)
+
+
+def _bucle_vaciado(app, socketio, intervalo: float):
+    while True:
+        socketio.sleep(intervalo)
+        with app.app_context():
+            try:
+                while vaciar() >= CHAT_LOTE_MAX:
+                    pass
+            except Exception as e:
+                # el hilo no debe morir: si muere, los mensajes se quedan en memoria para siempre
+                print("WARN vaciando mensajes del chat:", e)
+                db.session.rollback()
+            finally:
+                db.session.remove()
+
+
+def vaciar_al_cerrar():
+    if _app is None:
+        return
+    with _app.app_context():
+        total = 0
+        while True:
+            n = vaciar()
+            if n == 0:
+                break
+            total += n
+        if total:
+            print(f"[INFO] {total} mensajes pendientes guardados al cerrar")
+
+
+def iniciar_escritor_mensajes(app, socketio):
+    """Arranca el vaciado periódico si CHAT_PERSISTENCIA=lote. En modo sync no hace nada."""
+    global _app
+    if CHAT_PERSISTENCIA != "lote":
+        return
+    _app = app
+    socketio.start_background_task(_bucle_vaciado, app, socketio, CHAT_LOTE_MS / 1000)
+    atexit.register(vaciar_al_cerrar)
+    print(f"[INFO] Mensajes del chat en lote cada {CHAT_LOTE_MS}ms")
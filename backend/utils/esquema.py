@@ -0,0 +1,254 @@
+# utils/esquema.py
+"""
+Migraciones versionadas del esquema.
+
+La versión aplicada vive en la tabla esquema_version (una fila por migración).
+Cada migración es una función que recibe la conexión y es idempotente: sobre
+una BD creada con database/bd_truquefinal.sql o con los scripts de sql/ solo
+agrega lo que falte.
+
+Al arrancar, create_app() llama a al_iniciar() según DB_ESQUEMA_AL_INICIAR:
+  - "migrar" (default): si la versión guardada está al día es un solo SELECT;
+    si no, aplica lo pendiente (en MySQL bajo GET_LOCK, para que varios
+    workers arrancando a la vez no migren dos veces).
+  - "verificar": solo compara la versión; si falta alguna migración no arranca.
+    Es el modo para los workers de producción, con `python migrate.py` antes.
+  - "omitir": no toca la BD.
+"""
+from datetime import datetime
+
+from sqlalchemy import (
+    Column, DateTime, Integer, MetaData, String, Table, func, insert, inspect, select, text,
+)
+from sqlalchemy.exc import DBAPIError
+
+from models import db
+
+NOMBRE_LOCK = "trueque_migraciones"
+ESPERA_LOCK = 120  # segundos
+
+_meta = MetaData()
+esquema_version = Table(
+    "esquema_version", _meta,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("descripcion", String(255), nullable=False),
+    Column("aplicada", DateTime, nullable=False),
+)
+
+MIGRACIONES: list[tuple[int, str, callable]] = []
+
+
+class EsquemaDesactualizado(RuntimeError):
+    pass
+
+
+def migracion(version: int, descripcion: str):
+    def registrar(fn):
+        MIGRACIONES.append((version, descripcion, fn))
+        MIGRACIONES.sort(key=lambda m: m[0])
+        return fn
+    return registrar
+
+
+def version_esperada() -> int:
+    return MIGRACIONES[-1][0] if MIGRACIONES else 0
+
+
+# ---------------------------------------------------------------------------
+# Helpers para las migraciones
+# ---------------------------------------------------------------------------
+
+def _tiene_columna(conn, tabla: str, columna: str) -> bool:
+    return any(c["name"] == columna for c in inspect(conn).get_columns(tabla))
+
+
+def _tiene_indice(conn, tabla: str, nombre: str) -> bool:
+    return any(i["name"] == nombre for i in inspect(conn).get_indexes(tabla))
+
+
+def _crear_indice_del_modelo(conn, tabla: str, nombre: str):
+    """Crea un índice declarado en __table_args__ de models.py si todavía no existe."""
+    if _tiene_indice(conn, tabla, nombre):
+        return
+    indice = next(i for i in db.metadata.tables[tabla].indexes if i.name == nombre)
+    indice.create(bind=conn)
+
+
+# ---------------------------------------------------------------------------
+# Migraciones (agregar siempre al final, nunca editar una ya publicada)
+# ---------------------------------------------------------------------------
+
+@migracion(1, "tablas base de models.py")
+def _m001_tablas(conn):
+    db.metadata.create_all(bind=conn)
+
+
+@migracion(2, "solicitudes.diferencia_propuesta")
+def _m002_diferencia_propuesta(conn):
+    # antes: sql/add_column_solicitudes_diferencia.sql
+    if not _tiene_columna(conn, "solicitudes", "diferencia_propuesta"):
+        conn.execute(text(
+            "ALTER TABLE solicitudes ADD COLUMN diferencia_propuesta DECIMAL(10,2) NULL"
+        ))
+
+
+@migracion(3, "índices de listados paginados y del barrido de vencidos")
+def _m003_indices(conn):
+    # antes: sql/add_index_*.sql
+    _crear_indice_del_modelo(conn, "productos", "idx_productos_estado_fecha")
+    _crear_indice_del_modelo(conn, "solicitudes", "idx_solicitudes_solicitante_creado")
+    _crear_indice_del_modelo(conn, "intercambios", "idx_intercambios_estado_limite")
+
+
+@migracion(4, "FULLTEXT de productos (solo MySQL)")
+def _m004_fulltext(conn):
+    # antes: sql/add_fulltext_productos.sql. En otros motores la búsqueda
+    # usa el índice en memoria de utils/busqueda.py
+    if conn.dialect.name != "mysql":
+        return
+    if not _tiene_indice(conn, "productos", "ft_productos_titulo_descripcion"):
+        conn.execute(text(
+            "ALTER TABLE productos ADD FULLTEXT INDEX ft_productos_titulo_descripcion (titulo, descripcion)"
+        ))
+
+
+@migracion(5, "categorías base")
+def _m005_categorias(conn):
+    from models import Categoria
+
+    tabla = Categoria.__table__
+    if conn.execute(select(func.count()).select_from(tabla)).scalar():
+        return
+    conn.execute(insert(tabla), [
+        {"nombre": "Electrónicos", "descripcion": "Computadoras, consolas, TV"},
+        {"nombre": "Celulares", "descripcion": "Teléfonos y accesorios"},
+        {"nombre": "Hogar", "descripcion": "Muebles y electrodomésticos"},
+        {"nombre": "Deportes", "descripcion": "Artículos deportivos"},
+        {"nombre": "Ropa", "descripcion": "Ropa y calzado"},
+        {"nombre": "Otros", "descripcion": "Varios"},
+    ])
+
+
+@migracion(6, "tabla archivos (uploads por contenido)")
+def _m006_archivos(conn):
+    from models import Archivo
+    Archivo.__table__.create(bind=conn, checkfirst=True)
+
+
+@migracion(7, "caché y trabajos de moderación")
+def _m007_moderacion(conn):
+    from models import ModeracionResultado, TrabajoModeracion
+    ModeracionResultado.__table__.create(bind=conn, checkfirst=True)
+    TrabajoModeracion.__table__.create(bind=conn, checkfirst=True)
+
+
+@migracion(8, "intercambio_mensajes.id_provisional e índice por fecha")
+def _m008_mensajes_provisional(conn):
+    if not _tiene_columna(conn, "intercambio_mensajes", "id_provisional"):
+        conn.execute(text(
+            "ALTER TABLE intercambio_mensajes ADD COLUMN id_provisional VARCHAR(32) NULL"
+        ))
+    _crear_indice_del_modelo(conn, "intercambio_mensajes", "idx_mensajes_intercambio_creado")
+
+
+@migracion(9, "caché de moderación por proveedor")
+def _m009_moderacion_por_proveedor(conn):
+    from models import ModeracionResultado
+
+    unicas = {u["name"] for u in inspect(conn).get_unique_constraints("moderacion_resultados")}
+    if "uq_moderacion_imagen_texto" not in unicas:
+        return
+    if conn.dialect.name == "mysql":
+        conn.execute(text(
+            "ALTER TABLE moderacion_resultados DROP INDEX uq_moderacion_imagen_texto, "
+            "ADD CONSTRAINT uq_moderacion_imagen_texto_proveedor UNIQUE (sha256, texto_sha256, proveedor)"
+        ))
+    else:
+        # SQLite no cambia restricciones con ALTER; es un caché, se vuelve a llenar
+        ModeracionResultado.__table__.drop(bind=conn)
+        ModeracionResultado.__table__.create(bind=conn)
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def version_actual(conn) -> int:
+    """Versión guardada; 0 si la tabla esquema_version todavía no existe."""
+    try:
+        return conn.execute(select(func.max(esquema_version.c.version))).scalar() or 0
+    except DBAPIError:
+        conn.rollback()
+        return 0
+
+
+def _bloquear(conn):
+    if conn.dialect.name == "mysql":
+        obtenido = conn.execute(
+            text("SELECT GET_LOCK(:nombre, :espera)"),
+            {"nombre": NOMBRE_LOCK, "espera": ESPERA_LOCK},
+        ).scalar()
+        if obtenido != 1:
+            raise RuntimeError(f"No se obtuvo el lock {NOMBRE_LOCK} en {ESPERA_LOCK}s")
+
+
+def _liberar(conn):
+    if conn.dialect.name == "mysql":
+        conn.execute(text("SELECT RELEASE_LOCK(:nombre)"), {"nombre": NOMBRE_LOCK})
+
+
+def migrar(engine=None) -> list[int]:
+    """Aplica las migraciones pendientes en orden. Regresa las versiones aplicadas."""
+    engine = engine or db.engine
+    aplicadas = []
+    with engine.connect() as conn:
+        if version_actual(conn) >= version_esperada():
+            return aplicadas
+        conn.rollback()
+
+        _bloquear(conn)
+        try:
+            esquema_version.create(bind=conn, checkfirst=True)
+            conn.commit()
+            # se vuelve a leer con el lock tomado: otro worker pudo haber migrado
+            actual = version_actual(conn)
+            for version, descripcion, fn in MIGRACIONES:
+                if version <= actual:
+                    continue
+                fn(conn)
+                conn.execute(insert(esquema_version).values(
+                    version=version, descripcion=descripcion, aplicada=datetime.utcnow(),
+                ))
+                conn.commit()
+                aplicadas.append(version)
+                print(f"[INFO] Migración {version:03d} aplicada: {descripcion}")
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            _liberar(conn)
+            conn.commit()
+    return aplicadas
+
+
+def pendientes(engine=None) -> list[tuple[int, str]]:
+    engine = engine or db.engine
+    with engine.connect() as conn:
+        actual = version_actual(conn)
+    return [(v, d) for v, d, _ in MIGRACIONES if v > actual]
+
+
+def al_iniciar(modo: str):
+    """Lo que hace create_app() con el esquema, según DB_ESQUEMA_AL_INICIAR."""
+    modo = (modo or "migrar").lower()
+    if modo == "omitir":
+        return
+    if modo == "verificar":
+        faltan = pendientes()
+        if faltan:
+            raise EsquemaDesactualizado(
+                f"Faltan {len(faltan)} migraciones (hasta la {faltan[-1][0]:03d}); "
+                "correr `python migrate.py` antes de arrancar"
+            )
+        return
+    migrar()
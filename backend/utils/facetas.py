@@ -0,0 +1,102 @@
+# utils/facetas.py
+from collections import Counter
+
+from sqlalchemy import case, func, literal_column
+
+from models import Producto
+from utils.categorias import nombres_categorias
+
+# Cortes del histograma de valor_estimado (el último rango es "de ahí para arriba")
+RANGOS_VALOR = [0, 500, 1000, 2500, 5000, 10000]
+MAX_UBICACIONES = 20
+
+# Filtros del listado que además son faceta. calcular_facetas() los recibe
+# aparte de la query para contar cada faceta sin su propio filtro.
+COLUMNAS_FILTRO = {
+    "id_categoria": Producto.id_categoria,
+    "estado": Producto.estado,
+}
+
+
+def _rango_valor():
+    return case(
+        *[
+            (Producto.valor_estimado < hasta, i)
+            for i, hasta in enumerate(RANGOS_VALOR[1:])
+        ],
+        else_=len(RANGOS_VALOR) - 1,
+    )
+
+
+def aplicar_filtros(query, filtros: dict):
+    """Aplica los filtros con faceta ({"id_categoria": 3, "estado": "disponible"})."""
+    for campo, valor in filtros.items():
+        query = query.filter(COLUMNAS_FILTRO[campo] == valor)
+    return query
+
+
+def _pasa(fila: dict, filtros: dict, sin: str | None = None) -> bool:
+    return all(fila[campo] == valor for campo, valor in filtros.items() if campo != sin)
+
+
+def calcular_facetas(query, filtros: dict | None = None) -> dict:
+    """
+    Conteos para la barra de filtros (facetado disyuntivo): cada faceta se
+    cuenta con todos los filtros del listado menos el suyo, para que con
+    id_categoria=3 sigan saliendo las demás categorías y cuántos hay en cada una.
+
+    `query` trae los filtros sin faceta (usuario, búsqueda) y `filtros` los de
+    COLUMNAS_FILTRO. Es un solo GROUP BY (id_categoria, estado, ubicacion,
+    rango de valor) sobre `query`; cada faceta se arma sumando en Python las
+    filas que pasan los otros filtros.
+    """
+    filtros = filtros or {}
+    rango = _rango_valor().label("rango_valor")
+    filas = (
+        query
+        .order_by(None)
+        .with_entities(
+            Producto.id_categoria,
+            Producto.estado,
+            Producto.ubicacion,
+            rango,
+            func.count(Producto.id_producto),
+        )
+        # se agrupa por el alias para no repetir el CASE (MySQL y SQLite lo aceptan)
+        .group_by(
+            Producto.id_categoria, Producto.estado, Producto.ubicacion,
+            literal_column("rango_valor"),
+        )
+        .all()
+    )
+
+    por_categoria, por_estado, por_ubicacion, por_rango = Counter(), Counter(), Counter(), Counter()
+    for id_categoria, estado, ubicacion, i_rango, n in filas:
+        fila = {"id_categoria": id_categoria, "estado": estado}
+        if _pasa(fila, filtros, sin="id_categoria"):
+            por_categoria[id_categoria] += n
+        if _pasa(fila, filtros, sin="estado"):
+            por_estado[estado] += n
+        if _pasa(fila, filtros):
+            # sin filtro propio: cuentan con todos los filtros
+            por_ubicacion[ubicacion] += n
+            por_rango[int(i_rango)] += n
+
+    nombres = nombres_categorias()
+    rangos = []
+    for i, desde in enumerate(RANGOS_VALOR):
+        hasta = RANGOS_VALOR[i + 1] if i + 1 < len(RANGOS_VALOR) else None
+        rangos.append({"desde": desde, "hasta": hasta, "conteo": por_rango.get(i, 0)})
+
+    return {
+        "id_categoria": [
+            {"id_categoria": id_cat, "nombre": nombres.get(id_cat), "conteo": n}
+            for id_cat, n in por_categoria.most_common()
+        ],
+        "estado": [{"valor": e, "conteo": n} for e, n in por_estado.most_common()],
+        "valor_estimado": rangos,
+        "ubicacion": [
+            {"valor": u, "conteo": n}
+            for u, n in por_ubicacion.most_common(MAX_UBICACIONES)
+        ],
+    }
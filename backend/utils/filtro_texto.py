@@ -0,0 +1,220 @@
+# utils/filtro_texto.py
+"""
+Primer filtro de moderación: solo título y descripción, sin llamar al modelo.
+
+Un autómata Aho-Corasick con todas las frases se construye una vez y recorre
+el texto normalizado (utils.busqueda.normalizar: minúsculas, sin acentos) en
+una sola pasada, sin importar cuántas frases haya. Solo cuentan coincidencias
+de palabra completa; se acepta el plural con "s"/"es".
+
+clasificar() regresa el nivel:
+  - "bloquear": menciona algo de BLOQUEAR y ninguna frase de PERMITIDAS ni
+    un modificador lo cubre ("vape", "tequila", "escopeta"...). Se rechaza
+    sin ver la imagen.
+  - "dudoso": solo términos de DUDOSO, o un término bloqueado dentro de una
+    frase permitida o con un modificador ("figura de ...", "vasos para
+    tequila"). Se manda al modelo.
+  - "limpio": nada conocido. Se manda al modelo (la imagen puede decir otra cosa).
+
+En BLOQUEAR solo van términos que casi nunca significan otra cosa: los que
+también son palabras comunes, nombres o herramientas ("ron" en "Ron Weasley",
+"revolver" la masa, "pistola de clavos", "vasos para whisky", "estuche para
+pasaporte") van en DUDOSO.
+"""
+import os
+from collections import deque
+
+from utils.busqueda import normalizar
+
+MODERACION_FILTRO_TEXTO = os.getenv("MODERACION_FILTRO_TEXTO", "1") == "1"
+
+# categoría -> frases (se normalizan al construir el autómata)
+BLOQUEAR = {
+    "drogas": [
+        "marihuana", "mariguana", "cannabis", "cocaina", "metanfetamina", "heroina", "lsd",
+        "extasis", "hongos alucinogenos",
+    ],
+    "vapes y tabaco": [
+        "vape", "vaper", "vapeador", "juul", "elf bar", "cigarro electronico", "cajetilla",
+        "nicotina",
+    ],
+    "alcohol": [
+        "caguama", "tequila", "vodka", "mezcal", "brandy", "licor",
+    ],
+    "armas": [
+        "escopeta", "municion", "cartuchos calibre",
+        "navaja automatica", "cuchillo tactico", "manopla", "taser",
+    ],
+    "pirotecnia": ["pirotecnia", "explosivo", "polvora", "petardo"],
+    "medicamentos controlados": [
+        "clonazepam", "alprazolam", "tramadol", "rivotril", "fentanilo", "receta medica",
+    ],
+    "documentos": [
+        "credencial ine", "credencial del ine", "credencial de elector",
+        "licencia de conducir",
+    ],
+    "contenido para adultos": ["juguete sexual", "vibrador", "consolador"],
+}
+
+# cubren un término bloqueado y lo vuelven "dudoso"
+PERMITIDAS = [
+    "municion de airsoft", "municion para airsoft", "municion de nerf", "municion nerf",
+]
+
+# antes o después de un término bloqueado lo cubren como una frase permitida
+MODIFICADORES = {
+    "antes": ["figura de", "figura", "libro", "libro de", "poster de", "disfraz de", "juguete"],
+    "despues": [
+        "de juguete", "de plastico", "de peluche", "de carton", "de chocolate", "decorativa",
+        "decorativo",
+    ],
+}
+
+# "<objeto> para|de <término>": el artículo es el objeto, no el término
+# ("vasos para tequila", "estuche de escopeta"). "botella" y "caja" no van:
+# "botella de tequila" sí es el producto.
+OBJETOS = [
+    "vaso", "copa", "caballito", "tarro", "hielera", "destapador", "abridor", "sacacorchos",
+    "estuche", "funda", "porta", "soporte", "exhibidor", "letrero", "anuncio",
+]
+
+# no bloquean, pero quedan registrados como "dudoso"
+DUDOSO = [
+    "navaja", "cuchillo", "machete", "pastillas", "medicamento", "botella", "encendedor",
+    "pipa", "grinder", "forjadora", "hookah", "shisha", "arma", "replica", "airsoft", "balines",
+    "pods", "puro", "tabaco", "mota", "perico", "tachas", "champagne", "ginebra", "ine",
+    "ron", "revolver", "rifle", "balas", "cohetes", "tarjeta de credito", "tarjeta de debito",
+    "pistola", "cerveza", "vino tinto", "vino blanco", "whisky", "whiskey", "pasaporte",
+    "cigarros",
+]
+
+
+def _plural(palabra: str) -> str:
+    if palabra.endswith("s"):
+        return palabra
+    return palabra + ("s" if palabra[-1] in "aeiou" else "es")
+
+
+_ANTES = [normalizar(m) + " " for m in MODIFICADORES["antes"]] + [
+    f"{forma} {prep} "
+    for objeto in OBJETOS
+    for forma in (objeto, _plural(objeto))
+    for prep in ("para", "de")
+]
+_DESPUES = [" " + normalizar(m) for m in MODIFICADORES["despues"]]
+
+
+class Automata:
+    """Aho-Corasick sobre caracteres. agregar() todo y luego construir()."""
+
+    def __init__(self):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fallo: list[int] = [0]
+        self._salida: list[list[tuple[int, object]]] = [[]]  # (largo, dato)
+
+    def agregar(self, frase: str, dato):
+        nodo = 0
+        for c in frase:
+            sig = self._goto[nodo].get(c)
+            if sig is None:
+                sig = len(self._goto)
+                self._goto[nodo][c] = sig
+                self._goto.append({})
+                self._fallo.append(0)
+                self._salida.append([])
+            nodo = sig
+        self._salida[nodo].append((len(frase), dato))
+
+    def construir(self):
+        cola = deque(self._goto[0].values())
+        while cola:
+            nodo = cola.popleft()
+            for c, hijo in self._goto[nodo].items():
+                cola.append(hijo)
+                f = self._fallo[nodo]
+                while f and c not in self._goto[f]:
+                    f = self._fallo[f]
+                # los hijos de la raíz fallan a la raíz
+                self._fallo[hijo] = self._goto[f].get(c, 0) if nodo else 0
+                self._salida[hijo] = self._salida[hijo] + self._salida[self._fallo[hijo]]
+
+    def buscar(self, texto: str):
+        """Genera (inicio, fin, dato) de cada coincidencia, fin exclusivo."""
+        nodo = 0
+        for i, c in enumerate(texto):
+            while nodo and c not in self._goto[nodo]:
+                nodo = self._fallo[nodo]
+            nodo = self._goto[nodo].get(c, 0)
+            for largo, dato in self._salida[nodo]:
+                yield i + 1 - largo, i + 1, dato
+
+
+def _fin_de_palabra(texto: str, fin: int) -> int | None:
+    """Fin real de la palabra si termina en `fin` o en su plural; None si sigue."""
+    for sufijo in ("", "s", "es"):
+        corte = fin + len(sufijo)
+        if texto.startswith(sufijo, fin) and (corte == len(texto) or texto[corte] == " "):
+            return corte
+    return None
+
+
+def _modificado(texto: str, inicio: int, fin: int) -> bool:
+    """"figura de <término>", "<término> de juguete"..."""
+    antes = texto[:inicio]
+    if any(antes.endswith(m) and (len(antes) == len(m) or antes[-len(m) - 1] == " ") for m in _ANTES):
+        return True
+    return any(texto.startswith(m, fin) and _fin_de_palabra(texto, fin + len(m)) is not None
+               for m in _DESPUES)
+
+
+def _construir() -> Automata:
+    automata = Automata()
+    for categoria, frases in BLOQUEAR.items():
+        for frase in frases:
+            automata.agregar(normalizar(frase), ("bloquear", categoria))
+    for frase in PERMITIDAS:
+        frase = normalizar(frase)
+        primera, _, resto = frase.partition(" ")
+        automata.agregar(frase, ("permitida", None))
+        automata.agregar(f"{primera}s {resto}", ("permitida", None))  # "pistolas de agua"
+    for frase in DUDOSO:
+        automata.agregar(normalizar(frase), ("dudoso", None))
+    automata.construir()
+    return automata
+
+
+_automata = _construir()
+
+
+def clasificar(titulo: str | None, descripcion: str | None) -> dict:
+    """
+    {"nivel": "bloquear" | "dudoso" | "limpio", "termino": str | None,
+     "categoria": str | None}
+    """
+    if not MODERACION_FILTRO_TEXTO:
+        return {"nivel": "limpio", "termino": None, "categoria": None}
+
+    texto = normalizar(f"{titulo or ''} {descripcion or ''}")
+    bloqueos, permitidas, dudosos = [], [], []
+    for inicio, fin, (tipo, categoria) in _automata.buscar(texto):
+        if inicio > 0 and texto[inicio - 1] != " ":
+            continue
+        fin = _fin_de_palabra(texto, fin)
+        if fin is None:
+            continue
+        {"bloquear": bloqueos, "permitida": permitidas, "dudoso": dudosos}[tipo].append(
+            (inicio, fin, texto[inicio:fin], categoria)
+        )
+
+    for inicio, fin, termino, categoria in bloqueos:
+        cubierto = (
+            any(i <= inicio and fin <= f for i, f, _, _ in permitidas)
+            or _modificado(texto, inicio, fin)
+        )
+        if not cubierto:
+            return {"nivel": "bloquear", "termino": termino, "categoria": categoria}
+
+    if bloqueos or dudosos:
+        termino = (bloqueos or dudosos)[0][2]
+        return {"nivel": "dudoso", "termino": termino, "categoria": None}
+    return {"nivel": "limpio", "termino": None, "categoria": None}
@@ -0,0 +1,205 @@
+# utils/imagenes.py
+"""
+Variantes de tamaño fijo de las imágenes subidas.
+
+Por cada upload <sha256>.<ext> se generan, junto al original:
+
+    <sha256>_thumb.webp / .jpg   (160 px de lado mayor)
+    <sha256>_card.webp  / .jpg   (480 px)
+    <sha256>_full.webp  / .jpg   (1280 px)
+
+El trabajo (decodificar + redimensionar + codificar) es CPU y se hace fuera
+del request: con eventlet en el pool de hilos nativos de eventlet.tpool, si
+no en un ThreadPoolExecutor de IMAGENES_HILOS hilos. Como los nombres salen
+del hash, generar dos veces lo mismo no cambia nada.
+
+urls_variantes() arma las URLs para la API; mientras las variantes no
+existan regresa None y el cliente sigue usando imagen_url. Se llama por
+cada producto de cada listado, así que no toca el disco en el camino
+normal: las variantes listas se anotan en memoria al generarse y, la
+primera vez, con un solo recorrido de la carpeta. Un sha sin variantes
+(las está generando otro worker) se vuelve a buscar en disco a lo más cada
+IMAGENES_REVISAR_S; uno cuya generación falló ya no se busca.
+"""
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.storage import URL_UPLOADS, sha_de_url
+
+IMAGENES_HILOS = int(os.getenv("IMAGENES_HILOS", "2"))
+IMAGENES_REVISAR_S = int(os.getenv("IMAGENES_REVISAR_S", "60"))
+
+# nombre -> lado mayor en px (nunca se agranda una imagen chica)
+VARIANTES = {"thumb": 160, "card": 480, "full": 1280}
+FORMATOS = {"webp": ("WEBP", {"quality": 80, "method": 4}),
+            "jpg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True})}
+
+# la última que se escribe; si existe, las demás también
+_MARCA = ("full", "jpg")
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+_listas: set[str] = set()
+_fallidas: set[str] = set()
+_sin_variantes: dict[str, float] = {}   # sha -> última vez que no estaban en disco
+_escaneo_lock = threading.Lock()
+_escaneada = False
+
+_CARPETA_UPLOADS = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static", "uploads"
+)
+
+
+def nombre_variante(sha: str, variante: str, formato: str) -> str:
+    return f"{sha}_{variante}.{formato}"
+
+
+def _guardar(imagen, ruta: str, formato: str):
+    pil_formato, opciones = FORMATOS[formato]
+    temporal = f"{ruta}.{uuid.uuid4().hex}.tmp"
+    try:
+        imagen.save(temporal, pil_formato, **opciones)
+        os.replace(temporal, ruta)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+
+def _plana(imagen):
+    """JPEG no tiene transparencia: se aplana sobre blanco."""
+    if imagen.mode != "RGBA":
+        return imagen
+    from PIL import Image
+    plana = Image.new("RGB", imagen.size, (255, 255, 255))
+    plana.paste(imagen, mask=imagen.getchannel("A"))
+    return plana
+
+
+def generar_variantes(ruta_original: str, sha: str, carpeta: str = _CARPETA_UPLOADS) -> bool:
+    """Genera las variantes que falten. Regresa False si el archivo no es una imagen legible."""
+    from PIL import Image, ImageOps
+
+    marca = os.path.join(carpeta, nombre_variante(sha, *_MARCA))
+    if os.path.exists(marca):
+        _listas.add(sha)
+        return True
+
+    try:
+        with Image.open(ruta_original) as original:
+            original.seek(0)  # GIF animado: primer cuadro
+            base = ImageOps.exif_transpose(original)
+            base.load()
+    except Exception as e:
+        print(f"WARN no se pudieron generar variantes de {ruta_original}:", e)
+        _fallidas.add(sha)
+        return False
+
+    base = base.convert("RGBA" if base.mode in ("RGBA", "LA", "P", "PA") else "RGB")
+
+    # de la más grande a la más chica, cada una reducida a partir de la anterior
+    salidas = {}
+    fuente = base
+    for variante, lado in sorted(VARIANTES.items(), key=lambda v: -v[1]):
+        fuente = fuente.copy()
+        fuente.thumbnail((lado, lado), Image.LANCZOS)
+        salidas[variante] = fuente
+
+    for variante, img in salidas.items():
+        _guardar(img, os.path.join(carpeta, nombre_variante(sha, variante, "webp")), "webp")
+        if (variante, "jpg") != _MARCA:
+            _guardar(_plana(img), os.path.join(carpeta, nombre_variante(sha, variante, "jpg")), "jpg")
+    _guardar(_plana(salidas[_MARCA[0]]), marca, "jpg")
+
+    _listas.add(sha)
+    _sin_variantes.pop(sha, None)
+    return True
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=IMAGENES_HILOS, thread_name_prefix="imagenes")
+    return _executor
+
+
+def _tarea(ruta_original: str, sha: str, carpeta: str):
+    try:
+        generar_variantes(ruta_original, sha, carpeta)
+    except Exception as e:
+        print(f"WARN generando variantes de {sha}:", e)
+
+
+def programar_variantes(ruta_original: str, sha: str, carpeta: str = _CARPETA_UPLOADS):
+    """Encola la generación y regresa de inmediato."""
+    if sha in _listas or sha in _fallidas:
+        return
+    try:
+        from eventlet import patcher, tpool
+        if patcher.is_monkey_patched("thread"):
+            import eventlet
+            # hilos "verdes" no sirven para CPU: tpool usa hilos nativos
+            eventlet.spawn_n(tpool.execute, _tarea, ruta_original, sha, carpeta)
+            return
+    except ImportError:
+        pass
+    _pool().submit(_tarea, ruta_original, sha, carpeta)
+
+
+def _escanear_carpeta():
+    """Una vez por proceso: anota como listos los sha cuya marca ya está en disco."""
+    global _escaneada
+    with _escaneo_lock:
+        if _escaneada:
+            return
+        sufijo = nombre_variante("", *_MARCA)   # "_full.jpg"
+        try:
+            with os.scandir(_CARPETA_UPLOADS) as entradas:
+                for entrada in entradas:
+                    if entrada.name.endswith(sufijo):
+                        _listas.add(entrada.name[:-len(sufijo)])
+        except FileNotFoundError:
+            pass
+        _escaneada = True
+
+
+def _variantes_listas(sha: str) -> bool:
+    if sha in _listas:
+        return True
+    if sha in _fallidas:
+        return False
+    if not _escaneada:
+        _escanear_carpeta()
+        if sha in _listas:
+            return True
+
+    ahora = time.monotonic()
+    if ahora - _sin_variantes.get(sha, float("-inf")) < IMAGENES_REVISAR_S:
+        return False
+    if os.path.exists(os.path.join(_CARPETA_UPLOADS, nombre_variante(sha, *_MARCA))):
+        _listas.add(sha)
+        _sin_variantes.pop(sha, None)
+        return True
+    _sin_variantes[sha] = ahora
+    return False
+
+
+def urls_variantes(imagen_url: str | None) -> dict | None:
+    """
+    {"thumb": {"webp": url, "jpg": url}, "card": {...}, "full": {...}} para
+    imágenes guardadas por contenido con variantes ya generadas; None si no.
+    """
+    sha = sha_de_url(imagen_url)
+    if sha is None or not _variantes_listas(sha):
+        return None
+    return {
+        variante: {
+            formato: f"{URL_UPLOADS}{nombre_variante(sha, variante, formato)}"
+            for formato in FORMATOS
+        }
+        for variante in VARIANTES
+    }
@@ -1,10 +1,26 @@
-﻿import smtplib
-from email.message import EmailMessage
+﻿"""
+Envío de correos. send_mail() delega en un ProveedorCorreo según EMAIL_MOCK,
+igual que utils/moderacion con ProveedorModeracion: smtplib y email solo se
+importan la primera vez que de verdad se manda por SMTP, no al arrancar cada
+worker. Cada proveedor se construye una vez por proceso.
+"""
+import abc
+
 from flask import current_app
 
-def send_mail(to_email: str, subject: str, html: str):
-    cfg = current_app.config
-    if cfg.get("EMAIL_MOCK", True):
+
+class ProveedorCorreo(abc.ABC):
+    nombre = "base"
+
+    @abc.abstractmethod
+    def enviar(self, cfg, to_email: str, subject: str, html: str) -> bool:
+        """Manda el correo con la config de la app; regresa True si salió."""
+
+
+class CorreoMock(ProveedorCorreo):
+    nombre = "mock"
+
+    def enviar(self, cfg, to_email, subject, html):
         print("=== EMAIL MOCK ===")
         print("TO:", to_email)
         print("SUBJECT:", subject)
@@ -12,15 +28,44 @@ def send_mail(to_email: str, subject: str, html: str):
         print("==================")
         return True
 
-    msg = EmailMessage()
-    msg["From"] = cfg["MAIL_SENDER"]
-    msg["To"] = to_email
-    msg["Subject"] = subject
-    msg.set_content("HTML only", subtype="plain")
-    msg.add_alternative(html, subtype="html")
-
-    with smtplib.SMTP(cfg["SMTP_HOST"], cfg["SMTP_PORT"]) as s:
-        s.starttls()
-        s.login(cfg["SMTP_USER"], cfg["SMTP_PASSWORD"])
-        s.send_message(msg)
-    return True
+
+class CorreoSMTP(ProveedorCorreo):
+    nombre = "smtp"
+
+    def enviar(self, cfg, to_email, subject, html):
+        import smtplib
+        from email.message import EmailMessage
+
+        msg = EmailMessage()
+        msg["From"] = cfg["MAIL_SENDER"]
+        msg["To"] = to_email
+        msg["Subject"] = subject
+        msg.set_content("HTML only", subtype="plain")
+        msg.add_alternative(html, subtype="html")
+
+        with smtplib.SMTP(cfg["SMTP_HOST"], cfg["SMTP_PORT"]) as s:
+            s.starttls()
+            s.login(cfg["SMTP_USER"], cfg["SMTP_PASSWORD"])
+            s.send_message(msg)
+        return True
+
+
+PROVEEDORES = {
+    "mock": CorreoMock,
+    "smtp": CorreoSMTP,
+}
+
+_proveedores: dict[str, ProveedorCorreo] = {}
+
+
+def obtener_proveedor(cfg) -> ProveedorCorreo:
+    nombre = "mock" if cfg.get("EMAIL_MOCK", True) else "smtp"
+    proveedor = _proveedores.get(nombre)
+    if proveedor is None:
+        proveedor = _proveedores[nombre] = PROVEEDORES[nombre]()
+    return proveedor
+
+
+def send_mail(to_email: str, subject: str, html: str):
+    cfg = current_app.config
+    return obtener_proveedor(cfg).enviar(cfg, to_email, subject, html)
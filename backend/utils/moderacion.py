@@ -0,0 +1,162 @@
+# utils/moderacion.py
+"""
+Proveedores de moderación de productos (imagen + título/descripción).
+
+La ruta /api/moderacion/imagen solo habla con ProveedorModeracion; el SDK de
+OpenAI (openai + httpx + pydantic, cientos de ms de import) se carga la
+primera vez que alguien modera, no al arrancar cada worker, y la app arranca
+aunque no haya OPENAI_API_KEY.
+
+MODERACION_PROVEEDOR:
+  - "openai" (default): gpt-4.1-mini con la imagen como data URL.
+  - "falso": no llama a nadie; para desarrollo, pruebas y bench (ver ProveedorFalso).
+"""
+import abc
+import base64
+import json
+import os
+import threading
+import time
+
+MODERACION_PROVEEDOR = os.getenv("MODERACION_PROVEEDOR", "openai").lower()
+MODERACION_MODELO = os.getenv("MODERACION_MODELO", "gpt-4.1-mini")
+# "low" (512x512, tokens fijos) | "high" | "auto"; ver copia_reducida() en utils/subidas.py
+MODERACION_DETALLE = os.getenv("MODERACION_DETALLE", "auto")
+
+SYSTEM_PROMPT = """
+Eres un moderador de contenido para una aplicación de trueque de productos.
+
+Tu tarea es decidir si un producto es LEGAL o ILEGAL para publicar,
+basándote en la IMAGEN y en el TEXTO que te damos (título y descripción).
+
+CONSIDERA ILEGAL (DEBES BLOQUEAR) cualquier producto que parezca ser:
+- Drogas o sustancias ilegales (marihuana, cocaína, cristal, etc.).
+- Vapes, cigarros electrónicos, pods, cartuchos, juul, etc.
+- Cigarros de tabaco tradicionales, puros, tabaco para fumar, etc.
+- Bebidas alcohólicas (cerveza, vino, tequila, vodka, whisky, ron, mezcal, etc.).
+- Armas de fuego (pistolas, rifles, escopetas), municiones.
+- Armas blancas peligrosas (cuchillos tácticos, navajas automáticas, machetes de combate).
+- Explosivos, fuegos artificiales peligrosos o pirotecnia fuerte.
+- Medicamentos controlados o con receta, frascos de pastillas sospechosas.
+- Documentos personales: INE, pasaporte, licencia, tarjeta bancaria, etc.
+- Productos sexuales explícitos o para adultos.
+
+SI HAY CUALQUIER DUDA razonable de que pueda ser de estas categorías,
+clasifica como ILEGAL.
+
+Responde SIEMPRE y SOLO en JSON con este formato EXACTO:
+{
+  "is_illegal": true o false,
+  "reason": "explicación corta en español"
+}
+"""
+
+
+class ModeracionNoDisponible(RuntimeError):
+    """El proveedor no está configurado (p. ej. falta OPENAI_API_KEY o el paquete)."""
+
+
+class ProveedorModeracion(abc.ABC):
+    nombre = "base"
+
+    @abc.abstractmethod
+    def clasificar(self, imagen: bytes, mimetype: str, titulo: str, descripcion: str) -> dict:
+        """Regresa {"is_illegal": bool, "reason": str}."""
+
+
+class ProveedorOpenAI(ProveedorModeracion):
+    nombre = "openai"
+
+    def __init__(self, modelo: str = MODERACION_MODELO):
+        self.modelo = modelo
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _cliente(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    try:
+                        from openai import OpenAI
+                        # Usa la API key desde la variable de entorno OPENAI_API_KEY
+                        self._client = OpenAI()
+                    except Exception as e:
+                        raise ModeracionNoDisponible(str(e)) from e
+        return self._client
+
+    def clasificar(self, imagen, mimetype, titulo, descripcion):
+        # Pasamos la imagen como base64 data URL; llega ya reducida y sin
+        # metadatos (copia_reducida), no el archivo original
+        b64 = base64.b64encode(imagen).decode("utf-8")
+        data_url = f"data:{mimetype};base64,{b64}"
+
+        user_content = (
+            f"Título: {titulo}\nDescripción: {descripcion}\n"
+            "Analiza si el producto parece ilegal según las reglas."
+        )
+
+        resp = self._cliente().chat.completions.create(
+            model=self.modelo,
+            response_format={"type": "json_object"},
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": user_content},
+                        {
+                            "type": "input_image",
+                            "image_url": {"url": data_url, "detail": MODERACION_DETALLE}
+                        },
+                    ],
+                },
+            ],
+            max_tokens=128,
+        )
+
+        data = json.loads(resp.choices[0].message.content)
+        return {
+            "is_illegal": bool(data.get("is_illegal")),
+            "reason": data.get("reason") or "",
+        }
+
+
+class ProveedorFalso(ProveedorModeracion):
+    """
+    Para pruebas: tarda MODERACION_FALSO_MS y marca como ilegal solo si el
+    título o la descripción traen la palabra "ilegal". Cuenta sus llamadas.
+    """
+    nombre = "falso"
+
+    def __init__(self, latencia_ms: int | None = None):
+        self.latencia = (latencia_ms if latencia_ms is not None
+                         else int(os.getenv("MODERACION_FALSO_MS", "0"))) / 1000
+        self.llamadas = 0
+
+    def clasificar(self, imagen, mimetype, titulo, descripcion):
+        self.llamadas += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+        ilegal = "ilegal" in f"{titulo} {descripcion}".lower()
+        return {
+            "is_illegal": ilegal,
+            "reason": "Moderación simulada (MODERACION_PROVEEDOR=falso)",
+        }
+
+
+PROVEEDORES = {
+    "openai": ProveedorOpenAI,
+    "falso": ProveedorFalso,
+}
+
+_proveedor: ProveedorModeracion | None = None
+
+
+def obtener_proveedor() -> ProveedorModeracion:
+    global _proveedor
+    if _proveedor is None:
+        try:
+            _proveedor = PROVEEDORES[MODERACION_PROVEEDOR]()
+        except KeyError:
+            raise ModeracionNoDisponible(f"MODERACION_PROVEEDOR desconocido: {MODERACION_PROVEEDOR}")
+    return _proveedor
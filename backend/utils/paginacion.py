@@ -0,0 +1,113 @@
+# utils/paginacion.py
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+LIMITE_POR_DEFECTO = 20
+LIMITE_MAXIMO = 100
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def encode_cursor(fecha: datetime | None, id_: int) -> str:
+    """
+    Cursor opaco sobre (fecha, id). Es base64 url-safe de un JSON corto,
+    el cliente solo tiene que devolverlo tal cual en ?cursor=
+    """
+    raw = json.dumps([fecha.isoformat() if fecha else None, id_], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime | None, int]:
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        fecha_raw, id_ = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        fecha = datetime.fromisoformat(fecha_raw) if fecha_raw else None
+        return fecha, int(id_)
+    except Exception as e:
+        raise CursorInvalido(str(e))
+
+
+def leer_limite(raw, por_defecto: int = LIMITE_POR_DEFECTO, maximo: int = LIMITE_MAXIMO) -> int:
+    try:
+        limite = int(raw) if raw not in (None, "") else por_defecto
+    except (TypeError, ValueError):
+        limite = por_defecto
+    return max(1, min(limite, maximo))
+
+
+def leer_bool(raw) -> bool:
+    """Flags de query string: 1/true/si/on son verdadero; 0, false, vacío o ausente, falso."""
+    return str(raw or "").strip().lower() in ("1", "true", "si", "sí", "on", "yes")
+
+
+def filtro_despues_de(col_fecha, col_id, fecha: datetime | None, id_: int):
+    """
+    Condición keyset para un orden (col_fecha DESC, col_id DESC).
+    MySQL y SQLite ponen los NULL al final en DESC, así que las filas sin
+    fecha van después de cualquier fecha.
+    """
+    if fecha is None:
+        return and_(col_fecha.is_(None), col_id < id_)
+    return or_(
+        col_fecha < fecha,
+        and_(col_fecha == fecha, col_id < id_),
+        col_fecha.is_(None),
+    )
+
+
+def paginar_keyset(query, col_fecha, col_id, cursor: str | None, limite: int):
+    """
+    Aplica cursor + orden + LIMIT a la query y regresa (filas, next_cursor).
+    Pide limite + 1 filas para saber si hay otra página sin hacer COUNT.
+    Lanza CursorInvalido si el cursor no se puede decodificar.
+    """
+    if cursor:
+        fecha, id_ = decode_cursor(cursor)
+        query = query.filter(filtro_despues_de(col_fecha, col_id, fecha, id_))
+
+    filas = (
+        query
+        .order_by(col_fecha.desc(), col_id.desc())
+        .limit(limite + 1)
+        .all()
+    )
+
+    next_cursor = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        ultima = filas[-1]
+        next_cursor = encode_cursor(getattr(ultima, col_fecha.key), getattr(ultima, col_id.key))
+
+    return filas, next_cursor
+
+
+def paginar_offset(query, cursor: str | None, limite: int):
+    """
+    Paginación por posición para órdenes que no son keyset (p. ej. relevancia
+    de búsqueda). La query ya debe venir ordenada. Regresa (filas, next_cursor).
+    """
+    offset = 0
+    if cursor:
+        try:
+            padding = "=" * (-len(cursor) % 4)
+            offset = json.loads(base64.urlsafe_b64decode(cursor + padding))["o"]
+        except Exception as e:
+            raise CursorInvalido(str(e))
+        # bool es subclase de int; un float o un negativo tampoco son posiciones
+        if type(offset) is not int or offset < 0:
+            raise CursorInvalido(f"offset inválido: {offset!r}")
+
+    filas = query.offset(offset).limit(limite + 1).all()
+
+    next_cursor = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        raw = json.dumps({"o": offset + limite}, separators=(",", ":"))
+        next_cursor = base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+    return filas, next_cursor
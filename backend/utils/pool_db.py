@@ -0,0 +1,163 @@
+# utils/pool_db.py
+"""
+Pool de conexiones a MySQL.
+
+Config lee DB_POOL_* del entorno y opciones_engine() arma
+SQLALCHEMY_ENGINE_OPTIONS (nada para SQLite, que usa su propio pool):
+  - DB_POOL_SIZE (10): conexiones que se quedan abiertas por worker.
+  - DB_MAX_OVERFLOW (20): conexiones extra, temporales, para los picos.
+  - DB_POOL_TIMEOUT (10): segundos esperando una conexión libre antes de
+    "QueuePool limit ... timed out".
+  - DB_POOL_RECYCLE (280): se reabre toda conexión con más de N segundos,
+    antes de que MySQL (wait_timeout) o el proxy de Railway la corten por
+    inactividad.
+  - DB_POOL_PRE_PING (1): ping al sacar la conexión del pool; si el servidor
+    la cerró se reconecta ahí en lugar de fallar el request.
+Cada worker de gunicorn tiene su propio pool, así que
+(DB_POOL_SIZE + DB_MAX_OVERFLOW) x WEB_CONCURRENCY debe caber en el
+max_connections del servidor.
+
+Driver con eventlet: PyMySQL es Python puro y, con eventlet.monkey_patch()
+(wsgi.py), su socket cede el hub mientras MySQL responde; cientos de green
+threads se turnan DB_POOL_SIZE conexiones. mysqlclient (MySQLdb) es C y
+bloquea el worker completo en cada query: verificar_driver() avisa al
+arrancar si se combina con eventlet.
+
+PoolMedido es un QueuePool que además cuenta checkouts, tiempo de espera por
+conexión, timeouts, conexiones abiertas (incluye las recicladas) y
+desconexiones; metricas() lo expone en /api/admin/health/db (solo administradores).
+"""
+import sys
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event, exc, text
+from sqlalchemy.pool import QueuePool
+
+ESPERAS_GUARDADAS = 1000
+
+
+class _Medidas:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.conexiones_abiertas = 0
+        self.desconexiones = 0
+        self.espera_max = 0.0
+        self.esperas: deque[float] = deque(maxlen=ESPERAS_GUARDADAS)
+
+    def al_conectar(self, dbapi_connection, connection_record):
+        with self.lock:
+            self.conexiones_abiertas += 1
+
+    def al_invalidar(self, dbapi_connection, connection_record, exception):
+        # el driver o el pre-ping detectaron una conexión muerta
+        with self.lock:
+            self.desconexiones += 1
+
+
+class PoolMedido(QueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._medidas = _Medidas()
+        if "_dispatch" not in kwargs:
+            # recreate() copia los listeners; ahí también se pasa _medidas
+            event.listen(self, "connect", self._medidas.al_conectar)
+            event.listen(self, "invalidate", self._medidas.al_invalidar)
+
+    def recreate(self):
+        nuevo = super().recreate()
+        nuevo._medidas = self._medidas
+        return nuevo
+
+    def _do_get(self):
+        # incluye la espera en la cola y, con overflow, abrir la conexión
+        medidas = self._medidas
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except exc.TimeoutError:
+            with medidas.lock:
+                medidas.timeouts += 1
+            raise
+        espera = time.perf_counter() - inicio
+        with medidas.lock:
+            medidas.checkouts += 1
+            medidas.esperas.append(espera)
+            medidas.espera_max = max(medidas.espera_max, espera)
+        return conexion
+
+    def metricas(self) -> dict:
+        medidas = self._medidas
+        with medidas.lock:
+            esperas = sorted(medidas.esperas)
+            datos = {
+                "checkouts": medidas.checkouts,
+                "timeouts": medidas.timeouts,
+                "conexiones_abiertas": medidas.conexiones_abiertas,
+                "desconexiones": medidas.desconexiones,
+                "espera_max_ms": round(medidas.espera_max * 1000, 2),
+            }
+
+        def percentil(p):
+            return round(esperas[min(len(esperas) - 1, int(len(esperas) * p))] * 1000, 2) if esperas else 0.0
+
+        datos.update({
+            "tamano": self.size(),
+            "max_overflow": self._max_overflow,
+            "en_uso": self.checkedout(),
+            "libres": self.checkedin(),
+            "overflow": max(0, self.overflow()),
+            "espera_p50_ms": percentil(0.50),
+            "espera_p95_ms": percentil(0.95),
+        })
+        return datos
+
+
+def opciones_engine(uri: str, pool_size: int, max_overflow: int, pool_timeout: int,
+                    pool_recycle: int, pool_pre_ping: bool) -> dict:
+    """SQLALCHEMY_ENGINE_OPTIONS para la URI; {} en SQLite."""
+    if uri.startswith("sqlite"):
+        return {}
+    return {
+        "poolclass": PoolMedido,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": pool_timeout,
+        "pool_recycle": pool_recycle,
+        "pool_pre_ping": pool_pre_ping,
+    }
+
+
+def verificar_driver(engine):
+    """Avisa si el driver bloquearía el hub de eventlet."""
+    if "eventlet" not in sys.modules or engine.dialect.name != "mysql":
+        return
+    from eventlet import patcher
+
+    if patcher.is_monkey_patched("socket") and engine.dialect.driver != "pymysql":
+        print(
+            f"WARN driver {engine.dialect.driver} con eventlet: cada query bloquea el worker "
+            "completo; usa mysql+pymysql://"
+        )
+
+
+def metricas(engine) -> dict:
+    """Ping a la BD y estado del pool."""
+    datos = {"pool": type(engine.pool).__name__}
+    inicio = time.perf_counter()
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        datos["ok"] = True
+    except exc.SQLAlchemyError as e:
+        datos.update({"ok": False, "error": str(e.__cause__ or e)[:200]})
+    datos["ping_ms"] = round((time.perf_counter() - inicio) * 1000, 2)
+
+    if isinstance(engine.pool, PoolMedido):
+        datos.update(engine.pool.metricas())
+    else:
+        datos["estado"] = engine.pool.status()
+    return datos
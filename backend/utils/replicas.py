@@ -0,0 +1,300 @@
+# utils/replicas.py
+"""
+Lecturas en réplicas de la BD.
+
+Config.SQLALCHEMY_REPLICA_URIS (DATABASE_REPLICA_URLS, separadas por coma)
+lista las réplicas; sin réplicas todo sigue yendo a la primaria.
+
+Solo las vistas marcadas con @solo_lectura leen de una réplica, y solo si:
+  - la sentencia es un SELECT sin FOR UPDATE (INSERT/UPDATE/DELETE y los
+    flush siempre van a la primaria);
+  - la sesión no ha escrito nada en este request;
+  - el usuario (identidad JWT o, sin token, la IP) no escribió en los
+    últimos DB_LECTURA_PROPIA_S segundos: así ve lo que acaba de publicar
+    aunque la réplica vaya atrasada.
+Cada request usa una sola réplica, elegida en round-robin entre las sanas.
+
+Marca de "escribió hace poco": la escritura y la lectura siguiente pueden
+caer en workers distintos, así que con varios workers la marca vive en
+Redis (DB_ESCRITURAS_REDIS_URL; si está vacía se usa SOCKETIO_MESSAGE_QUEUE
+cuando es redis://), como una llave que expira sola. Sin Redis se guarda en
+memoria del worker, lo que solo es correcto con un worker (se avisa al
+arrancar). Si Redis falla, se lee de la primaria.
+
+Salud: cada réplica se prueba con un SELECT 1 antes de su primera lectura.
+Si después da OperationalError (conexión rechazada, perdida...) queda fuera
+y se vuelve a probar cada DB_REPLICA_REINTENTO_S; si no queda ninguna sana
+se lee de la primaria. El request que encontró la falla sí regresa error.
+
+Para probar local basta con dos archivos SQLite:
+    DATABASE_URL=sqlite:////tmp/primaria.db DATABASE_REPLICA_URLS=sqlite:////tmp/replica.db
+"""
+import functools
+import os
+import threading
+import time
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, exc, text
+
+from utils.pool_db import opciones_engine
+
+DB_LECTURA_PROPIA_S = float(os.getenv("DB_LECTURA_PROPIA_S", "5"))
+DB_REPLICA_REINTENTO_S = float(os.getenv("DB_REPLICA_REINTENTO_S", "10"))
+DB_ESCRITURAS_REDIS_URL = os.getenv("DB_ESCRITURAS_REDIS_URL", "").strip()
+
+
+class EscriturasMemoria:
+    """Marcas en un dict del proceso: solo sirve con un worker."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._marcas: dict[str, float] = {}
+
+    def marcar(self, clave: str):
+        ahora = time.monotonic()
+        with self._lock:
+            self._marcas[clave] = ahora
+            if len(self._marcas) > 10000:
+                limite = ahora - DB_LECTURA_PROPIA_S
+                self._marcas = {k: t for k, t in self._marcas.items() if t > limite}
+
+    def reciente(self, clave: str) -> bool:
+        t = self._marcas.get(clave)
+        return t is not None and time.monotonic() - t < DB_LECTURA_PROPIA_S
+
+
+class EscriturasRedis:
+    """Una llave por usuario con expiración DB_LECTURA_PROPIA_S, compartida por todos los workers."""
+
+    PREFIJO = "trueque:escritura:"
+
+    def __init__(self, cliente):
+        self.cliente = cliente
+
+    def marcar(self, clave: str):
+        try:
+            self.cliente.set(self.PREFIJO + clave, 1, px=int(DB_LECTURA_PROPIA_S * 1000))
+        except Exception as e:
+            print("WARN no se pudo marcar la escritura en Redis:", e)
+
+    def reciente(self, clave: str) -> bool:
+        try:
+            return bool(self.cliente.exists(self.PREFIJO + clave))
+        except Exception as e:
+            print("WARN Redis no responde, se lee de la primaria:", e)
+            return True
+
+    @classmethod
+    def desde_url(cls, url: str) -> "EscriturasRedis":
+        import redis
+        return cls(redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5))
+
+
+class Replica:
+    def __init__(self, engine):
+        self.engine = engine
+        self.sana = False        # se prueba antes de la primera lectura
+        self.reintentar_en = 0.0
+        self.fallas = 0
+        self.lecturas = 0
+
+    def marcar_caida(self, error):
+        if self.sana or not self.fallas:
+            print(f"WARN réplica {self.engine.url.render_as_string(hide_password=True)} fuera: {error}")
+        self.sana = False
+        self.fallas += 1
+        self.reintentar_en = time.monotonic() + DB_REPLICA_REINTENTO_S
+
+    def probar(self) -> bool:
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        except exc.SQLAlchemyError as e:
+            if self.reintentar_en <= time.monotonic():  # si no la marcó ya handle_error
+                self.marcar_caida(e.__cause__ or e)
+            return False
+        if self.fallas and not self.sana:
+            print(f"[INFO] réplica {self.engine.url.render_as_string(hide_password=True)} de vuelta")
+        self.sana = True
+        return True
+
+
+class Replicas:
+    def __init__(self, engines, escrituras=None):
+        self.replicas = [Replica(e) for e in engines]
+        self._siguiente = 0
+        self._lock = threading.Lock()
+        self.escrituras = escrituras or EscriturasMemoria()
+        for replica in self.replicas:
+            event.listen(replica.engine, "handle_error", self._al_fallar(replica))
+
+    @staticmethod
+    def _al_fallar(replica: Replica):
+        def al_fallar(contexto):
+            if contexto.is_disconnect or isinstance(contexto.sqlalchemy_exception, exc.OperationalError):
+                replica.marcar_caida(contexto.original_exception)
+        return al_fallar
+
+    def elegir(self) -> Replica | None:
+        """Siguiente réplica sana en round-robin; las demás se prueban al vencer su espera."""
+        with self._lock:
+            orden = self.replicas[self._siguiente:] + self.replicas[:self._siguiente]
+            self._siguiente = (self._siguiente + 1) % len(self.replicas)
+        ahora = time.monotonic()
+        for replica in orden:
+            if replica.sana:
+                return replica
+            if ahora >= replica.reintentar_en and replica.probar():
+                return replica
+        return None
+
+    def marcar_escritura(self, clave: str):
+        self.escrituras.marcar(clave)
+
+    def escribio_hace_poco(self, clave: str | None) -> bool:
+        return clave is not None and self.escrituras.reciente(clave)
+
+    def dispose(self):
+        for replica in self.replicas:
+            replica.engine.dispose(close=False)
+
+    def estado(self) -> list[dict]:
+        from utils.pool_db import metricas
+
+        datos = []
+        for replica in self.replicas:
+            d = {
+                "url": replica.engine.url.render_as_string(hide_password=True),
+                "sana": replica.sana,
+                "fallas": replica.fallas,
+                "lecturas": replica.lecturas,
+            }
+            if replica.sana:
+                d.update(metricas(replica.engine))
+            datos.append(d)
+        return datos
+
+
+def _replicas() -> Replicas | None:
+    return current_app.extensions.get("replicas") if has_app_context() else None
+
+
+def _clave_actual() -> str | None:
+    """Quién hace el request: usuario del JWT o, sin token, la IP."""
+    if not has_request_context():
+        return None
+    try:
+        from flask_jwt_extended import get_jwt_identity
+        identidad = get_jwt_identity()
+    except RuntimeError:  # la vista no pasó por jwt_required
+        identidad = None
+    return f"u:{identidad}" if identidad is not None else f"ip:{request.remote_addr}"
+
+
+def marcar_escritura(id_usuario=None):
+    """
+    Registra que el usuario escribió (lo hace solo el commit de la sesión);
+    para escrituras que no pasan por db.session en este request, como el
+    write-behind del chat.
+    """
+    replicas = _replicas()
+    if replicas is None:
+        return
+    clave = f"u:{id_usuario}" if id_usuario is not None else _clave_actual()
+    if clave:
+        replicas.marcar_escritura(clave)
+
+
+def solo_lectura(vista):
+    """La vista puede leer de una réplica (ver reglas arriba)."""
+    @functools.wraps(vista)
+    def envoltura(*args, **kwargs):
+        g.solo_lectura = True
+        return vista(*args, **kwargs)
+    return envoltura
+
+
+class SesionEnrutada(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        primaria = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or not self._puede_usar_replica(clause):
+            return primaria
+        if primaria is not self._db.engine:
+            return primaria  # otro bind_key
+
+        if "replica" not in self.info:
+            replicas = _replicas()
+            if replicas is None or replicas.escribio_hace_poco(_clave_actual()):
+                self.info["replica"] = None
+            else:
+                self.info["replica"] = replicas.elegir()
+        replica = self.info["replica"]
+        if replica is None or not replica.sana:
+            return primaria
+        replica.lecturas += 1
+        return replica.engine
+
+    def _puede_usar_replica(self, clause) -> bool:
+        if not (has_request_context() and g.get("solo_lectura")):
+            return False
+        if self._flushing or self.info.get("escribio") or self.new or self.dirty or self.deleted:
+            return False
+        if clause is not None and (not getattr(clause, "is_select", False)
+                                   or getattr(clause, "_for_update_arg", None) is not None):
+            return False
+        return True
+
+
+@event.listens_for(SesionEnrutada, "after_flush")
+def _despues_de_flush(sesion, contexto):
+    sesion.info["escribio"] = True
+
+
+@event.listens_for(SesionEnrutada, "do_orm_execute")
+def _al_ejecutar(estado):
+    if estado.is_insert or estado.is_update or estado.is_delete:
+        estado.session.info["escribio"] = True
+
+
+@event.listens_for(SesionEnrutada, "after_commit")
+def _despues_de_commit(sesion):
+    if sesion.info.pop("escribio", False):
+        marcar_escritura()
+    sesion.info.pop("replica", None)
+
+
+@event.listens_for(SesionEnrutada, "after_rollback")
+def _despues_de_rollback(sesion):
+    sesion.info.pop("escribio", None)
+    sesion.info.pop("replica", None)
+
+
+def _escrituras_compartidas():
+    from utils.cola_socket import SOCKETIO_MESSAGE_QUEUE
+
+    url = DB_ESCRITURAS_REDIS_URL
+    if not url and SOCKETIO_MESSAGE_QUEUE.startswith(("redis://", "rediss://")):
+        url = SOCKETIO_MESSAGE_QUEUE
+    if url:
+        return EscriturasRedis.desde_url(url)
+    if int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+        print("WARN réplicas con varios workers y sin DB_ESCRITURAS_REDIS_URL: un usuario puede "
+              "no ver lo que acaba de escribir si la lectura cae en otro worker")
+    return EscriturasMemoria()
+
+
+def init_app(app):
+    uris = app.config.get("SQLALCHEMY_REPLICA_URIS") or []
+    if not uris:
+        return
+    engines = [
+        create_engine(uri, **opciones_engine(
+            uri, app.config["DB_POOL_SIZE"], app.config["DB_MAX_OVERFLOW"],
+            app.config["DB_POOL_TIMEOUT"], app.config["DB_POOL_RECYCLE"], app.config["DB_POOL_PRE_PING"],
+        ))
+        for uri in uris
+    ]
+    app.extensions["replicas"] = Replicas(engines, _escrituras_compartidas())
+    print(f"[INFO] {len(engines)} réplica(s) de lectura configuradas")
@@ -0,0 +1,145 @@
+# utils/sesiones_socket.py
+"""
+Estado por conexión de Socket.IO (clave: request.sid).
+
+El token se valida una sola vez (en connect o en el primer evento que lo
+trae) y se guarda el id de usuario hasta que el JWT expira. También se
+guarda en qué intercambios puede publicar cada socket, para que
+nuevo_mensaje no tenga que decodificar el token ni consultar Intercambio
+en cada mensaje. Cancelar un intercambio llama a revocar_intercambio().
+
+Con varios workers (SOCKETIO_MESSAGE_QUEUE) la revocación local no alcanza a
+los sockets de otros procesos, así que revocar_intercambio() también cierra
+el room; close_room sí viaja por la cola y el socket deja de recibir. Para
+que tampoco pueda publicar, el permiso en memoria vence a los
+SOCKET_PERMISO_TTL_S y se vuelve a consultar (una consulta por socket e
+intercambio en ese lapso, no una por mensaje). Los rechazos (no participa,
+cancelado) se guardan sin vencimiento: cancelar no tiene vuelta.
+"""
+import os
+import threading
+import time
+
+from flask_jwt_extended import decode_token
+
+from models import Intercambio
+
+SOCKET_PERMISO_TTL_S = float(os.getenv("SOCKET_PERMISO_TTL_S", "30"))
+
+
+class SesionSocket:
+    __slots__ = ("token", "id_usuario", "expira", "intercambios", "denegados")
+
+    def __init__(self, token: str, id_usuario: int, expira: float):
+        self.token = token
+        self.id_usuario = id_usuario
+        self.expira = expira
+        self.intercambios: dict[int, float] = {}   # id -> cuándo se verificó
+        self.denegados: set[int] = set()
+
+
+_sesiones: dict[str, SesionSocket] = {}
+_lock = threading.Lock()
+
+
+def _decodificar(token: str) -> tuple[int, float] | None:
+    try:
+        decoded = decode_token(token)
+        # por defecto flask_jwt_extended pone el id en "sub"
+        return int(decoded["sub"]), float(decoded.get("exp") or "inf")
+    except Exception as e:
+        print("WARN decode_token:", e)
+        return None
+
+
+def autenticar(sid: str, token: str | None) -> int | None:
+    """Valida el token y lo asocia al sid. Si es el mismo token ya validado, no lo decodifica otra vez."""
+    sesion = _sesiones.get(sid)
+    if sesion is not None and (not token or token == sesion.token):
+        if sesion.expira > time.time():
+            return sesion.id_usuario
+        cerrar(sid)
+        return None
+
+    if not token:
+        return None
+
+    datos = _decodificar(token)
+    if datos is None:
+        return None
+    id_usuario, expira = datos
+
+    with _lock:
+        anterior = _sesiones.get(sid)
+        nueva = SesionSocket(token, id_usuario, expira)
+        if anterior is not None and anterior.id_usuario == id_usuario:
+            # token renovado del mismo usuario: conservamos los permisos
+            nueva.intercambios = anterior.intercambios
+            nueva.denegados = anterior.denegados
+        _sesiones[sid] = nueva
+    return id_usuario
+
+
+def autorizar_intercambio(sid: str, id_intercambio: int) -> Intercambio | None:
+    """
+    Consulta el intercambio (una vez por socket) y recuerda si el usuario
+    puede publicar ahí: debe participar y el intercambio no debe estar cancelado.
+    Regresa el intercambio si el usuario participa, aunque esté cancelado
+    (se puede unir al room para leer).
+    """
+    sesion = _sesiones.get(sid)
+    if sesion is None:
+        return None
+
+    intercambio = Intercambio.query.get(id_intercambio)
+    if not intercambio:
+        sesion.denegados.add(id_intercambio)
+        return None
+    if sesion.id_usuario not in (intercambio.id_usuario_ofrece, intercambio.id_usuario_recibe):
+        sesion.denegados.add(id_intercambio)
+        return None
+
+    if intercambio.estado == "cancelado":
+        sesion.intercambios.pop(id_intercambio, None)
+        sesion.denegados.add(id_intercambio)
+    else:
+        sesion.intercambios[id_intercambio] = time.monotonic()
+        sesion.denegados.discard(id_intercambio)
+    return intercambio
+
+
+def puede_publicar(sid: str, id_intercambio: int) -> bool:
+    """
+    Chequeo del camino caliente: solo memoria, salvo la primera vez que se ve
+    el intercambio o cuando el permiso venció (SOCKET_PERMISO_TTL_S). Un
+    rechazo no vuelve a consultar la BD.
+    """
+    sesion = _sesiones.get(sid)
+    if sesion is None:
+        return False
+    if id_intercambio in sesion.denegados:
+        return False
+    verificado = sesion.intercambios.get(id_intercambio)
+    if verificado is not None and time.monotonic() - verificado < SOCKET_PERMISO_TTL_S:
+        return True
+    autorizar_intercambio(sid, id_intercambio)
+    return id_intercambio in sesion.intercambios
+
+
+def revocar_intercambio(id_intercambio: int, socketio=None):
+    """
+    Nadie puede volver a publicar en el intercambio (p. ej. al cancelarlo).
+    Con `socketio` además cierra el room en todos los workers; llamarlo
+    después de emitir el último evento del room.
+    """
+    with _lock:
+        for sesion in _sesiones.values():
+            if sesion.intercambios.pop(id_intercambio, None) is not None:
+                sesion.denegados.add(id_intercambio)
+    if socketio is not None:
+        socketio.close_room(f"intercambio_{id_intercambio}")
+
+
+def cerrar(sid: str):
+    with _lock:
+        _sesiones.pop(sid, None)
@@ -1,4 +1,7 @@
-﻿import os, uuid
+﻿import hashlib
+import os
+import re
+import uuid
 from werkzeug.utils import secure_filename
 
 ALLOWED = {"png","jpg","jpeg","gif","webp"}
@@ -18,3 +21,121 @@ def save_upload(fileobj, folder: str) -> str:
     final = f"{uid}.{ext}"
     fileobj.save(os.path.join(folder, final))
     return final
+
+
+# ---------------------------------------------------------------------------
+# Almacenamiento por contenido: static/uploads/<sha256>.<ext>
+# ---------------------------------------------------------------------------
+# El SHA-256 se calcula mientras se escribe a un temporal en la misma carpeta
+# y al final se renombra al nombre definitivo. Si ese nombre ya existe, los
+# bytes ya estaban guardados: se borra el temporal y se reusa el archivo.
+# La extensión sale del formato que detecta Pillow, no del nombre que mandó
+# el cliente: los mismos bytes como .jpeg, .JPG o .png son un solo archivo.
+# La tabla `archivos` lleva cuántos productos apuntan a cada uno.
+
+BLOQUE = 64 * 1024
+URL_UPLOADS = "/static/uploads/"
+_NOMBRE_CAS = re.compile(r"^([0-9a-f]{64})\.[a-z0-9]+$")
+_EXT_DE_FORMATO = {"JPEG": "jpg", "PNG": "png", "GIF": "gif", "WEBP": "webp"}
+
+
+def _extension_real(ruta: str, ext: str) -> str:
+    """Extensión según el formato del contenido; la del cliente (jpeg -> jpg) si Pillow no lo reconoce."""
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        with Image.open(ruta) as imagen:
+            formato = imagen.format
+    except (UnidentifiedImageError, OSError):
+        formato = None
+    ext = ext.lower()
+    return _EXT_DE_FORMATO.get(formato, "jpg" if ext == "jpeg" else ext)
+
+
+def guardar_por_contenido(stream, folder: str, ext: str) -> tuple[str, str, int, bool]:
+    """
+    Guarda el stream bajo su hash. Regresa (nombre, sha256, tamaño, nuevo);
+    nuevo=False si el contenido ya existía. `ext` solo se usa si el formato
+    no se puede detectar.
+    """
+    ensure_folder(folder)
+    h = hashlib.sha256()
+    tamano = 0
+    temporal = os.path.join(folder, f".subiendo-{uuid.uuid4().hex}")
+    try:
+        with open(temporal, "wb") as out:
+            while True:
+                bloque = stream.read(BLOQUE)
+                if not bloque:
+                    break
+                h.update(bloque)
+                out.write(bloque)
+                tamano += len(bloque)
+
+        sha = h.hexdigest()
+        nombre = f"{sha}.{_extension_real(temporal, ext)}"
+        destino = os.path.join(folder, nombre)
+        if os.path.exists(destino):
+            os.remove(temporal)
+            return nombre, sha, tamano, False
+        os.replace(temporal, destino)
+        return nombre, sha, tamano, True
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def sha_de_url(url: str | None) -> str | None:
+    """El hash de una URL /static/uploads/<sha256>.<ext>; None para URLs viejas o externas."""
+    if not url or not url.startswith(URL_UPLOADS):
+        return None
+    m = _NOMBRE_CAS.match(url[len(URL_UPLOADS):])
+    return m.group(1) if m else None
+
+
+def registrar_archivo(sha: str, nombre: str, tamano: int):
+    """
+    Alta en `archivos` si no estaba (sin referencias todavía). No hace commit.
+    Es un solo INSERT que ignora la llave repetida, así dos primeras subidas
+    simultáneas del mismo contenido no chocan con IntegrityError.
+    """
+    from models import db, Archivo
+
+    valores = {"sha256": sha, "nombre": nombre, "tamano": tamano, "referencias": 0}
+    dialecto = db.session.get_bind(mapper=Archivo.__mapper__).dialect.name
+    if dialecto == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        sentencia = insert(Archivo).values(**valores).on_duplicate_key_update(sha256=Archivo.sha256)
+    elif dialecto == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        sentencia = insert(Archivo).values(**valores).on_conflict_do_nothing(index_elements=["sha256"])
+    else:
+        if db.session.get(Archivo, sha) is None:
+            db.session.add(Archivo(**valores))
+        return
+    db.session.execute(sentencia)
+
+
+def cambiar_referencia(url_anterior: str | None, url_nueva: str | None):
+    """
+    Ajusta las referencias cuando la imagen de un producto pasa de
+    url_anterior a url_nueva (cualquiera puede ser None). No hace commit:
+    va en la misma transacción que el cambio del producto.
+    """
+    from models import db, Archivo
+
+    anterior, nueva = sha_de_url(url_anterior), sha_de_url(url_nueva)
+    if anterior == nueva:
+        return
+    # UPDATE ... SET referencias = referencias ± 1 para no leer-modificar-escribir
+    if nueva:
+        db.session.execute(
+            db.update(Archivo).where(Archivo.sha256 == nueva)
+            .values(referencias=Archivo.referencias + 1)
+        )
+    if anterior:
+        db.session.execute(
+            db.update(Archivo).where(Archivo.sha256 == anterior, Archivo.referencias > 0)
+            .values(referencias=Archivo.referencias - 1)
+        )
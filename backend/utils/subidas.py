@@ -0,0 +1,83 @@
+# utils/subidas.py
+"""
+Recepción de archivos sin cargarlos completos en memoria.
+
+RequestSubidas hace que werkzeug escriba cada archivo del multipart en un
+SpooledTemporaryFile: los primeros SUBIDAS_BUFFER_KB quedan en memoria y el
+resto se va a disco, sin importar el tamaño total (MAX_CONTENT_LENGTH).
+Después las rutas leen ese archivo por bloques: hash_stream() para el
+SHA-256 y copia_reducida() para una versión chica de la imagen, en lugar de
+file.read() del archivo completo.
+"""
+import hashlib
+import io
+import math
+import os
+from tempfile import SpooledTemporaryFile
+
+from flask import Request
+
+from utils.storage import BLOQUE
+
+SUBIDAS_BUFFER_KB = int(os.getenv("SUBIDAS_BUFFER_KB", "256"))
+
+# Copia que se manda a moderar. Con detail "low" el modelo ve 512x512 y con
+# "high" reescala el lado corto a 768: más píxeles solo cuestan bytes y tokens.
+LADO_COPIA_REDUCIDA = int(os.getenv("MODERACION_LADO_MAX", "768"))
+CALIDAD_COPIA_REDUCIDA = int(os.getenv("MODERACION_JPEG_CALIDAD", "80"))
+
+class RequestSubidas(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return SpooledTemporaryFile(max_size=SUBIDAS_BUFFER_KB * 1024, mode="rb+")
+
+
+def hash_stream(stream) -> tuple[str, int]:
+    """SHA-256 y tamaño leyendo por bloques; deja el stream al inicio."""
+    h = hashlib.sha256()
+    tamano = 0
+    stream.seek(0)
+    while True:
+        bloque = stream.read(BLOQUE)
+        if not bloque:
+            break
+        h.update(bloque)
+        tamano += len(bloque)
+    stream.seek(0)
+    return h.hexdigest(), tamano
+
+
+def copia_reducida(stream, lado_max: int = LADO_COPIA_REDUCIDA,
+                   calidad: int = CALIDAD_COPIA_REDUCIDA) -> tuple[bytes, str]:
+    """
+    JPEG de a lo más lado_max px por lado, hecho desde el stream con una sola
+    decodificación: en JPEG draft() ya decodifica a escala 1/2..1/8, y
+    thumbnail() reduce por enteros antes de remuestrear. Se aplica la
+    orientación EXIF y no se copian metadatos (EXIF, GPS, ICC); la
+    transparencia se aplana sobre blanco. Lanza ValueError si no es una imagen
+    legible. Deja el stream al inicio.
+    """
+    from PIL import Image, ImageOps
+
+    stream.seek(0)
+    try:
+        with Image.open(stream) as img:
+            # caja con la proporción de la imagen: con (lado_max, lado_max) el
+            # lado corto obligaría a decodificar al doble de lo necesario
+            escala = min(1.0, lado_max / max(img.size))
+            img.draft("RGB", (math.ceil(img.width * escala), math.ceil(img.height * escala)))
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((lado_max, lado_max))
+            if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+                img = img.convert("RGBA")
+                fondo = Image.new("RGB", img.size, (255, 255, 255))
+                fondo.paste(img, mask=img.getchannel("A"))
+                img = fondo
+            elif img.mode != "RGB":
+                img = img.convert("RGB")
+            salida = io.BytesIO()
+            img.save(salida, "JPEG", quality=calidad, optimize=True)
+    except Exception as e:
+        raise ValueError(f"No es una imagen válida: {e}") from e
+    finally:
+        stream.seek(0)
+    return salida.getvalue(), "image/jpeg"
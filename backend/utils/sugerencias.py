@@ -0,0 +1,240 @@
+# utils/sugerencias.py
+"""
+Autocompletado de la caja de búsqueda.
+
+Índice en memoria con las palabras de Producto.titulo y los nombres de
+Categoria. Responde por prefijo y, si no alcanza, por parecido (trigramas +
+distancia de edición), así "balon", "balón" o "celuar" encuentran algo.
+Solo toca la BD al construirse; después se refresca en un hilo aparte cada
+SUGERENCIAS_TTL segundos sin bloquear a quien está pidiendo sugerencias.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from flask import current_app
+
+from models import db, Producto, Categoria
+from utils.busqueda import STOPWORDS, normalizar
+
+SUGERENCIAS_TTL = int(os.getenv("SUGERENCIAS_TTL", "300"))
+
+MIN_LARGO = 3
+MAX_PREFIJO_ESCANEO = 500
+MAX_CANDIDATOS_DIFUSOS = 200
+
+
+def _trigramas(palabra: str) -> set[str]:
+    p = f"  {palabra} "
+    return {p[i:i + 3] for i in range(len(p) - 2)}
+
+
+def distancia_edicion(a: str, b: str, maximo: int) -> int:
+    """
+    Damerau-Levenshtein (transposiciones adyacentes) acotada: si ya se pasó
+    de `maximo` regresa maximo + 1 sin terminar la matriz.
+    """
+    if abs(len(a) - len(b)) > maximo:
+        return maximo + 1
+
+    anterior2 = None
+    anterior = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        actual = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            costo = 0 if a[i - 1] == b[j - 1] else 1
+            actual[j] = min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + costo)
+            if (
+                anterior2 is not None and i > 1 and j > 1
+                and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]
+            ):
+                actual[j] = min(actual[j], anterior2[j - 2] + 1)
+        if min(actual) > maximo:
+            return maximo + 1
+        anterior2, anterior = anterior, actual
+    return anterior[-1]
+
+
+def _maxima_distancia(palabra: str) -> int:
+    return 1 if len(palabra) <= 5 else 2
+
+
+def _palabras(titulo: str | None):
+    """(clave normalizada, forma escrita) de cada palabra útil del título."""
+    for original in (titulo or "").split():
+        clave = normalizar(original)
+        if len(clave) < MIN_LARGO or clave in STOPWORDS or " " in clave:
+            continue
+        yield clave, original.strip(".,;:!¡?¿()\"'").lower()
+
+
+class IndiceSugerencias:
+    def __init__(self, titulos: list[str], categorias: list[tuple[int, str]]):
+        conteo: Counter = Counter()
+        formas: dict[str, Counter] = defaultdict(Counter)
+        for titulo in titulos:
+            for clave, forma in _palabras(titulo):
+                conteo[clave] += 1
+                formas[clave][forma] += 1
+
+        # forma a mostrar: la escritura más común (con acentos si la gente los usa)
+        self._terminos = {
+            clave: (formas[clave].most_common(1)[0][0], n) for clave, n in conteo.items()
+        }
+        self._claves = sorted(self._terminos)
+        self._trigramas: dict[str, list[str]] = defaultdict(list)
+        for clave in self._claves:
+            for tri in _trigramas(clave):
+                self._trigramas[tri].append(clave)
+
+        self._categorias = [(id_cat, nombre, normalizar(nombre)) for id_cat, nombre in categorias]
+
+    def agregar_titulo(self, titulo: str | None):
+        nuevas = False
+        for clave, forma in _palabras(titulo):
+            if clave in self._terminos:
+                forma_actual, n = self._terminos[clave]
+                self._terminos[clave] = (forma_actual, n + 1)
+                continue
+            self._terminos[clave] = (forma, 1)
+            for tri in _trigramas(clave):
+                self._trigramas[tri].append(clave)
+            nuevas = True
+        if nuevas:
+            self._claves = sorted(self._terminos)
+
+    def _por_prefijo(self, prefijo: str) -> list[str]:
+        encontradas = []
+        i = bisect_left(self._claves, prefijo)
+        while i < len(self._claves) and len(encontradas) < MAX_PREFIJO_ESCANEO:
+            clave = self._claves[i]
+            if not clave.startswith(prefijo):
+                break
+            encontradas.append(clave)
+            i += 1
+        return encontradas
+
+    def _difusas(self, palabra: str) -> list[tuple[int, str]]:
+        compartidos: Counter = Counter()
+        for tri in _trigramas(palabra):
+            for clave in self._trigramas.get(tri, ()):
+                compartidos[clave] += 1
+
+        maximo = _maxima_distancia(palabra)
+        resultado = []
+        for clave, _ in compartidos.most_common(MAX_CANDIDATOS_DIFUSOS):
+            # se compara contra la palabra completa y contra su prefijo, para
+            # que un error a medio escribir ("celua") también encuentre "celular"
+            d = min(
+                distancia_edicion(palabra, clave, maximo),
+                distancia_edicion(palabra, clave[:len(palabra)], maximo),
+            )
+            if d <= maximo:
+                resultado.append((d, clave))
+        return resultado
+
+    def sugerir(self, consulta: str, limite: int = 8) -> list[dict]:
+        palabras = normalizar(consulta).split()
+        if not palabras:
+            return []
+        ultima = palabras[-1]
+        antes = " ".join(palabras[:-1])
+
+        maximo = _maxima_distancia(ultima) if len(ultima) >= MIN_LARGO else 0
+
+        sugerencias = []
+        vistos = set()
+
+        for id_cat, nombre, nombre_norm in self._categorias:
+            if any(
+                w.startswith(ultima)
+                or (maximo and distancia_edicion(ultima, w[:len(ultima)], maximo) <= maximo)
+                for w in nombre_norm.split()
+            ):
+                sugerencias.append({"texto": nombre, "tipo": "categoria", "id_categoria": id_cat})
+
+        candidatas = sorted(
+            self._por_prefijo(ultima),
+            key=lambda c: (-self._terminos[c][1], c),
+        )
+        if len(candidatas) < limite and len(ultima) >= MIN_LARGO:
+            difusas = sorted(
+                self._difusas(ultima),
+                key=lambda x: (x[0], -self._terminos[x[1]][1], x[1]),
+            )
+            candidatas += [c for _, c in difusas if c not in candidatas]
+
+        for clave in candidatas:
+            if len(sugerencias) >= limite:
+                break
+            forma, n = self._terminos[clave]
+            texto = f"{antes} {forma}".strip()
+            if texto in vistos:
+                continue
+            vistos.add(texto)
+            sugerencias.append({"texto": texto, "tipo": "termino", "conteo": n})
+
+        return sugerencias[:limite]
+
+
+# ---------------------------------------------------------------------------
+# Índice del proceso
+# ---------------------------------------------------------------------------
+
+_indice: IndiceSugerencias | None = None
+_construido_en = 0.0
+_lock = threading.Lock()
+_refrescando = False
+
+
+def _construir() -> IndiceSugerencias:
+    titulos = [
+        t for (t,) in db.session.query(Producto.titulo)
+        .filter(Producto.estado == "disponible")
+        .all()
+    ]
+    categorias = db.session.query(Categoria.id_categoria, Categoria.nombre).all()
+    return IndiceSugerencias(titulos, categorias)
+
+
+def _refrescar_en_segundo_plano(app):
+    global _indice, _construido_en, _refrescando
+    try:
+        with app.app_context():
+            nuevo = _construir()
+        _indice, _construido_en = nuevo, time.monotonic()
+    except Exception as e:
+        print("WARN refrescando índice de sugerencias:", e)
+    finally:
+        _refrescando = False
+
+
+def obtener_indice() -> IndiceSugerencias:
+    global _indice, _construido_en, _refrescando
+
+    if _indice is None:
+        with _lock:
+            if _indice is None:
+                _indice = _construir()
+                _construido_en = time.monotonic()
+        return _indice
+
+    if time.monotonic() - _construido_en >= SUGERENCIAS_TTL and not _refrescando:
+        with _lock:
+            if not _refrescando:
+                _refrescando = True
+                threading.Thread(
+                    target=_refrescar_en_segundo_plano,
+                    args=(current_app._get_current_object(),),
+                    daemon=True,
+                ).start()
+    return _indice
+
+
+def registrar_titulo(titulo: str | None):
+    """Agrega al vuelo las palabras de un título nuevo; el refresco periódico recalcula todo."""
+    if _indice is not None:
+        with _lock:
+            _indice.agregar_titulo(titulo)
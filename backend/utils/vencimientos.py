@@ -0,0 +1,109 @@
+# utils/vencimientos.py
+"""
+Barrido periódico de intercambios con la confirmación vencida.
+
+Cuando un usuario confirma, el otro tiene hasta fecha_limite_confirmacion.
+Si se pasa el plazo y solo uno confirmó, el que no confirmó pierde el
+verificado y el intercambio se cancela. Antes esto pasaba solo cuando alguien
+abría el detalle (GET); ahora lo hace una tarea de fondo en lotes, usando
+idx_intercambios_estado_limite.
+"""
+import os
+from datetime import datetime
+
+from models import db, Intercambio, Usuario
+from utils import sesiones_socket
+
+INTERCAMBIOS_BARRIDO_SEGUNDOS = int(os.getenv("INTERCAMBIOS_BARRIDO_SEGUNDOS", "15"))
+INTERCAMBIOS_BARRIDO_LOTE = int(os.getenv("INTERCAMBIOS_BARRIDO_LOTE", "100"))
+
+
+def penalizar_vencidos(socketio=None, ahora: datetime | None = None,
+                       lote: int = INTERCAMBIOS_BARRIDO_LOTE) -> int:
+    """
+    Procesa hasta `lote` intercambios vencidos y regresa cuántos procesó.
+    En MySQL usa FOR UPDATE SKIP LOCKED para que varios workers puedan
+    barrer a la vez sin penalizar dos veces el mismo intercambio.
+    """
+    ahora = ahora or datetime.utcnow()
+
+    query = (
+        Intercambio.query
+        .filter(
+            Intercambio.estado == "pendiente",
+            Intercambio.fecha_limite_confirmacion.isnot(None),
+            Intercambio.fecha_limite_confirmacion < ahora,
+        )
+        .order_by(Intercambio.fecha_limite_confirmacion.asc())
+        .limit(lote)
+    )
+    if db.engine.dialect.name == "mysql":
+        query = query.with_for_update(skip_locked=True)
+
+    vencidos = query.all()
+    if not vencidos:
+        db.session.rollback()
+        return 0
+
+    ids_usuarios = {i.id_usuario_ofrece for i in vencidos} | {i.id_usuario_recibe for i in vencidos}
+    usuarios = {
+        u.id_usuario: u
+        for u in Usuario.query.filter(Usuario.id_usuario.in_(ids_usuarios)).all()
+    }
+
+    eventos = []
+    for i in vencidos:
+        sol_acepto = (i.estado_solicitante == "aceptado")
+        rec_acepto = (i.estado_receptor == "aceptado")
+
+        id_no_confirmo = None
+        # XOR: exactamente uno aceptó
+        if sol_acepto ^ rec_acepto:
+            id_no_confirmo = i.id_usuario_recibe if sol_acepto else i.id_usuario_ofrece
+            usuario = usuarios.get(id_no_confirmo)
+            if usuario and usuario.verificado:
+                usuario.verificado = False  # verificado = 0
+
+        # se cancela aunque el usuario ya estuviera sin verificar; si no,
+        # el intercambio se quedaría vencido para siempre y el barrido lo
+        # volvería a tomar en cada vuelta
+        i.estado = "cancelado"
+        i.fecha_limite_confirmacion = None
+        i.fecha_actualizacion = ahora
+        eventos.append((i.id_intercambio, id_no_confirmo))
+
+    db.session.commit()
+
+    for id_intercambio, id_no_confirmo in eventos:
+        if socketio is not None:
+            socketio.emit("intercambio_penalizado", {
+                "id_intercambio": id_intercambio,
+                "id_usuario_penalizado": id_no_confirmo,
+            }, room=f"intercambio_{id_intercambio}")
+        sesiones_socket.revocar_intercambio(id_intercambio, socketio)
+
+    return len(vencidos)
+
+
+def _bucle_barrido(app, socketio, intervalo: int):
+    while True:
+        socketio.sleep(intervalo)
+        with app.app_context():
+            try:
+                # si el lote salió lleno probablemente hay más esperando
+                while penalizar_vencidos(socketio) >= INTERCAMBIOS_BARRIDO_LOTE:
+                    socketio.sleep(0)
+            except Exception as e:
+                print("WARN barrido de intercambios vencidos:", e)
+                db.session.rollback()
+            finally:
+                db.session.remove()
+
+
+def iniciar_barrido_vencimientos(app, socketio, intervalo: int = INTERCAMBIOS_BARRIDO_SEGUNDOS):
+    """Arranca el barrido como tarea de fondo de SocketIO (green thread con eventlet)."""
+    if intervalo <= 0:
+        print("[INFO] Barrido de intercambios vencidos desactivado")
+        return
+    socketio.start_background_task(_bucle_barrido, app, socketio, intervalo)
+    print(f"[INFO] Barrido de intercambios vencidos cada {intervalo}s")
@@ -0,0 +1,19 @@
+# wsgi.py
+"""
+Punto de entrada de producción:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+El parche de eventlet va antes de cualquier otro import para que los locks,
+sockets y PyMySQL que se crean al importar la app ya sean "verdes"; con
+preload_app eso pasa en el master, antes del fork.
+"""
+import os
+
+if os.getenv("GUNICORN_WORKER_CLASS", "eventlet") == "eventlet":
+    import eventlet
+    eventlet.monkey_patch()
+
+from app import create_app  # noqa: E402
+
+app = create_app()
@@ -18,6 +18,7 @@ export interface ProductoCard {
   descripcion: string;
   valor_estimado: number;
   imagen_url: string | null;
+  imagenes?: Record<'thumb' | 'card' | 'full', { webp: string; jpg: string }> | null;
   ubicacion: string;
   estado: string; // "disponible" | "baja"
   fecha_publicacion: string | null;
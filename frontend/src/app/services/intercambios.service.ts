@@ -57,7 +57,10 @@ export interface IntercambioDetalle {
 }
 
 export interface MensajeIntercambio {
-  id_mensaje: number;
+  // null en los mensajes del socket con CHAT_PERSISTENCIA=lote
+  id_mensaje: number | null;
+  // para reconectar con ?after_fecha= y descartar repetidos
+  id_provisional?: string | null;
   id_intercambio: number;
   id_usuario: number;
   tipo: "texto" | "ubicacion";
@@ -120,10 +123,11 @@ export class IntercambiosService {
     );
   }
 
+  // historial completo: sin parámetros el backend regresa solo los últimos 50
   listarMensajes(id_intercambio: number): Observable<MensajeIntercambio[]> {
     return this.http.get<MensajeIntercambio[]>(
       `${this.baseUrl}/${id_intercambio}/mensajes`,
-      this.optsAuth()
+      { headers: this.auth.authHeaders(), params: { todos: "1" } }
     );
   }
 }
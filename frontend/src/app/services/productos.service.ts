@@ -20,6 +20,8 @@ export interface Producto {
   descripcion: string;
   valor_estimado: number;
   imagen_url: string | null;
+  // variantes redimensionadas (null mientras el backend no las genera)
+  imagenes?: Record<'thumb' | 'card' | 'full', { webp: string; jpg: string }> | null;
   ubicacion: string | null;
   estado: 'disponible' | 'baja' | string;
   es_tuyo: boolean;
@@ -55,6 +57,8 @@ export class ProductosService {
     if (opts?.solo_mios) params = params.set('solo_mios', '1');
     if (opts?.solo_otros) params = params.set('solo_otros', '1');
     if (opts?.incluir_bajas) params = params.set('incluir_bajas', '1');
+    // el backend pagina por cursor por defecto; aquí seguimos pidiendo la lista completa
+    params = params.set('todos', '1');
 
     return this.http.get<Producto[]>(`${this.baseUrl}/productos`, {
       params,
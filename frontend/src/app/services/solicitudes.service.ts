@@ -51,7 +51,7 @@ export class SolicitudesService {
   recibidas(): Observable<SolicitudCard[]> {
     return this.http.get<SolicitudCard[]>(
       `${this.baseUrl}/solicitudes/recibidas`,
-      { headers: this.auth.authHeaders() }
+      { headers: this.auth.authHeaders(), params: { todos: '1' } }
     );
   }
 
@@ -59,7 +59,7 @@ export class SolicitudesService {
   enviadas(): Observable<SolicitudCard[]> {
     return this.http.get<SolicitudCard[]>(
       `${this.baseUrl}/solicitudes/enviadas`,
-      { headers: this.auth.authHeaders() }
+      { headers: this.auth.authHeaders(), params: { todos: '1' } }
     );
   }
 
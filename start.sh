@@ -26,12 +26,19 @@ fi
 echo "Instalando dependencias de Python en el venv..."
 pip install --no-cache-dir -r requirements.txt
 
-# 5) Lanzar Flask en el puerto que ponga Railway
+# 5) Migraciones pendientes (una sola vez); los workers solo verifican la versión
+echo "Aplicando migraciones..."
+python migrate.py
+export DB_ESQUEMA_AL_INICIAR=verificar
+
+# 6) Lanzar la app con gunicorn (workers eventlet) en el puerto que ponga Railway.
+#    Workers, conexiones, preload, etc. se configuran en gunicorn.conf.py
 export PORT="${PORT:-5000}"
 export FLASK_ENV=production
+export FLASK_DEBUG=0
 
-echo "Levantando Flask en el puerto $PORT..."
-python app.py
+echo "Levantando gunicorn en el puerto $PORT..."
+exec gunicorn -c gunicorn.conf.py wsgi:app
 
 
 